@@ -0,0 +1,195 @@
+import heapq
+import random
+from enum import Enum
+
+AgentState = Enum('AgentState', ['logged_off', 'idle', 'talking', 'wrap_up'])
+
+
+class Agent:
+    """
+    One agent: what they're doing, since when, and how long they've spent doing each thing.
+    """
+
+    def __init__(self, agent_id, login_time=0, logout_time=None):
+        """
+        :param agent_id:
+        :param login_time: the time (ms) the agent logs in
+        :param logout_time: the time (ms) the agent logs out (they finish their call first), or None to stay until
+        the end of the shift
+        """
+        self.agent_id = agent_id
+        self.login_time = login_time
+        self.logout_time = logout_time
+
+        self.state = AgentState.logged_off
+        self.state_since = 0
+
+        # Set once the agent is due to log off - they do so as soon as they finish their call
+        self.logging_out = False
+
+        # The time spent in each state
+        self.time_in_state = {state: 0 for state in AgentState}
+
+
+    def change_state(self, state, time):
+        self.time_in_state[self.state] += time - self.state_since
+        self.state = state
+        self.state_since = time
+
+
+    def utilisation(self, time):
+        """
+        :param time: the current time
+        :return: the fraction of the time logged in that the agent has been talking or wrapping up
+        """
+        times = dict(self.time_in_state)
+        times[self.state] += time - self.state_since
+
+        busy = times[AgentState.talking] + times[AgentState.wrap_up]
+        logged_in = busy + times[AgentState.idle]
+        return 0 if logged_in == 0 else busy / logged_in
+
+
+class AgentTeam:
+    """
+    The agents of a simulation, modelled individually rather than just counted.
+
+    Agents can log in and out at their own times and spend a wrap-up time after each call before they take the
+    next. The wrap-up times are drawn at random from a sample (eg: measured from real agents). Calls go to the agent
+    who has been idle longest: the idle agents are held in a heap ordered by when they became idle, so finding them
+    is O(log n) however many agents there are. Logins, logouts and the ends of wrap-ups are held in a heap of
+    timed events that the simulation handles as they fall due.
+    """
+
+    # The kinds of agent event
+    LOGIN = 0
+    LOGOUT = 1
+    WRAP_UP_END = 2
+
+    def __init__(self, number_agents=None, login_times=None, logout_times=None, wrap_up_times=None, seed=None):
+        """
+        :param number_agents: the number of agents. Defaults to the number of login times.
+        :param login_times: the time (ms) each agent logs in. By default everyone is there from the start.
+        :param logout_times: the time (ms) each agent logs out (None for the end of the shift). By default everyone
+        stays until the end of the shift.
+        :param wrap_up_times: the sample of wrap-up times (ms) to draw from. By default there is no wrap-up.
+        :param seed: the seed for drawing wrap-up times
+        """
+        if number_agents is None:
+            if login_times is None:
+                raise ValueError('Either the number of agents or their login times are needed')
+            number_agents = len(login_times)
+
+        login_times = [0] * number_agents if login_times is None else list(login_times)
+        logout_times = [None] * number_agents if logout_times is None else list(logout_times)
+        if len(login_times) != number_agents or len(logout_times) != number_agents:
+            raise ValueError('Need a login and logout time for each of the {} agents'.format(number_agents))
+
+        self.agents = [Agent(i, login, logout) for i, (login, logout) in enumerate(zip(login_times, logout_times))]
+
+        self._wrap_up_times = None if wrap_up_times is None or len(wrap_up_times) == 0 else list(wrap_up_times)
+        self._random = random.Random(seed)
+
+        # The idle agents as a heap of (idle since, agent id, agent). Agents that stop being idle leave their entry
+        # behind - these are discarded as they reach the top of the heap.
+        self._idle = []
+
+        # The agent events to come, as a heap of (time, sequence, kind, agent)
+        self._events = []
+        self._sequence = 0
+
+        self._agent_of_call = {}
+
+        for agent in self.agents:
+            if agent.login_time <= 0:
+                self.make_idle(agent, 0)
+            else:
+                self._schedule(agent.login_time, self.LOGIN, agent)
+            if agent.logout_time is not None:
+                self._schedule(agent.logout_time, self.LOGOUT, agent)
+
+
+    def number_logged_in(self):
+        return sum(1 for agent in self.agents if agent.state != AgentState.logged_off)
+
+
+    def _schedule(self, time, kind, agent):
+        self._sequence += 1
+        heapq.heappush(self._events, (time, self._sequence, kind, agent))
+
+
+    def next_event_time(self):
+        """
+        :return: the time of the next agent event, or None if there are none to come
+        """
+        return self._events[0][0] if len(self._events) > 0 else None
+
+
+    def due_events(self, time):
+        """
+        Remove the events that are due.
+        :param time:
+        :return: a list of (kind, agent)
+        """
+        events = []
+        while len(self._events) > 0 and self._events[0][0] <= time:
+            _, _, kind, agent = heapq.heappop(self._events)
+            events.append((kind, agent))
+        return events
+
+
+    def make_idle(self, agent, time):
+        agent.change_state(AgentState.idle, time)
+        heapq.heappush(self._idle, (time, agent.agent_id, agent))
+
+
+    def take(self, call, time):
+        """
+        Give a call to the agent that has been idle longest.
+        :param call:
+        :param time:
+        :return: the agent
+        """
+        while len(self._idle) > 0:
+            idle_since, _, agent = heapq.heappop(self._idle)
+            if agent.state == AgentState.idle and agent.state_since == idle_since:
+                agent.change_state(AgentState.talking, time)
+                self._agent_of_call[call.unique_id] = agent
+                return agent
+
+        raise Exception('Cannot make agent busy - there are none free')
+
+
+    def end_call(self, call, time):
+        """
+        The agent talking to a call has finished talking and starts their wrap-up.
+        :param call:
+        :param time:
+        :return: the agent, and whether they're free now (ie: they have no wrap-up)
+        """
+        agent = self._agent_of_call.pop(call.unique_id)
+
+        wrap_up_time = 0 if self._wrap_up_times is None else self._random.choice(self._wrap_up_times)
+        if wrap_up_time <= 0:
+            return agent, True
+
+        agent.change_state(AgentState.wrap_up, time)
+        self._schedule(time + wrap_up_time, self.WRAP_UP_END, agent)
+        return agent, False
+
+
+    def log_off(self, agent, time):
+        agent.change_state(AgentState.logged_off, time)
+        agent.logging_out = False
+
+
+    def idle_agents(self):
+        return [agent for agent in self.agents if agent.state == AgentState.idle]
+
+
+    def utilisation(self, time):
+        """
+        :param time:
+        :return: the utilisation of each agent (see Agent.utilisation)
+        """
+        return [agent.utilisation(time) for agent in self.agents]
@@ -0,0 +1,268 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import time
+import tracemalloc
+from multiprocessing import Pool
+import logging as log
+
+import pandas as pd
+
+from calling_list import CallingList
+from generator import CallingListModel
+from history import HistoryRecorder
+from reporting import Reporter
+from simulation import Simulation
+from simulation_constant_call import SimulationConstantCall
+from simulation_free_agent import SimulationFreeAgent
+from simulation_genetic import SimulationGenetic
+
+# test.csv lives alongside this file, so the benchmarks need nothing else
+TEST_CALLING_LIST = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test.csv')
+
+# The number of calls in each workload
+NUMBER_CALLS = 20000
+
+# The shift length of the simulation benchmarks
+DURATION_SHIFT = Simulation.ONE_MINUTE * 40
+
+
+def csv_workload(number_calls=NUMBER_CALLS):
+    """
+    :param number_calls:
+    :return: the calls of test.csv repeated (with unique ids) to make up number_calls
+    """
+    df = pd.read_csv(TEST_CALLING_LIST)
+
+    copies = []
+    for i in range(-(-number_calls // len(df))):
+        copy = df.copy()
+        copy['UniqueId'] = copy.UniqueId + ':{}'.format(i)
+        copies.append(copy)
+
+    return pd.concat(copies, ignore_index=True).iloc[:number_calls]
+
+
+def synthetic_workload(number_calls=NUMBER_CALLS, seed=42):
+    """
+    :param number_calls:
+    :param seed:
+    :return: synthetic calls modelled on test.csv
+    """
+    return CallingListModel.from_csv(TEST_CALLING_LIST).generate(number_calls, seed=seed)
+
+
+WORKLOADS = {'test_csv': csv_workload, 'synthetic': synthetic_workload}
+
+
+def _calling_list(df):
+    cl = CallingList()
+    cl._df = df
+    cl.parse()
+    return cl
+
+
+def _quiet_options():
+    return dict(reporter=Reporter(), history=HistoryRecorder(None, Simulation.SAVE_HISTORY_INTERVAL))
+
+
+def _constant_call(dial_level, event_driven=False):
+    def setup(df):
+        cl = _calling_list(df)
+        sim = SimulationConstantCall(dial_level, keep_disconnected_calls=False, event_driven=event_driven,
+                                     **_quiet_options())
+        return lambda: _start(sim, cl)
+    return setup
+
+
+def _free_agent(number_agents):
+    def setup(df):
+        cl = _calling_list(df)
+        sim = SimulationFreeAgent(number_agents=number_agents, keep_disconnected_calls=False, **_quiet_options())
+        return lambda: _start(sim, cl)
+    return setup
+
+
+def _start(sim, cl):
+    sim.start(cl, DURATION_SHIFT)
+    # Every call event that was scheduled
+    return sim._event_sequence
+
+
+def _parse(df):
+    cl = CallingList()
+    cl._df = df
+
+    def run():
+        cl.parse()
+        return len(cl._table)
+    return run
+
+
+def _genetic_round(df):
+    cl = _calling_list(df)
+
+    # One recalculation over the first recalculation window's worth of calls (at 2 calls per second)
+    sim = SimulationGenetic(number_agents=40, keep_disconnected_calls=False, **_quiet_options())
+    sim._calling_list = cl
+    for i in range(min(len(cl._calls), 2 * sim._recalc_window // Simulation.ONE_SECOND)):
+        sim._stored_calling_list_entry.append(cl._calls[i], 0)
+
+    def run():
+        random.seed(42)
+        sim.rerun_past_calls()
+        return sim._fitness_cache.misses
+    return run
+
+
+# Each benchmark: the function that sets it up from the workload, returning what to time. What is timed returns the
+# number of events it handled (call events, calls parsed or chromosomes simulated).
+BENCHMARKS = {'parse': _parse,
+              'constant_1': _constant_call(1),
+              'constant_2': _constant_call(2),
+              'constant_3': _constant_call(3),
+              'constant_50': _constant_call(50),
+              'constant_2_event_driven': _constant_call(2, event_driven=True),
+              'free_agent_20': _free_agent(20),
+              'free_agent_40': _free_agent(40),
+              'free_agent_80': _free_agent(80),
+              'genetic_round': _genetic_round}
+
+
+def measure(name, workload, repeat=3, number_calls=NUMBER_CALLS):
+    """
+    Measure one benchmark on one workload. Run in a process of its own (see run_benchmarks) so the peak RSS is the
+    benchmark's own.
+    :param name: the name of the benchmark in BENCHMARKS
+    :param workload: the name of the workload in WORKLOADS
+    :param repeat: the number of timed runs - the fastest is kept
+    :param number_calls:
+    :return: a dict of the measurements
+    """
+    df = WORKLOADS[workload](number_calls)
+    setup = BENCHMARKS[name]
+
+    wall_times = []
+    events = 0
+    for i in range(repeat):
+        run = setup(df)
+        started = time.perf_counter()
+        events = run()
+        wall_times.append(time.perf_counter() - started)
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Tracing allocations slows everything down, so it gets a run of its own
+    run = setup(df)
+    tracemalloc.start()
+    run()
+    _, peak_allocated = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    wall_time = min(wall_times)
+    return {'benchmark': name,
+            'workload': workload,
+            'wall_time': wall_time,
+            'events': events,
+            'events_per_second': events / wall_time if wall_time > 0 else None,
+            'peak_rss_kb': peak_rss,
+            'peak_allocated_bytes': peak_allocated}
+
+
+def _measure(args):
+    return measure(*args)
+
+
+def run_benchmarks(names=None, workloads=None, repeat=3, number_calls=NUMBER_CALLS):
+    """
+    :param names: the benchmarks to run (all of them if None)
+    :param workloads: the workloads to run them on (all of them if None)
+    :param repeat:
+    :param number_calls:
+    :return: the results, with details of where and when they were measured
+    """
+    names = list(BENCHMARKS) if names is None else names
+    workloads = list(WORKLOADS) if workloads is None else workloads
+
+    results = []
+    for workload in workloads:
+        for name in names:
+            log.info('Benchmarking {} on the {} workload'.format(name, workload))
+            # A fresh process for each benchmark, one at a time
+            with Pool(1, maxtasksperchild=1) as pool:
+                results.append(pool.apply(_measure, ((name, workload, repeat, number_calls),)))
+
+    return {'commit': _commit(),
+            'time': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'number_calls': number_calls,
+            'results': results}
+
+
+def _commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline, current):
+    """
+    :param baseline: results from run_benchmarks (eg: loaded from an earlier commit's JSON)
+    :param current:
+    :return: a DataFrame of the wall time and peak allocation of each benchmark in both, and the ratios
+    """
+    def frame(results):
+        return pd.DataFrame(results['results']).set_index(['benchmark', 'workload'])[['wall_time',
+                                                                                      'peak_allocated_bytes']]
+
+    df = frame(baseline).join(frame(current), lsuffix='_baseline', rsuffix='_current', how='inner')
+    df['wall_time_ratio'] = df.wall_time_current / df.wall_time_baseline
+    df['allocated_ratio'] = df.peak_allocated_bytes_current / df.peak_allocated_bytes_baseline
+    return df
+
+
+def main(argv=None):
+    """
+    Run the benchmarks and save the results, eg:
+
+      python benchmark.py --output bench.json --compare bench_before.json
+
+    :param argv:
+    :return:
+    """
+    parser = argparse.ArgumentParser(description='Benchmark the simulation core')
+    parser.add_argument('--benchmarks', nargs='+', choices=list(BENCHMARKS))
+    parser.add_argument('--workloads', nargs='+', choices=list(WORKLOADS))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--calls', type=int, default=NUMBER_CALLS, help='the number of calls in each workload')
+    parser.add_argument('--output', default='benchmark.json')
+    parser.add_argument('--compare', help='the results of an earlier run to compare against')
+    args = parser.parse_args(argv)
+
+    log.basicConfig(level=log.INFO, format='%(levelname)-8s %(message)s')
+    # The simulations' own logging would swamp the results
+    log.getLogger().handlers[0].addFilter(lambda record: record.module == 'benchmark')
+
+    results = run_benchmarks(args.benchmarks, args.workloads, args.repeat, args.calls)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    log.info('\n' + pd.DataFrame(results['results']).to_string(index=False))
+
+    if args.compare is not None:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        log.info('\nCompared with {}:\n{}'.format(baseline.get('commit'), compare(baseline, results).to_string()))
+
+
+if __name__ == '__main__':
+    main()
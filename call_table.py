@@ -0,0 +1,318 @@
+from collections.abc import Sequence
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+
+from callstats import CallRecord, CallStats, DATE_FORMAT, OUTCOME_CODES
+
+
+class CallTable:
+    """
+    The calls of a calling list held as columns, one row per call. This is far more compact than holding a
+    CallRecord for each call - the records (and the CallStats that dial them) are only created (see call and
+    queued_call) for the calls that are actually dialed.
+
+    Columns:
+      start_offsets:             the time (ms) the call started relative to the first call in the list
+      offsets_connect:           the time (ms) from the start of the call until it connected
+      offsets_disconnect:        the time (ms) from the start of the call until it disconnected
+      queued_offsets_disconnect: the disconnect offset used when the call is replayed as a queued call
+      outcomes:                  the index of the call's outcome code in outcome_codes
+      queued:                    whether the call was queued
+      transferred_to_agent:      whether the call was transferred to an agent
+      unique_ids:                the call's unique id (UTF-8 bytes)
+    """
+
+    COLUMNS = ('start_offsets', 'offsets_connect', 'offsets_disconnect', 'queued_offsets_disconnect', 'outcomes',
+               'queued', 'transferred_to_agent', 'unique_ids')
+
+    # The version of the layout written by save. Bump this whenever the columns change.
+    FORMAT_VERSION = 1
+
+    def __init__(self, start_offsets, offsets_connect, offsets_disconnect, queued_offsets_disconnect, outcomes,
+                 queued, transferred_to_agent, unique_ids, outcome_codes=OUTCOME_CODES, queued_indices=None):
+        self.start_offsets = start_offsets
+        self.offsets_connect = offsets_connect
+        self.offsets_disconnect = offsets_disconnect
+        self.queued_offsets_disconnect = queued_offsets_disconnect
+        self.outcomes = outcomes
+        self.queued = queued
+        self.transferred_to_agent = transferred_to_agent
+        self.unique_ids = unique_ids
+        self.outcome_codes = tuple(outcome_codes)
+
+        # The rows of the calls that can be used to simulate the time a queued call waits
+        if queued_indices is None:
+            queued_indices = np.flatnonzero(queued)
+        self.queued_indices = queued_indices
+
+
+    @classmethod
+    def from_dataframe(cls, df, origin=None):
+        """
+        Work out the offsets of every call in a calling list file. This is done a column at a time rather than a row
+        at a time.
+        :param df: the calling list as read from the csv file
+        :param origin: the time (ms since the epoch) the start offsets are relative to. Defaults to the start of the
+        first call in df - give it when df is only one chunk of a calling list (see CallingList.parse_chunks).
+        :return: the table
+        """
+        call_start = pd.to_datetime(df.CallStartDateTime, format=DATE_FORMAT)
+        call_end = pd.to_datetime(df.CallEndDateTime, format=DATE_FORMAT)
+        duration = (call_end - call_start).to_numpy().astype('timedelta64[us]').astype(np.int64)
+
+        start = call_start.to_numpy().astype('datetime64[ms]').astype(np.int64)
+        if origin is None:
+            origin = start.min() if len(start) > 0 else 0
+        start_offsets = start - origin
+
+        # We don't always get a disconnect offset - we can calculate one however. Note that queued calls have only
+        # ever used the microseconds part of the duration.
+        offsets_disconnect = df.OffsetDisconnect.to_numpy()
+        no_offset = offsets_disconnect == 0
+        call_offsets_disconnect = np.where(no_offset, duration / 10**6 * 1000, offsets_disconnect)
+        queued_offsets_disconnect = np.where(no_offset, (duration % 10**6) / 1000, offsets_disconnect)
+
+        # Keep unknown outcome codes (they are reported when the call is dialed)
+        outcome_column = df.OutcomeCode.fillna('')
+        outcome_codes = list(OUTCOME_CODES)
+        for code in pd.unique(outcome_column):
+            if code not in outcome_codes:
+                outcome_codes.append(code)
+        outcomes = pd.Categorical(outcome_column, categories=outcome_codes).codes.astype(np.int16)
+
+        # Connect offsets are kept as they were read: whole numbers unless some are missing
+        offsets_connect = df.OffsetConnect.to_numpy()
+        offsets_connect = offsets_connect.astype(np.int64 if offsets_connect.dtype.kind in 'iub' else np.float64)
+
+        return cls(start_offsets,
+                   offsets_connect,
+                   call_offsets_disconnect.astype(np.float64),
+                   queued_offsets_disconnect.astype(np.float64),
+                   outcomes,
+                   df.Queued.to_numpy() == 1,
+                   df.TransferredToAgent.to_numpy() == 1,
+                   cls._encode_unique_ids(df.UniqueId.to_numpy()),
+                   outcome_codes)
+
+
+    @staticmethod
+    def _encode_unique_ids(unique_ids):
+        """
+        :param unique_ids:
+        :return: the unique ids as UTF-8 bytes
+        """
+        try:
+            # Much the quickest, and unique ids are almost always ASCII
+            return unique_ids.astype(np.bytes_)
+        except UnicodeEncodeError:
+            return np.char.encode(unique_ids.astype(str), 'utf-8')
+
+
+    @classmethod
+    def concatenate(cls, tables):
+        """
+        Join tables (eg: parsed a chunk at a time) into one. Their start offsets must share an origin.
+        :param tables:
+        :return: the table
+        """
+        if len(tables) == 1:
+            return tables[0]
+
+        # Each table may have found outcome codes of its own, so the outcomes are mapped onto the codes of them all
+        outcome_codes = list(OUTCOME_CODES)
+        outcomes = []
+        for table in tables:
+            for code in table.outcome_codes:
+                if code not in outcome_codes:
+                    outcome_codes.append(code)
+            mapping = np.array([outcome_codes.index(code) for code in table.outcome_codes], dtype=np.int16)
+            outcomes.append(mapping[table.outcomes] if len(table) > 0 else table.outcomes)
+
+        columns = {column: np.concatenate([getattr(table, column) for table in tables])
+                   for column in cls.COLUMNS if column != 'outcomes'}
+
+        return cls(outcomes=np.concatenate(outcomes), outcome_codes=outcome_codes, **columns)
+
+
+    def rows(self, indices):
+        """
+        :param indices:
+        :return: a table of just the given rows, copied out of this one
+        """
+        columns = {column: np.asarray(getattr(self, column)[indices]) for column in self.COLUMNS}
+        return CallTable(outcome_codes=self.outcome_codes, **columns)
+
+
+    def save(self, path, metadata=None):
+        """
+        Write the table to a directory, one uncompressed .npy file per column, so that it can be memory-mapped by load.
+        The table is written to a new directory alongside, header last, which then replaces the old one. Processes
+        with the old table memory-mapped keep seeing it whole, and a failed write leaves the old table as it was.
+        :param path: the directory to write to
+        :param metadata: anything else (JSON serialisable) to record with the table
+        :return:
+        """
+        path = os.path.abspath(path)
+        parent, name = os.path.split(path)
+        os.makedirs(parent, exist_ok=True)
+
+        written = tempfile.mkdtemp(prefix='.' + name + '.', suffix='.new', dir=parent)
+        try:
+            for column in self.COLUMNS + ('queued_indices',):
+                np.save(os.path.join(written, column + '.npy'), getattr(self, column))
+
+            header = {'format_version': self.FORMAT_VERSION,
+                      'number_calls': len(self),
+                      'outcome_codes': list(self.outcome_codes),
+                      'metadata': metadata}
+
+            # The header goes last so a partly written table is never mistaken for a complete one
+            with open(os.path.join(written, 'header.json'), 'w') as f:
+                json.dump(header, f)
+                f.flush()
+                os.fsync(f.fileno())
+
+            if not os.path.exists(path):
+                os.rename(written, path)
+                return
+
+            # A directory can only be renamed over an empty one, so move the old table out of the way first. The old
+            # files are only unlinked, so processes that have them mapped are unaffected.
+            old = tempfile.mkdtemp(prefix='.' + name + '.', suffix='.old', dir=parent)
+            os.replace(path, old)
+            try:
+                os.rename(written, path)
+            except OSError:
+                os.rename(old, path)
+                raise
+            shutil.rmtree(old, ignore_errors=True)
+        except BaseException:
+            shutil.rmtree(written, ignore_errors=True)
+            raise
+
+
+    @classmethod
+    def read_header(cls, path):
+        """
+        :param path: a directory written by save
+        :return: the header written by save, or None if there isn't a complete table of the current format there
+        """
+        try:
+            with open(os.path.join(path, 'header.json')) as f:
+                header = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if header.get('format_version') != cls.FORMAT_VERSION:
+            return None
+
+        return header
+
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a table written by save. The columns are memory-mapped read only, so nothing is read until it is used
+        and the pages are shared by every process that loads the same table.
+        :param path: the directory written by save
+        :return: the table
+        """
+        header = cls.read_header(path)
+        if header is None:
+            raise ValueError('No compiled calling list in {}'.format(path))
+
+        columns = {column: np.load(os.path.join(path, column + '.npy'), mmap_mode='r')
+                   for column in cls.COLUMNS + ('queued_indices',)}
+
+        return cls(outcome_codes=header['outcome_codes'], **columns)
+
+
+    def __len__(self):
+        return len(self.unique_ids)
+
+
+    def nbytes(self):
+        """
+        :return: the memory used by the columns
+        """
+        return sum(getattr(self, column).nbytes for column in self.COLUMNS)
+
+
+    def record(self, index):
+        """
+        :param index:
+        :return: the CallRecord of the given row
+        """
+        return CallRecord(self.outcome_codes[self.outcomes[index]],
+                          self.offsets_connect[index].item(),
+                          float(self.offsets_disconnect[index]),
+                          self.unique_ids[index].decode('utf-8'),
+                          bool(self.queued[index]),
+                          bool(self.transferred_to_agent[index]))
+
+
+    def call(self, index):
+        """
+        Create a call for the given row.
+        :param index:
+        :return: a CallStats
+        """
+        return CallStats.from_record(self.record(index))
+
+
+    def queued_call(self, index):
+        """
+        Create a queued call for the given row.
+        :param index:
+        :return: a CallRecord
+        """
+        return CallRecord(self.outcome_codes[self.outcomes[index]],
+                          self.offsets_connect[index].item(),
+                          float(self.queued_offsets_disconnect[index]),
+                          self.unique_ids[index].decode('utf-8'),
+                          bool(self.queued[index]),
+                          bool(self.transferred_to_agent[index]))
+
+
+class TableCalls(Sequence):
+    """
+    A sequence of calls backed by rows of a CallTable. The call objects are only created as each call is asked for.
+    """
+
+    def __init__(self, table, indices, queued=False, copies=None):
+        """
+        :param table: the CallTable holding the calls
+        :param indices: the rows of the table in this sequence
+        :param queued: if set then the rows are handed out as queued calls
+        :param copies: for rows that appear more than once (eg: drawn with replacement), the number of times each
+        row has already appeared. Later copies get this appended to their unique id, as a simulation needs every
+        call it dials to have its own.
+        """
+        self._table = table
+        self._indices = indices
+        self._queued = queued
+        self._copies = copies
+
+
+    def __len__(self):
+        return len(self._indices)
+
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            copies = None if self._copies is None else self._copies[index]
+            return TableCalls(self._table, self._indices[index], self._queued, copies)
+
+        if self._queued:
+            return self._table.queued_call(self._indices[index])
+
+        if self._copies is None or self._copies[index] == 0:
+            return self._table.call(self._indices[index])
+
+        record = self._table.record(self._indices[index])
+        return CallStats.from_record(record._replace(unique_id='{}:{}'.format(record.unique_id,
+                                                                               self._copies[index])))
@@ -1,8 +1,46 @@
 from os import listdir
+from collections import OrderedDict, deque
+from collections.abc import Sequence
+import bisect
+import os
+import queue
+import threading
 import pandas as pd
 import logging as log
 
-from callstats import CallStats, QueuedStats
+from call_table import CallTable, TableCalls
+
+
+class CallingListWindow(Sequence):
+    """
+    A read-only view of part of a list of calls (or CallRecords), eg the calls made since the genetic algorithm last
+    ran. The list isn't copied and each call is handed out as a fresh call of its record, so any number of
+    simulations can replay the same window without affecting each other or the list.
+    """
+
+    def __init__(self, calls, start=0, stop=None):
+        self._calls = calls
+        self._start = start
+        self._stop = len(calls) if stop is None else stop
+
+
+    def __len__(self):
+        return self._stop - self._start
+
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                raise ValueError('Calling list windows must be contiguous')
+            return CallingListWindow(self._calls, self._start + start, self._start + max(start, stop))
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('Calling list window index out of range')
+
+        return self._calls[self._start + index].replay()
 
 
 class CallingList:
@@ -10,6 +48,12 @@ class CallingList:
     def __init__(self, calls=None, queued_calls=None):
         self._df = {}
 
+        # The columns of a parsed calling list file
+        self._table = None
+
+        # The file the calling list was loaded from
+        self._filename = None
+
         if calls is None:
             self._calls = []
             log.info('Calls: None')
@@ -22,50 +66,183 @@ class CallingList:
         else:
             self._queued_calls = queued_calls
 
-
+        # Calls are handed out by moving a cursor along the list rather than removing them from it. This keeps
+        # get_call O(1) and lets the same list be replayed after a reset.
+        self._next_call = 0
 
         self._next_queued_call = 0
 
 
     def load(self, filename):
         log.info('Loading simulation file: {}'.format(filename))
-        self._df = pd.read_csv(filename, infer_datetime_format=True)
+        self._filename = filename
+        self._df = pd.read_csv(filename)
 
 
     def parse(self):
+        """
+        Work out the offsets of every call from the loaded file. The calls are held in a CallTable and the call
+        objects are only created as they are handed out.
+        :return:
+        """
         log.info('Parsing simulation file.')
 
         # Reset our storage
-        self._calls = []
-        self._queued_calls = []
+        self._next_call = 0
+        self._next_queued_call = 0
+
+        self._set_table(CallTable.from_dataframe(self._df))
+
+
+    def parse_chunks(self, chunks):
+        """
+        Parse a calling list a chunk at a time (eg: from CallingListModel.chunks, or pd.read_csv with a chunksize).
+        Only the parsed calls are kept, so a calling list far bigger than would fit in memory as a DataFrame can be
+        parsed.
+        :param chunks: DataFrames of the calls, in the layout of a calling list file
+        :return:
+        """
+        log.info('Parsing simulation file in chunks.')
+
+        self._next_call = 0
+        self._next_queued_call = 0
+        self._df = {}
+
+        # The start offsets can only be made relative to the first call once every chunk has been seen
+        tables = [CallTable.from_dataframe(chunk, origin=0) for chunk in chunks]
+        if len(tables) == 0:
+            raise ValueError('No calls to parse')
+
+        table = CallTable.concatenate(tables)
+        if len(table) > 0:
+            table.start_offsets -= table.start_offsets.min()
+
+        self._set_table(table)
+
+
+    def _set_table(self, table):
+        self._table = table
+        self._calls = TableCalls(table, range(len(table)))
+        self._queued_calls = TableCalls(table, table.queued_indices, queued=True)
+
+
+    def save_compiled(self, path):
+        """
+        Save the parsed calling list so that it can be reloaded by load_compiled without parsing the file again.
+        :param path: the directory to save to
+        :return:
+        """
+        if self._table is None:
+            raise ValueError('Calling list has not been parsed')
+
+        log.info('Saving compiled calling list: {}'.format(path))
+        self._table.save(path, metadata={'source': self._source_signature(self._filename)})
+
+
+    def load_compiled(self, path, filename=None):
+        """
+        Load a calling list saved by save_compiled. The calls are memory-mapped rather than read in. If the file the
+        calling list was parsed from has changed since (or nothing has been saved yet) then the file is loaded and
+        parsed again and the compiled calling list is rewritten.
+        :param path: the directory saved by save_compiled
+        :param filename: the csv file the calling list comes from. If not given then the file recorded when the
+        calling list was saved is used.
+        :return:
+        """
+        header = CallTable.read_header(path)
+        source = None if header is None else header['metadata']['source']
+
+        if filename is None and source is not None:
+            filename = source['filename']
+
+        # If the file has gone then all we have is the compiled calling list
+        signature = self._source_signature(filename)
+        if header is None or (signature is not None and signature != source):
+            if filename is None:
+                raise ValueError('No compiled calling list in {} and no file to parse'.format(path))
+
+            log.info('Compiled calling list {} is out of date.'.format(path))
+            self.load(filename)
+            self.parse()
+            self.save_compiled(path)
+            return
+
+        log.info('Loading compiled calling list: {}'.format(path))
+        self._filename = filename
+        self._df = {}
+        self._next_call = 0
         self._next_queued_call = 0
+        self._set_table(CallTable.load(path))
 
-        for row in self._df.itertuples():
 
-            #log.debug(row)
-            c = CallStats(row.CallStartDateTime, row.OutcomeCode, row.OffsetConnect,
-                          row.OffsetDisconnect,row.CallEndDateTime, row.UniqueId, row.CauseCode,
-                          row.QueuedStartDateTime, row.QueuedEndDateTime, row.Queued, row.TransferredToAgent)
+    def split(self, column='List'):
+        """
+        Split a loaded calling list into one calling list per campaign (see MultiCampaignSimulation).
+        :param column: the column that names the campaign of each call
+        :return: a dict of campaign name to its parsed calling list, in the order the campaigns first appear
+        """
+        calling_lists = OrderedDict()
+        for name, df in self._df.groupby(column, sort=False):
+            calling_list = CallingList()
+            calling_list._filename = self._filename
+            calling_list._df = df
+            calling_list.parse()
+            calling_lists[name] = calling_list
 
-            self._calls.append(c)
+        return calling_lists
 
-            if row.Queued == 1:
-                q = QueuedStats(row.CallStartDateTime, row.OutcomeCode, row.OffsetConnect,
-                                row.OffsetDisconnect,row.CallEndDateTime, row.UniqueId, row.CauseCode,
-                                row.QueuedStartDateTime, row.QueuedEndDateTime, row.Queued, row.TransferredToAgent)
 
-                self._queued_calls.append(q)
+    @staticmethod
+    def _source_signature(filename):
+        """
+        :param filename:
+        :return: enough about the file to tell if it has changed
+        """
+        if filename is None or not os.path.exists(filename):
+            return None
+
+        stat = os.stat(filename)
+        return {'filename': os.path.abspath(filename), 'size': stat.st_size, 'modified': stat.st_mtime_ns}
 
 
     def get_call(self):
-        if len(self._calls) > 0:
-            return self._calls.pop(0)
+        if self._next_call < len(self._calls):
+            call = self._calls[self._next_call]
+            self._next_call += 1
+            return call
         else:
             return None
 
 
     def get_number_calls(self):
-        return len(self._calls)
+        """
+        :return: the number of calls that have still to be handed out
+        """
+        return len(self._calls) - self._next_call
+
+
+    def reset(self):
+        """
+        Rewind the calling list so that the same calls can be replayed by another simulation.
+        :return:
+        """
+        self._next_call = 0
+        self._next_queued_call = 0
+
+
+    def view(self):
+        """
+        :return: a calling list of the same calls, read from the start. The calls aren't copied - each call handed out
+        is a new call of a shared, immutable CallRecord - so simulations running at the same time (eg: in threads)
+        can each dial their own view of one calling list.
+        """
+        # Calls that aren't from a table are handed out as they are, so they have to be replayed instead
+        calls = self._calls if self._table is not None else CallingListWindow(self._calls)
+
+        cl = CallingList(calls, self._queued_calls)
+        cl._table = self._table
+        cl._filename = self._filename
+        return cl
 
 
     def get_queued_call(self):
@@ -85,3 +262,298 @@ class CallingList:
         return queued_call
 
 
+
+
+class QueuedCallSample(Sequence):
+    """
+    The queued calls of a streamed calling list, kept (up to a limit) as the file is read for them (see
+    _QueuedCallReader). Only the queued rows are kept.
+    """
+
+    def __init__(self, limit):
+        """
+        :param limit: the most queued calls to keep
+        """
+        self.limit = limit
+
+        # The queued rows of each chunk, and the number of queued calls up to the end of each
+        self._tables = []
+        self._ends = []
+
+
+    def add(self, table):
+        """
+        Keep the queued calls of a chunk, while there's room.
+        :param table: the CallTable of the chunk
+        :return:
+        """
+        indices = table.queued_indices[:self.limit - len(self)]
+        if len(indices) > 0:
+            self._tables.append(table.rows(indices))
+            self._ends.append(len(self) + len(indices))
+
+
+    def full(self):
+        return len(self) >= self.limit
+
+
+    def __len__(self):
+        return self._ends[-1] if len(self._ends) > 0 else 0
+
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('Queued call index out of range')
+
+        chunk = bisect.bisect_right(self._ends, index)
+        first = self._ends[chunk - 1] if chunk > 0 else 0
+        return self._tables[chunk].queued_call(index - first)
+
+
+class _ChunkReader(threading.Thread):
+    """
+    Reads and parses a calling list file a chunk at a time in the background, keeping at most prefetch parsed chunks
+    waiting to be used. Once the file has been read None is queued, or the exception if reading it failed.
+    """
+
+    def __init__(self, filename, chunk_size, prefetch):
+        threading.Thread.__init__(self, name='CallingListReader', daemon=True)
+        self.chunks = queue.Queue(prefetch)
+
+        self._filename = filename
+        self._chunk_size = chunk_size
+        self._stopping = threading.Event()
+
+
+    def run(self):
+        try:
+            with pd.read_csv(self._filename, chunksize=self._chunk_size) as reader:
+                for df in reader:
+                    # The start offsets aren't made relative to the first call as we haven't seen every call
+                    if not self._put(CallTable.from_dataframe(df, origin=0)):
+                        return
+        except Exception as e:
+            self._put(e)
+            return
+
+        self._put(None)
+
+
+    def _put(self, item):
+        """
+        Wait for room for the item, unless we're asked to stop.
+        :return: whether the item was queued
+        """
+        while not self._stopping.is_set():
+            try:
+                self.chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+
+    def stop(self):
+        self._stopping.set()
+        self.join()
+
+
+class _QueuedCallReader(threading.Thread):
+    """
+    Reads a calling list file in the background for its queued calls only, keeping the queued rows of each chunk
+    until the sample is full or the file has been read. This runs separately from the calls being dialed, so queued
+    calls can be handed out ahead of the dialer without holding on to the chunks they came from.
+    """
+
+    def __init__(self, filename, chunk_size, sample):
+        threading.Thread.__init__(self, name='QueuedCallReader', daemon=True)
+        self.sample = sample
+
+        # Set if reading the file failed
+        self.error = None
+
+        self._filename = filename
+        self._chunk_size = chunk_size
+        self._stopping = threading.Event()
+        self._finished = False
+        self._changed = threading.Condition()
+
+
+    def run(self):
+        try:
+            with pd.read_csv(self._filename, chunksize=self._chunk_size) as reader:
+                for df in reader:
+                    if self._stopping.is_set() or self.sample.full():
+                        break
+
+                    queued = df[df.Queued == 1]
+                    if len(queued) > 0:
+                        table = CallTable.from_dataframe(queued, origin=0)
+                        with self._changed:
+                            self.sample.add(table)
+                            self._changed.notify_all()
+        except Exception as e:
+            self.error = e
+
+        with self._changed:
+            self._finished = True
+            self._changed.notify_all()
+
+
+    def wait_for(self, index):
+        """
+        Wait until the sample has the queued call at index, or has all the queued calls it will ever have.
+        :param index:
+        :return:
+        """
+        with self._changed:
+            while not self._finished and len(self.sample) <= index:
+                self._changed.wait()
+
+        if self.error is not None:
+            raise self.error
+
+
+    def stop(self):
+        self._stopping.set()
+        self.join()
+
+
+class StreamingCallingList(CallingList):
+    """
+    A calling list that is read from its file as the calls are dialed, rather than loaded and parsed up front, for
+    files too big to hold in memory. A background thread reads and parses the file a chunk at a time, staying at most
+    prefetch chunks ahead of the simulation, so the memory used is set by the chunk size and not by the size of the
+    file.
+
+    Queued calls are handed out in the same order as CallingList, cycling back to the first once they're all used.
+    They come from a second background reader that keeps only the queued rows, up to max_queued_calls of them - past
+    that the first max_queued_calls are cycled through. Only the chunk being dialed is held on to, however far
+    ahead of the dialer the queued calls are.
+    """
+
+    DEFAULT_CHUNK_SIZE = 100000
+
+    def __init__(self, filename, chunk_size=DEFAULT_CHUNK_SIZE, prefetch=2, max_queued_calls=100000):
+        """
+        :param filename: the calling list file (csv)
+        :param chunk_size: the number of rows read and parsed at a time
+        :param prefetch: the most parsed chunks to hold waiting to be dialed
+        :param max_queued_calls: the most queued calls to keep (and cycle through)
+        """
+        CallingList.__init__(self)
+
+        self._filename = filename
+        self._chunk_size = chunk_size
+        self._prefetch = prefetch
+        self._max_queued_calls = max_queued_calls
+
+        self._reader = None
+        self._queued_reader = None
+        self._start_reading()
+
+
+    def _start_reading(self):
+        log.info('Streaming simulation file: {}'.format(self._filename))
+
+        # The chunk being dialed (if any). The next call is at _next_call in it.
+        self._chunks = deque()
+        self._next_call = 0
+        self._next_queued_call = 0
+        self._queued_calls = QueuedCallSample(self._max_queued_calls)
+
+        self._number_read = 0
+        self._number_handed_out = 0
+        self._finished_reading = False
+
+        self._reader = _ChunkReader(self._filename, self._chunk_size, self._prefetch)
+        self._reader.start()
+
+        self._queued_reader = _QueuedCallReader(self._filename, self._chunk_size, self._queued_calls)
+        self._queued_reader.start()
+
+
+    def _read_chunk(self):
+        """
+        Take the next parsed chunk from the reader, waiting for it if need be.
+        :return: whether there was another chunk
+        """
+        if self._finished_reading:
+            return False
+
+        table = self._reader.chunks.get()
+        if table is None or isinstance(table, Exception):
+            self._finished_reading = True
+            if table is not None:
+                raise table
+            return False
+
+        self._chunks.append(table)
+        self._number_read += len(table)
+        return True
+
+
+    def get_call(self):
+        while len(self._chunks) == 0 or self._next_call >= len(self._chunks[0]):
+            if len(self._chunks) > 0:
+                # Every call in the chunk has been dialed
+                self._chunks.popleft()
+                self._next_call = 0
+            elif not self._read_chunk():
+                return None
+
+        call = self._chunks[0].call(self._next_call)
+        self._next_call += 1
+        self._number_handed_out += 1
+        return call
+
+
+    def get_number_calls(self):
+        """
+        :return: the number of calls read from the file that have still to be handed out. The calls still to be read
+        aren't counted.
+        """
+        return self._number_read - self._number_handed_out
+
+
+    def get_queued_call(self):
+        # Wait for the queued call to be read, unless we've already kept as many as there will be
+        self._queued_reader.wait_for(self._next_queued_call)
+
+        return CallingList.get_queued_call(self)
+
+
+    def reset(self):
+        """
+        Start reading the file again from the beginning.
+        :return:
+        """
+        self.close()
+        self._start_reading()
+
+
+    def close(self):
+        """
+        Stop the background reading.
+        :return:
+        """
+        if self._reader is not None:
+            self._reader.stop()
+            self._reader = None
+
+        if self._queued_reader is not None:
+            self._queued_reader.stop()
+            self._queued_reader = None
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
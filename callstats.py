@@ -1,60 +1,80 @@
 from enum import Enum
-from collections import OrderedDict
+from collections import OrderedDict, namedtuple
 from datetime import datetime
 import logging as log
 
 CallState = Enum('CallState', ['created', 'ringing', 'answered', 'queued', 'talking', 'disconnected'])
 
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+
+# 3s to create a call
+TIME_TO_CREATE_CALL = 3000
+
+# The outcomes of calls that never get answered at the remote end, and of those that do
+NOT_ANSWERED_OUTCOME_CODES = ('O', 'E', 'AM', 'NU', 'CF')
+ANSWERED_OUTCOME_CODES = ('TR', 'QD', 'QT', 'AC')
+
+# Every outcome code we know about. Any others found in a calling list are kept after these (see CallTable).
+OUTCOME_CODES = NOT_ANSWERED_OUTCOME_CODES + ANSWERED_OUTCOME_CODES
+
 
 class CallEvent:
+    __slots__ = ('time', 'state')
+
     def __init__(self, time, state):
         self.time = time
         self.state = state
 
 
-class QueuedStats:
+class CallRecord(namedtuple('CallRecord', ['outcome_code', 'offset_connect', 'offset_disconnect', 'unique_id',
+                                           'queued', 'transferred_to_agent'])):
     """
-    CallStartDateTime, OutcomeCode, OffsetConnect, OffsetAgentRoute, OffsetDisconnect,
-                 CallEndDateTime, UniqueId, CauseCode, QueuedStartDateTime, QueuedEndDateTime, Queued,
-                 TransferredToAgent
+    What the calling list says happened to a call. Records never change, so one record can be shared by any number
+    of simulations, threads or processes; each simulation that dials the call does so through a CallStats of its own
+    (see replay). The calls used to simulate how long a queued call waits are only ever read, so they are just
+    records.
     """
 
-    def __init__(self, callStartDateTime, outcome_code, offsetConnect, offsetDisconnect,
-                 callEndDateTime, uniqueId, causeCode, queuedStartDateTime, queuedEndDateTime, queued,
-                 transferredToAgent):
-
-        DATE_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
-        TIME_TO_CREATE_CALL = 3000 # 3s to create a call
-
-        self._callStartDateTime = datetime.strptime(callStartDateTime, DATE_FORMAT)
-        self._callEndDateTime = datetime.strptime(callEndDateTime, DATE_FORMAT)
-        self.outcome_code = outcome_code
-        self._offsetConnect = offsetConnect
+    __slots__ = ()
 
+    @classmethod
+    def parse(cls, callStartDateTime, outcome_code, offsetConnect, offsetDisconnect, callEndDateTime, uniqueId,
+              queued, transferredToAgent, queued_call=False):
+        """
+        Create a record from the fields of a calling list row.
+        :param queued_call: if set, the record of a call used to simulate how long a queued call waits. Note that
+        these have only ever used the microseconds part of the call's length as the missing disconnect offset.
+        """
         # We don't always get a disconnect offset - we can calculate one however..
         if offsetDisconnect == 0:
-            self._offsetDisconnect = (self._callEndDateTime - self._callStartDateTime).microseconds / 1000
-        else:
-            self._offsetDisconnect = offsetDisconnect
+            length = datetime.strptime(callEndDateTime, DATE_FORMAT) - datetime.strptime(callStartDateTime,
+                                                                                        DATE_FORMAT)
+            offsetDisconnect = length.microseconds / 1000 if queued_call else length.total_seconds() * 1000
 
-        self.unique_id = uniqueId
-        self._causeCode = causeCode
+        return cls(outcome_code, offsetConnect, offsetDisconnect, uniqueId, queued == 1, transferredToAgent == 1)
 
-        if( type(queuedStartDateTime) == str):
-            self._queuedStartDateTime = datetime.strptime(queuedStartDateTime, DATE_FORMAT)
 
-        if (type(queuedEndDateTime) == str):
-            self._queuedEndDateTime = datetime.strptime(queuedEndDateTime, DATE_FORMAT)
+    def replay(self):
+        """
+        :return: a call of this record that has not been dialed
+        """
+        return CallStats.from_record(self)
 
-        self._queued = queued == 1
-        self._transferredToAgent = transferredToAgent == 1
 
-        # The time it takes to generate a call.
-        self._offset_call_creation = TIME_TO_CREATE_CALL
+class QueuedStats:
+    """
+    CallStartDateTime, OutcomeCode, OffsetConnect, OffsetAgentRoute, OffsetDisconnect,
+                 CallEndDateTime, UniqueId, CauseCode, QueuedStartDateTime, QueuedEndDateTime, Queued,
+                 TransferredToAgent
 
-        # A list of all the events that will happen to this call
-        self._future_events = []
-        self._call_state = None
+    Creates the CallRecord of a call used to simulate how long a queued call waits.
+    """
+
+    def __new__(cls, callStartDateTime, outcome_code, offsetConnect, offsetDisconnect,
+                callEndDateTime, uniqueId, causeCode, queuedStartDateTime, queuedEndDateTime, queued,
+                transferredToAgent):
+        return CallRecord.parse(callStartDateTime, outcome_code, offsetConnect, offsetDisconnect, callEndDateTime,
+                                uniqueId, queued, transferredToAgent, queued_call=True)
 
 
 class CallStats:
@@ -62,45 +82,89 @@ class CallStats:
     CallStartDateTime, OutcomeCode, OffsetConnect, OffsetAgentRoute, OffsetDisconnect,
                  CallEndDateTime, UniqueId, CauseCode, QueuedStartDateTime, QueuedEndDateTime, Queued,
                  TransferredToAgent
+
+    A call as it is dialed in one simulation. What the calling list says about the call is held in its CallRecord,
+    which is shared; only the state of the call in this simulation is kept here.
     """
 
+    # unique_id is copied from the record as the simulation looks it up for every event
+    __slots__ = ('record', 'unique_id', '_birth_time', '_call_state', '_future_events', '_talk_start_time')
+
+    # The time it takes to generate a call.
+    _offset_call_creation = TIME_TO_CREATE_CALL
+
     def __init__(self, callStartDateTime, outcomeCode, offsetConnect, offsetDisconnect,
                  callEndDateTime, uniqueId, causeCode, queuedStartDateTime, queuedEndDateTime, queued,
                  transferredToAgent):
+        self.record = CallRecord.parse(callStartDateTime, outcomeCode, offsetConnect, offsetDisconnect,
+                                       callEndDateTime, uniqueId, queued, transferredToAgent)
+        self.unique_id = uniqueId
+
+        # A list of all the events that will happen to this call
+        self._future_events = []
+        self._call_state = None
 
-        DATE_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
-        TIME_TO_CREATE_CALL = 3000 # 3s to create a call
+        self._birth_time = None
+        self._talk_start_time = None
 
-        self._callStartDateTime = datetime.strptime(callStartDateTime, DATE_FORMAT)
-        self.outcome_code = outcomeCode
-        self._offsetConnect = offsetConnect
-        self._callEndDateTime = datetime.strptime(callEndDateTime, DATE_FORMAT)
-        self.unique_id = uniqueId
-        self._causeCode = causeCode
+    @classmethod
+    def from_record(cls, record):
+        """
+        :param record: the CallRecord of the call
+        :return: a call of the record that has not been dialed
+        """
+        call = cls.__new__(cls)
+        call.record = record
+        call.unique_id = record.unique_id
+        # dial gives the call a list of its own
+        call._future_events = ()
+        call._call_state = None
+        call._birth_time = None
+        call._talk_start_time = None
+
+        return call
+
+    @classmethod
+    def from_offsets(cls, *fields):
+        """
+        Create a call from offsets that have already been worked out, eg for a test. The fields are those of
+        CallRecord, which is the one place calls are built from offsets (see CallTable.record).
+        """
+        return cls.from_record(CallRecord(*fields))
 
-        # We don't always get a disconnect offset - we can calculate one however..
-        if offsetDisconnect == 0:
-            self._offsetDisconnect = (self._callEndDateTime - self._callStartDateTime).total_seconds() * 1000
-        else:
-            self._offsetDisconnect = offsetDisconnect
 
-        if type(queuedStartDateTime) == str:
-            self._queuedStartDateTime = datetime.strptime(queuedStartDateTime, DATE_FORMAT)
+    @property
+    def outcome_code(self):
+        return self.record.outcome_code
 
-        if type(queuedEndDateTime) == str:
-            self._queuedEndDateTime = datetime.strptime(queuedEndDateTime, DATE_FORMAT)
 
-        self._queued = queued == 1
-        self._transferredToAgent = transferredToAgent == 1
+    @property
+    def _offsetConnect(self):
+        return self.record.offset_connect
 
-        # The time it takes to generate a call.
-        self._offset_call_creation = TIME_TO_CREATE_CALL
 
-        # A list of all the events that will happen to this call
-        self._future_events = []
-        self._call_state = None
+    @property
+    def _offsetDisconnect(self):
+        return self.record.offset_disconnect
 
-        self._birth_time = None
+
+    @property
+    def _queued(self):
+        return self.record.queued
+
+
+    @property
+    def _transferredToAgent(self):
+        return self.record.transferred_to_agent
+
+
+    def replay(self):
+        """
+        Create another call of the same record so it can be dialed again by another simulation without the two
+        sharing any state.
+        :return: a call of the record that has not been dialed
+        """
+        return CallStats.from_record(self.record)
 
 
     def dial(self, birth_time ):
@@ -119,7 +183,24 @@ class CallStats:
         :param current_time:
         :return:
         """
-        self._future_events.append(CallEvent(current_time + self._offsetDisconnect, CallState.disconnected))
+        self._talk_start_time = current_time
+        self._future_events.append(CallEvent(current_time + self.record.offset_disconnect, CallState.disconnected))
+
+
+    def ringing_time(self, current_time):
+        """
+        :param current_time:
+        :return: how long the call has been ringing for
+        """
+        return max(0, current_time - self._birth_time - self._offset_call_creation)
+
+
+    def talk_time(self, current_time):
+        """
+        :param current_time:
+        :return: how long the call has been talking to an agent for
+        """
+        return current_time - self._talk_start_time
 
 
     def queued(self, current_time, queued_call):
@@ -130,7 +211,7 @@ class CallStats:
         :param queued_call:
         :return:
         """
-        self._future_events.append(CallEvent(current_time + queued_call._offsetDisconnect, CallState.disconnected))
+        self._future_events.append(CallEvent(current_time + queued_call.offset_disconnect, CallState.disconnected))
 
 
     def calculate_future_events(self):
@@ -138,18 +219,20 @@ class CallStats:
         Calculate all the state transitions and the time in which they will occur.
         :return: Nothing
         """
+        record = self.record
+
         # Handle the situation where the call doesn't get answered
-        if self.outcome_code in ['O', 'E', 'AM', 'NU', 'CF']:
+        if record.outcome_code in NOT_ANSWERED_OUTCOME_CODES:
             self._future_events.append(CallEvent(self._birth_time + self._offset_call_creation, CallState.ringing))
-            self._future_events.append(CallEvent(self._birth_time + self._offsetDisconnect, CallState.disconnected))
+            self._future_events.append(CallEvent(self._birth_time + record.offset_disconnect, CallState.disconnected))
 
         # Handle the situation where the call is answered
-        elif self.outcome_code in ['TR', 'QD', 'QT', 'AC']:
+        elif record.outcome_code in ANSWERED_OUTCOME_CODES:
             self._future_events.append(CallEvent(self._birth_time + self._offset_call_creation, CallState.ringing))
-            self._future_events.append(CallEvent(self._birth_time + self._offsetDisconnect, CallState.answered))
+            self._future_events.append(CallEvent(self._birth_time + record.offset_disconnect, CallState.answered))
 
         else:
-            log.error('Unknown outcome: {}'.format(self.outcome_code))
+            log.error('Unknown outcome: {}'.format(record.outcome_code))
 
 
     def next_event(self, current_time):
@@ -0,0 +1,227 @@
+import argparse
+import math
+import os
+from collections import namedtuple
+import logging as log
+
+import numpy as np
+
+from callstats import ANSWERED_OUTCOME_CODES
+from calling_list import CallingList
+from simulation import Simulation
+
+# The KPIs predicted for a dial level and number of agents:
+#   talk_time:             the fraction of the agents' time spent talking
+#   abandonment_rate:      the fraction of answered calls that are abandoned (queue full, or hung up while queued)
+#   answered_per_second:   the rate at which calls are answered at the remote end
+#   mean_queue_length:     the average number of answered calls waiting for an agent
+#   queue_full_probability: the chance an answered call finds no agent free and the queue full
+Estimate = namedtuple('Estimate', ['talk_time', 'abandonment_rate', 'answered_per_second', 'mean_queue_length',
+                                   'queue_full_probability'])
+
+
+class ConstantCallEstimator:
+    """
+    Estimates the talk time and abandonment rate of SimulationConstantCall without running it.
+
+    The answered calls are treated as an Erlang-A queue (M/M/c+M): they arrive at dial level * answer probability
+    per second, each agent talks for the mean talk time, callers waiting in the queue hang up after the mean
+    patience (the time queued calls waited before disconnecting) and no more than LIMIT_QUEUED_CALLS wait at once -
+    as in the simulation, an answered call that finds the queue full is abandoned. The steady state of the
+    birth-death chain over the number of answered calls in the system gives the KPIs.
+
+    The ramp up at the start of the shift, the agents logging off at the end and the calling list running out are
+    not modelled, so this is for screening dial levels rather than replacing the simulation.
+    """
+
+    def __init__(self, answer_probability, mean_talk_time, mean_patience, limit_queued_calls=None):
+        """
+        :param answer_probability: the fraction of dialed calls that are answered at the remote end
+        :param mean_talk_time: the average time (ms) an agent talks to an answered call
+        :param mean_patience: the average time (ms) a queued call waits before hanging up
+        :param limit_queued_calls: the most calls that can be queued (defaults to Simulation.LIMIT_QUEUED_CALLS)
+        """
+        self.answer_probability = answer_probability
+        self.mean_talk_time = mean_talk_time
+        self.mean_patience = mean_patience
+        self.limit_queued_calls = Simulation.LIMIT_QUEUED_CALLS if limit_queued_calls is None else limit_queued_calls
+
+
+    @classmethod
+    def from_calls(cls, calls, queued_calls=()):
+        """
+        Measure the calls of a calling list (or a window onto the calls a simulation has made).
+        :param calls: CallStats
+        :param queued_calls: the CallRecords used to simulate how long queued calls wait
+        :return: the estimator
+        """
+        talk_times = [call._offsetDisconnect for call in calls if call.outcome_code in ANSWERED_OUTCOME_CODES]
+        patience = [queued_call.offset_disconnect for queued_call in queued_calls]
+
+        return cls(len(talk_times) / len(calls) if len(calls) > 0 else 0,
+                   float(np.mean(talk_times)) if len(talk_times) > 0 else 0,
+                   float(np.mean(patience)) if len(patience) > 0 else 0)
+
+
+    @classmethod
+    def from_calling_list(cls, calling_list):
+        """
+        Measure a calling list. A parsed calling list is measured a column at a time.
+        :param calling_list:
+        :return: the estimator
+        """
+        table = calling_list._table
+        if table is None:
+            return cls.from_calls(calling_list._calls, calling_list._queued_calls)
+
+        answered_codes = [i for i, code in enumerate(table.outcome_codes) if code in ANSWERED_OUTCOME_CODES]
+        answered = np.isin(table.outcomes, answered_codes)
+        patience = table.queued_offsets_disconnect[table.queued_indices]
+
+        return cls(float(answered.mean()) if len(table) > 0 else 0,
+                   float(table.offsets_disconnect[answered].mean()) if answered.any() else 0,
+                   float(patience.mean()) if len(patience) > 0 else 0)
+
+
+    @classmethod
+    def from_simulation(cls, simulation, mean_patience=None):
+        """
+        Use the statistics a simulation has gathered so far.
+        :param simulation:
+        :param mean_patience: the average time (ms) a queued call waits. The simulation doesn't track this, so by
+        default it is measured from the simulation's calling list.
+        :return: the estimator
+        """
+        if mean_patience is None:
+            mean_patience = cls.from_calling_list(simulation._calling_list).mean_patience
+
+        answer_probability = 0 if simulation.total_number_calls == 0 else \
+            simulation.total_number_answered_calls / simulation.total_number_calls
+        mean_talk_time = 0 if simulation.total_number_talking_calls == 0 else \
+            simulation.total_agent_talk_time / simulation.total_number_talking_calls
+
+        return cls(answer_probability, mean_talk_time, mean_patience, simulation.LIMIT_QUEUED_CALLS)
+
+
+    def estimate(self, dial_level, number_agents):
+        """
+        :param dial_level: calls dialed per second
+        :param number_agents:
+        :return: the Estimate
+        """
+        arrival_rate = max(dial_level, 0) * self.answer_probability
+
+        if arrival_rate == 0 or self.mean_talk_time <= 0:
+            return Estimate(0, 0, arrival_rate, 0, 0)
+
+        service_rate = Simulation.ONE_SECOND / self.mean_talk_time
+
+        # Callers that never wait can't be queued
+        limit_queued_calls = self.limit_queued_calls if self.mean_patience > 0 else 0
+        abandon_rate = Simulation.ONE_SECOND / self.mean_patience if self.mean_patience > 0 else 0
+
+        # The rate at which calls leave when n answered calls are in the system (n = 1 .. agents + queue)
+        n = np.arange(1, number_agents + limit_queued_calls + 1)
+        departure_rate = np.minimum(n, number_agents) * service_rate + np.maximum(n - number_agents, 0) * abandon_rate
+
+        if len(n) == 0:
+            # No agents and no queue - every answered call is abandoned
+            return Estimate(0, 1, arrival_rate, 0, 1)
+
+        # The steady state probabilities, worked out in logs so large numbers of agents don't overflow
+        log_p = np.concatenate(([0.0], np.cumsum(math.log(arrival_rate) - np.log(departure_rate))))
+        p = np.exp(log_p - log_p.max())
+        p /= p.sum()
+
+        states = np.arange(len(p))
+        talking = np.minimum(states, number_agents)
+        queued = np.maximum(states - number_agents, 0)
+
+        mean_queue_length = float((p * queued).sum())
+        queue_full_probability = float(p[-1])
+
+        talk_time = float((p * talking).sum()) / number_agents if number_agents > 0 else 0
+
+        # Calls are abandoned when they find the queue full or hang up while waiting
+        abandonment_rate = queue_full_probability + abandon_rate * mean_queue_length / arrival_rate
+
+        return Estimate(talk_time, min(abandonment_rate, 1), arrival_rate, mean_queue_length, queue_full_probability)
+
+
+def validate(calling_list, dial_levels, agent_counts, duration_shift=Simulation.DEFAULT_SHIFT_LENGTH,
+             number_processes=1, event_driven=True):
+    """
+    Compare the estimates against full runs of SimulationConstantCall.
+    :param calling_list: the parsed calling list
+    :param dial_levels:
+    :param agent_counts:
+    :param duration_shift:
+    :param number_processes: the number of worker processes to run the simulations in
+    :param event_driven:
+    :return: the sweep results (see sweep.run_sweep) with the estimates and their errors added
+    """
+    # sweep runs SimulationGenetic, which can use this module to pre-screen chromosomes
+    import sweep
+
+    estimator = ConstantCallEstimator.from_calling_list(calling_list)
+
+    points = sweep.build_grid(['constant'], dial_levels, agent_counts, [duration_shift])
+    results = sweep.run_sweep(calling_list, points, number_processes=number_processes, event_driven=event_driven)
+
+    estimates = [estimator.estimate(point.dial_level, point.number_agents) for point in points]
+    results['estimated_talk_time'] = [e.talk_time for e in estimates]
+    results['estimated_abandonment_rate'] = [e.abandonment_rate for e in estimates]
+    results['talk_time_error'] = results.estimated_talk_time - results.talk_time
+    results['abandonment_rate_error'] = results.estimated_abandonment_rate - results.abandonment_rate
+
+    return results
+
+
+def main(argv=None):
+    """
+    Estimate the KPIs of constant dial levels, optionally checking them against full simulations, eg:
+
+      python estimator.py small.csv --dial-levels 0.5 1 2.5 5 10 --agents 20 40 80 --validate
+
+    :param argv:
+    :return:
+    """
+    parser = argparse.ArgumentParser(description='Estimate the talk time and abandonment rate of constant dial levels')
+    parser.add_argument('calling_list', help='the calling list (csv)')
+    parser.add_argument('--compiled', help='the compiled calling list, built from the csv if out of date')
+    parser.add_argument('--dial-levels', nargs='+', type=float, default=[1])
+    parser.add_argument('--agents', nargs='+', type=int, default=[40])
+    parser.add_argument('--validate', action='store_true', help='compare the estimates against full simulations')
+    parser.add_argument('--shift-minutes', type=float,
+                        default=Simulation.DEFAULT_SHIFT_LENGTH / Simulation.ONE_MINUTE)
+    parser.add_argument('--processes', type=int, default=os.cpu_count())
+    args = parser.parse_args(argv)
+
+    log.basicConfig(level=log.INFO, format='%(levelname)-8s %(message)s')
+
+    cl = CallingList()
+    if args.compiled is not None:
+        cl.load_compiled(args.compiled, args.calling_list)
+    else:
+        cl.load(args.calling_list)
+        cl.parse()
+
+    if args.validate:
+        results = validate(cl, args.dial_levels, args.agents, int(args.shift_minutes * Simulation.ONE_MINUTE),
+                           number_processes=args.processes)
+        log.info('\n' + results[['dial_level', 'number_agents', 'talk_time', 'estimated_talk_time',
+                                 'abandonment_rate', 'estimated_abandonment_rate']].to_string(index=False))
+        return
+
+    estimator = ConstantCallEstimator.from_calling_list(cl)
+    log.info('Answer probability {:.3f}, mean talk time {:.0f}ms, mean patience {:.0f}ms'.format(
+        estimator.answer_probability, estimator.mean_talk_time, estimator.mean_patience))
+    for number_agents in args.agents:
+        for dial_level in args.dial_levels:
+            estimate = estimator.estimate(dial_level, number_agents)
+            log.info('dial level {:g}, {} agents: talk time {:.2f}%, abandonment rate {:.2f}%'.format(
+                dial_level, number_agents, estimate.talk_time * 100, estimate.abandonment_rate * 100))
+
+
+if __name__ == '__main__':
+    main()
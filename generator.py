@@ -0,0 +1,278 @@
+import argparse
+import logging as log
+
+import numpy as np
+import pandas as pd
+
+from calling_list import CallingList
+from callstats import DATE_FORMAT, OUTCOME_CODES
+
+# The number of calls generated at a time
+DEFAULT_CHUNK_SIZE = 100000
+
+# Gaps between calls longer than this (ms) are breaks between shifts rather than part of the dialing
+MAX_START_GAP = 10 * 60 * 1000
+
+# The columns of a calling list file, in order
+COLUMNS = ('CallStartDateTime', 'List', 'OutcomeCode', 'OffsetConnect', 'OffsetDisconnect', 'CallEndDateTime',
+           'UniqueId', 'CauseCode', 'QueuedStartDateTime', 'QueuedEndDateTime', 'Queued', 'TransferredToAgent',
+           'MediaTerminal')
+
+
+class CallingListModel:
+    """
+    The make-up of a calling list, fitted from a real one, from which synthetic calling lists of any size can be
+    generated.
+
+    The outcome codes are drawn with the frequencies they have in the real calling list. The rest of each call - its
+    connect and disconnect offsets, how long it lasted, whether it was queued and whether it was transferred to an
+    agent - is taken from a real call with the same outcome drawn at random, so the offsets follow the real
+    distribution for each outcome and stay consistent with each other. The gaps between the starts of the calls are
+    drawn from the real gaps in the same way, unless a dialing rate is given.
+
+    Calls are generated a chunk at a time, so millions of them can be written to disk or parsed into a CallingList
+    without ever being held as one DataFrame.
+    """
+
+    def __init__(self, outcome_codes, outcome_probabilities, samples, start_gaps, list_name='SYN'):
+        """
+        :param outcome_codes: the outcome codes to draw from
+        :param outcome_probabilities: the probability of each outcome code
+        :param samples: for each outcome code with a non-zero probability, a DataFrame of real calls with that
+        outcome with the columns OffsetConnect, OffsetDisconnect, Duration (ms), Queued and TransferredToAgent
+        :param start_gaps: the gaps (ms) between the starts of consecutive calls to draw from
+        :param list_name: the List column of the generated calls
+        """
+        if len(outcome_codes) != len(outcome_probabilities):
+            raise ValueError('Need a probability for each outcome code')
+
+        for code, probability in zip(outcome_codes, outcome_probabilities):
+            if probability > 0 and len(samples.get(code, ())) == 0:
+                raise ValueError('No calls with outcome {} to draw from'.format(code))
+
+        self.outcome_codes = list(outcome_codes)
+        self.outcome_probabilities = np.asarray(outcome_probabilities, dtype=np.float64)
+        self.outcome_probabilities /= self.outcome_probabilities.sum()
+        self.samples = {code: samples[code].reset_index(drop=True) for code in samples}
+        self.start_gaps = np.asarray(start_gaps, dtype=np.int64)
+        if len(self.start_gaps) == 0:
+            self.start_gaps = np.zeros(1, dtype=np.int64)
+        self.list_name = list_name
+
+
+    @classmethod
+    def fit(cls, df, list_name='SYN', max_start_gap=MAX_START_GAP):
+        """
+        :param df: a calling list as read from the csv file
+        :param list_name:
+        :param max_start_gap: longer gaps between the starts of calls aren't drawn from
+        :return: the model of the calling list
+        """
+        if len(df) == 0:
+            raise ValueError('Cannot fit a model to an empty calling list')
+
+        # Exports can have blanks. A missing flag is taken as not set, but a call missing its times or offsets
+        # can't be copied so is left out.
+        df = df.fillna({'Queued': 0, 'TransferredToAgent': 0})
+        complete = df.dropna(subset=['CallStartDateTime', 'CallEndDateTime', 'OffsetConnect', 'OffsetDisconnect'])
+        if len(complete) < len(df):
+            log.info('Leaving {} calls with missing times or offsets out of the model'.format(len(df) - len(complete)))
+            df = complete
+            if len(df) == 0:
+                raise ValueError('No calls in the calling list have all their times and offsets')
+
+        call_start = pd.to_datetime(df.CallStartDateTime, format=DATE_FORMAT)
+        call_end = pd.to_datetime(df.CallEndDateTime, format=DATE_FORMAT)
+
+        calls = pd.DataFrame({'OutcomeCode': df.OutcomeCode.fillna('').to_numpy(),
+                              'OffsetConnect': df.OffsetConnect.to_numpy(np.int64),
+                              'OffsetDisconnect': df.OffsetDisconnect.to_numpy(np.int64),
+                              'Duration': ((call_end - call_start).dt.total_seconds() * 1000).round().to_numpy(
+                                  np.int64),
+                              'Queued': df.Queued.to_numpy(np.int64),
+                              'TransferredToAgent': df.TransferredToAgent.to_numpy(np.int64)})
+
+        # The outcome codes we know about come first (even if they weren't seen) followed by any others
+        outcome_codes = list(OUTCOME_CODES)
+        outcome_codes.extend(code for code in pd.unique(calls.OutcomeCode) if code not in outcome_codes)
+        counts = calls.OutcomeCode.value_counts()
+        probabilities = [counts.get(code, 0) / len(calls) for code in outcome_codes]
+
+        samples = {code: sample.drop(columns='OutcomeCode') for code, sample in calls.groupby('OutcomeCode')}
+
+        start = np.sort(call_start.to_numpy().astype('datetime64[ms]').astype(np.int64))
+        start_gaps = np.diff(start)
+        start_gaps = start_gaps[start_gaps <= max_start_gap]
+
+        return cls(outcome_codes, probabilities, samples, start_gaps, list_name)
+
+
+    @classmethod
+    def from_csv(cls, filename, list_name='SYN'):
+        """
+        :param filename: a calling list file
+        :param list_name:
+        :return: the model of the calling list
+        """
+        log.info('Fitting calling list model to: {}'.format(filename))
+        return cls.fit(pd.read_csv(filename), list_name)
+
+
+    def chunks(self, number_calls, chunk_size=DEFAULT_CHUNK_SIZE, seed=None, calls_per_second=None,
+               start_time='2013-12-12 13:00:00'):
+        """
+        Generate a calling list a chunk at a time.
+        :param number_calls: the number of calls to generate
+        :param chunk_size: the number of calls in each chunk
+        :param seed: the random seed. The same seed always gives the same calls, whatever the chunk size.
+        :param calls_per_second: if given the calls are started at this rate rather than with the real gaps
+        :param start_time: the start of the first call
+        :return: an iterator of DataFrames in the layout of a calling list file
+        """
+        rng = np.random.default_rng(seed)
+        next_start = pd.Timestamp(start_time).to_datetime64().astype('datetime64[ms]').astype(np.int64)
+
+        # Draw everything random in fixed size blocks so the calls don't depend on the chunk size
+        block_size = 10000
+        buffered = []
+        number_buffered = 0
+        first = 0
+
+        while first < number_calls:
+            while number_buffered < min(chunk_size, number_calls - first):
+                block = self._draw(rng, min(block_size, number_calls - first - number_buffered), calls_per_second)
+                buffered.append(block)
+                number_buffered += len(block[0])
+
+            columns = [np.concatenate(column) for column in zip(*buffered)]
+            size = min(chunk_size, number_calls - first)
+            buffered = [[column[size:] for column in columns]]
+            number_buffered -= size
+
+            chunk, next_start = self._chunk(first, next_start, *[column[:size] for column in columns])
+            first += size
+            yield chunk
+
+
+    def _draw(self, rng, size, calls_per_second):
+        """
+        :return: the outcome of each call, the gap after it and the row of the real call it is modelled on
+        """
+        outcomes = rng.choice(len(self.outcome_codes), size, p=self.outcome_probabilities)
+
+        if calls_per_second is None:
+            gaps = self.start_gaps[rng.integers(0, len(self.start_gaps), size)]
+        else:
+            gaps = np.full(size, int(round(1000 / calls_per_second)), dtype=np.int64)
+
+        # For each call the row of the sample of its outcome that it copies
+        rows = np.zeros(size, dtype=np.int64)
+        for index, code in enumerate(self.outcome_codes):
+            mask = outcomes == index
+            count = int(mask.sum())
+            if count > 0:
+                rows[mask] = rng.integers(0, len(self.samples[code]), count)
+
+        return outcomes, gaps, rows
+
+
+    def _chunk(self, first, next_start, outcomes, gaps, rows):
+        """
+        :return: the DataFrame of the calls, and the start of the call after them
+        """
+        size = len(outcomes)
+        columns = {column: np.zeros(size, dtype=np.int64) for column in ('OffsetConnect', 'OffsetDisconnect',
+                                                                          'Duration', 'Queued', 'TransferredToAgent')}
+        for index, code in enumerate(self.outcome_codes):
+            mask = outcomes == index
+            if mask.any():
+                sample = self.samples[code]
+                for column, values in columns.items():
+                    values[mask] = sample[column].to_numpy()[rows[mask]]
+
+        # The first call starts at next_start, and each gap is the time to the start of the call after
+        start = next_start + np.cumsum(gaps) - gaps
+        end = start + columns['Duration']
+
+        df = pd.DataFrame({'CallStartDateTime': self._format(start),
+                           'List': self.list_name,
+                           'OutcomeCode': np.asarray(self.outcome_codes, dtype=object)[outcomes],
+                           'OffsetConnect': columns['OffsetConnect'],
+                           'OffsetDisconnect': columns['OffsetDisconnect'],
+                           'CallEndDateTime': self._format(end),
+                           'UniqueId': np.char.add('synthetic:', np.arange(first, first + size).astype(str)),
+                           'CauseCode': np.nan,
+                           'QueuedStartDateTime': np.nan,
+                           'QueuedEndDateTime': np.nan,
+                           'Queued': columns['Queued'],
+                           'TransferredToAgent': columns['TransferredToAgent'],
+                           'MediaTerminal': np.nan}, columns=COLUMNS)
+
+        return df, next_start + int(gaps.sum())
+
+
+    @staticmethod
+    def _format(times):
+        """
+        :param times: ms since the epoch
+        :return: the times as they're written in a calling list file
+        """
+        return np.char.replace(np.datetime_as_string(times.astype('datetime64[ms]'), unit='ms'), 'T', ' ')
+
+
+    def generate(self, number_calls, seed=None, calls_per_second=None):
+        """
+        :return: a calling list (see chunks) as one DataFrame
+        """
+        return pd.concat(self.chunks(number_calls, seed=seed, calls_per_second=calls_per_second), ignore_index=True)
+
+
+    def write_csv(self, filename, number_calls, chunk_size=DEFAULT_CHUNK_SIZE, seed=None, calls_per_second=None):
+        """
+        Write a calling list file a chunk at a time.
+        :return:
+        """
+        log.info('Writing {} synthetic calls to: {}'.format(number_calls, filename))
+        with open(filename, 'w', newline='') as f:
+            header = True
+            for chunk in self.chunks(number_calls, chunk_size, seed, calls_per_second):
+                chunk.to_csv(f, header=header, index=False, na_rep='NULL')
+                header = False
+
+
+    def calling_list(self, number_calls, chunk_size=DEFAULT_CHUNK_SIZE, seed=None, calls_per_second=None):
+        """
+        :return: a parsed CallingList of the generated calls, parsed a chunk at a time
+        """
+        cl = CallingList()
+        cl.parse_chunks(self.chunks(number_calls, chunk_size, seed, calls_per_second))
+        return cl
+
+
+def main(argv=None):
+    """
+    Write a synthetic calling list modelled on a real one, eg:
+
+      python generator.py test.csv big.csv --calls 5000000
+
+    :param argv:
+    :return:
+    """
+    parser = argparse.ArgumentParser(description='Generate a synthetic calling list modelled on a real one')
+    parser.add_argument('model', help='the calling list (csv) to model')
+    parser.add_argument('output', help='the calling list (csv) to write')
+    parser.add_argument('--calls', type=int, required=True)
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--calls-per-second', type=float, help='dial at this rate rather than with the real gaps')
+    parser.add_argument('--list-name', default='SYN')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    log.basicConfig(level=log.INFO, format='%(asctime)s %(levelname)-8s %(message)s', datefmt='%m-%d %H:%M')
+
+    model = CallingListModel.from_csv(args.model, args.list_name)
+    model.write_csv(args.output, args.calls, args.chunk_size, args.seed, args.calls_per_second)
+
+
+if __name__ == '__main__':
+    main()
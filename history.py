@@ -0,0 +1,266 @@
+import importlib.util
+import tempfile
+import zipfile
+import numpy as np
+import pandas as pd
+import logging as log
+
+# The columns recorded at each checkpoint, with their types
+HISTORY_COLUMNS = (('current_time', np.int64),
+                   ('number_created_calls', np.int64),
+                   ('number_ringing_calls', np.int64),
+                   ('number_queued_calls', np.int64),
+                   ('number_talking_calls', np.int64),
+                   ('number_disconnected_calls', np.int64),
+                   ('number_free_agents', np.int64),
+                   ('number_busy_agents', np.int64),
+                   ('total_number_answered_calls', np.int64),
+                   ('total_number_not_answered_calls', np.int64),
+                   ('total_number_abandon_calls', np.int64),
+                   ('total_number_calls', np.int64),
+                   ('total_agent_idle_time', np.int64),
+                   ('total_agent_talk_time', np.int64),
+                   ('current_talk_time', np.float64),
+                   ('current_abandonment_rate', np.float64))
+
+# The kind of file the history is written to when nobody chooses one. Parquet is streamed, so is used if it can be.
+DEFAULT_EXTENSION = '.parquet' if importlib.util.find_spec('pyarrow') is not None else '.pkl'
+
+
+class HistoryRecorder:
+    """
+    Records a snapshot of the state of the call centre every interval ms.
+
+    If the simulation models its agents individually (see AgentTeam) the utilisation of each agent is recorded too,
+    as the columns agent_utilisation_0, agent_utilisation_1, etc.
+
+    Snapshots are written straight into preallocated columns, a chunk of rows at a time. Once a chunk fills it is
+    written out, so memory stays flat however long the shift or fine the interval:
+      .parquet - each chunk is streamed to the file (needs pyarrow)
+      .npz     - the chunks go to a temporary file, and each column is copied into the compressed NumPy file in
+                 turn when the simulation finishes
+      .pkl     - the chunks go to a temporary file and are made into a pickled DataFrame indexed by current_time
+                 (as history.pkl always was) when the simulation finishes. This needs the whole history in memory
+                 at once, so prefer .parquet or .npz for long runs.
+    Without a file the chunks are kept in memory.
+    """
+
+    def __init__(self, filename=None, interval=60000, chunk_size=4096):
+        """
+        :param filename: the file to write the history to, or None to only keep it in memory
+        :param interval: the number of milliseconds between each snapshot
+        :param chunk_size: the number of snapshots in each chunk
+        """
+        self.filename = filename
+        self.interval = interval
+        self._chunk_size = chunk_size
+
+        self._chunks = []
+        self._chunk = None
+        self._rows_in_chunk = 0
+
+        # The temporary file the finished chunks are written to (for .npz and .pkl), and where each column of each
+        # chunk is in it
+        self._spill = None
+        self._spilled = []
+
+        self._writer = None
+        self._streaming = filename is not None and filename.endswith('.parquet')
+
+        # The number of snapshots taken
+        self.number_rows = 0
+
+
+    def record(self, simulation):
+        """
+        Take a snapshot of the simulation.
+        :param simulation:
+        :return:
+        """
+        if self._chunk is None:
+            self._chunk = {name: np.empty(self._chunk_size, dtype) for name, dtype in HISTORY_COLUMNS}
+            self._rows_in_chunk = 0
+
+        row = self._rows_in_chunk
+        chunk = self._chunk
+        chunk['current_time'][row] = simulation._current_time
+        chunk['number_created_calls'][row] = simulation.number_created_calls()
+        chunk['number_ringing_calls'][row] = simulation.number_ringing_calls()
+        chunk['number_queued_calls'][row] = simulation.number_queued_calls()
+        chunk['number_talking_calls'][row] = simulation.number_talking_calls()
+        chunk['number_disconnected_calls'][row] = simulation.number_disconnected_calls()
+        chunk['number_free_agents'][row] = simulation._number_free_agents
+        chunk['number_busy_agents'][row] = simulation._number_busy_agents
+        chunk['total_number_answered_calls'][row] = simulation.total_number_answered_calls
+        chunk['total_number_not_answered_calls'][row] = simulation.total_number_not_answered_calls
+        chunk['total_number_abandon_calls'][row] = simulation.total_number_abandon_calls
+        chunk['total_number_calls'][row] = simulation.total_number_calls
+        chunk['total_agent_idle_time'][row] = simulation.total_agent_idle_time
+        chunk['total_agent_talk_time'][row] = simulation.total_agent_talk_time
+        chunk['current_talk_time'][row] = simulation._current_talk_time
+        chunk['current_abandonment_rate'][row] = simulation._current_abandonment_rate
+
+        agents = simulation._agents
+        if agents is not None:
+            if 'agent_utilisation' not in chunk:
+                chunk['agent_utilisation'] = np.empty((self._chunk_size, len(agents.agents)), np.float64)
+            chunk['agent_utilisation'][row] = agents.utilisation(simulation._current_time)
+
+        self._rows_in_chunk += 1
+        self.number_rows += 1
+
+        if self._rows_in_chunk == self._chunk_size:
+            self._end_chunk()
+
+
+    def _end_chunk(self):
+        if self._chunk is None or self._rows_in_chunk == 0:
+            return
+
+        chunk = {name: column[:self._rows_in_chunk] for name, column in self._chunk.items()}
+        self._chunk = None
+        self._rows_in_chunk = 0
+
+        if self._streaming:
+            self._write_parquet(self._flatten(chunk))
+        elif self.filename is not None:
+            self._spill_chunk(chunk)
+        else:
+            self._chunks.append(chunk)
+
+
+    def _spill_chunk(self, chunk):
+        if self._spill is None:
+            self._spill = tempfile.TemporaryFile()
+
+        positions = {}
+        for name, column in chunk.items():
+            positions[name] = self._spill.tell()
+            np.save(self._spill, column)
+        self._spilled.append(positions)
+
+
+    def _column(self, name):
+        """
+        :param name:
+        :return: one column of the snapshots held in memory or the temporary file
+        """
+        if len(self._spilled) == 0:
+            return np.concatenate([chunk[name] for chunk in self._chunks])
+
+        parts = []
+        for positions in self._spilled:
+            self._spill.seek(positions[name])
+            parts.append(np.load(self._spill))
+        self._spill.seek(0, 2)
+        return np.concatenate(parts)
+
+
+    def _write_parquet(self, chunk):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError('pyarrow is needed to write the history to a Parquet file')
+
+        table = pa.table(chunk)
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.filename, table.schema)
+        self._writer.write_table(table)
+
+
+    def columns(self):
+        """
+        :return: the snapshots taken, as a dict of column name to array. A history streamed to a Parquet file is
+        read back from it, so can only be had once it has been closed.
+        """
+        self._end_chunk()
+
+        if self._streaming:
+            return self._read_parquet()
+
+        names = self._column_names()
+        if names is None:
+            return {name: np.empty(0, dtype) for name, dtype in HISTORY_COLUMNS}
+
+        if len(self._spilled) == 0 and len(self._chunks) > 1:
+            self._chunks = [{name: self._column(name) for name in names}]
+
+        return {name: self._column(name) for name in names}
+
+
+    def _column_names(self):
+        if len(self._spilled) > 0:
+            return list(self._spilled[0])
+        if len(self._chunks) > 0:
+            return list(self._chunks[0])
+        return None
+
+
+    def _read_parquet(self):
+        if self._writer is not None:
+            raise ValueError('The history is still being written to {}'.format(self.filename))
+
+        if self.number_rows == 0:
+            return {name: np.empty(0, dtype) for name, dtype in HISTORY_COLUMNS}
+
+        import pyarrow.parquet as pq
+        table = pq.read_table(self.filename)
+        return {name: table.column(name).to_numpy() for name in table.column_names}
+
+
+    @staticmethod
+    def _flatten(columns):
+        # Split the per-agent utilisation into a column for each agent
+        if 'agent_utilisation' not in columns:
+            return columns
+
+        columns = dict(columns)
+        utilisation = columns.pop('agent_utilisation')
+        for i in range(utilisation.shape[1]):
+            columns['agent_utilisation_{}'.format(i)] = utilisation[:, i]
+        return columns
+
+
+    def to_dataframe(self):
+        """
+        :return: the snapshots held in memory, indexed by the time they were taken
+        """
+        df = pd.DataFrame(self._flatten(self.columns()))
+        df.index = df['current_time'].to_numpy()
+        return df
+
+
+    def close(self):
+        """
+        Write out any snapshots that have not yet been written.
+        :return:
+        """
+        self._end_chunk()
+
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+        if self.filename is None or self._streaming:
+            return
+
+        log.info('Writing history to {}'.format(self.filename))
+
+        if self.filename.endswith('.npz'):
+            self._write_npz()
+        else:
+            self.to_dataframe().to_pickle(self.filename)
+
+
+    def _write_npz(self):
+        # As np.savez_compressed, but only one column is read back into memory at a time
+        names = self._column_names()
+        if names is None:
+            names = [name for name, _ in HISTORY_COLUMNS]
+
+        with zipfile.ZipFile(self.filename, 'w', zipfile.ZIP_DEFLATED, allowZip64=True) as f:
+            for name in names:
+                column = self._column(name) if self.number_rows > 0 else np.empty(0, dict(HISTORY_COLUMNS)[name])
+                with f.open(name + '.npy', 'w', force_zip64=True) as entry:
+                    np.lib.format.write_array(entry, column, allow_pickle=False)
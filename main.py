@@ -4,18 +4,22 @@ from simulation_genetic import SimulationGenetic
 from simulation_analytic import SimulationAnalytic
 
 from calling_list import CallingList
+from tracing import Tracer
+import tracing
 import logging as log
 import random
 import sys
 
 
-def setup_logging():
+def setup_logging(file_level=log.DEBUG):
     """
-    Setup the logging. INFO and above are logged to console.
-    DEBUG and above is logged to file (this can stretch to hundreds of Mb if running the genetic algorithm)
+    Setup the logging. INFO and above are logged to console, and file_level and above to file.
+    The progress of each call isn't logged - see the tracer in main - so at DEBUG the file only gains the counters
+    the simulation reports every REPORTING_INTERVAL (see DetailReporter), and stays small. Use INFO to leave them out.
+    :param file_level:
     :return:
     """
-    log.basicConfig(level=log.DEBUG,
+    log.basicConfig(level=file_level,
                     format='%(asctime)s %(levelname)-8s %(message)s',
                     datefmt='%m-%d %H:%M',
                     filename='logfile.log',
@@ -51,29 +55,34 @@ def main():
     # Make sure we can reproduce our results
     random.seed(42)
 
-    # Create one calling list
+    # Create one calling list. The parsed calling list is saved alongside so later runs don't need to parse it again.
     cl = CallingList()
-    cl.load('small.csv')
-    cl.parse()
+    cl.load_compiled('small.compiled', 'small.csv')
+
+    # A structured trace of every call (and the dial levels chosen) can be written by giving the tracer a filename,
+    # eg Tracer('trace.jsonl.gz', ...). Without one nothing is traced.
+    tracer = Tracer(None, levels={'calls': tracing.DEBUG, 'dialer': tracing.DEBUG})
 
     # The constant rate dialer. Changing the parameter will change the dial level. This algorithm will complete
     # fairly quickly.
-    #cc = SimulationConstantCall(2.5, number_agents=40)
+    #cc = SimulationConstantCall(2.5, number_agents=40, tracer=tracer)
 
     # The progressive dialer (aka free agent). This algorithm waits until an agent is free and then generates
     # a call for them. Similar to the constant call algorithm, this one is also quick.
-    #cc = SimulationFreeAgent(number_agents=80)
+    #cc = SimulationFreeAgent(number_agents=80, tracer=tracer)
 
-    # The generic algorithm. This one will take a long time to run and outputs a large debug logfile (hundreds of Mb)
-    # You might want to comment out the logging to file.
-    #cc = SimulationGenetic(number_agents=80)
+    # The generic algorithm. This one will take a long time to run. Give the tracer a filename to see each call and
+    # the dial levels it chooses.
+    #cc = SimulationGenetic(number_agents=80, tracer=tracer)
 
     # The analytic algorithm. There are problems with this and I would question whether it will even work using real
     # data rather than synthetic data.
 
-    #cc = SimulationAnalytic()
+    #cc = SimulationAnalytic(tracer=tracer)
     cc.start(cl)
 
+    tracer.close()
+
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,286 @@
+import heapq
+from collections import namedtuple
+import logging as log
+
+import pandas as pd
+
+from reporting import SummaryReporter
+from simulation import Simulation
+
+# A number of agents who all have the same skills
+AgentGroup = namedtuple('AgentGroup', ['number_agents', 'skills'])
+
+# A calling list dialed by its own simulation (and so its own dialing algorithm). Its calls go to agents with the
+# skill and, when queued, are answered before the calls of campaigns with a lower priority.
+Campaign = namedtuple('Campaign', ['name', 'simulation', 'calling_list', 'skill', 'priority'])
+
+
+class AgentPool:
+    """
+    Agents shared by several simulations, in groups with the same skills.
+
+    The number of free agents with each skill is kept up to date as agents come and go, so a simulation finds out
+    whether it can transfer a call in O(1). A call is given to the group with the fewest skills that has a free
+    agent, keeping the agents with more skills free for calls that others can't take. The queued calls of each
+    skill are held in a heap ordered by campaign priority and then by how long they've waited, so an agent being
+    released takes the next call in O(log n) however many campaigns are queueing.
+    """
+
+    def __init__(self, agent_groups):
+        """
+        :param agent_groups: the AgentGroups
+        """
+        self._groups = [AgentGroup(group.number_agents, tuple(group.skills)) for group in agent_groups]
+
+        # The number of agents logged in and free in each group
+        self._logged_in = [group.number_agents for group in self._groups]
+        self._free = [group.number_agents for group in self._groups]
+
+        # For each skill: the number of free agents, and the groups with the skill, fewest skills first
+        self._free_by_skill = {}
+        self._groups_by_skill = {}
+        for index, group in enumerate(self._groups):
+            for skill in group.skills:
+                self._free_by_skill[skill] = self._free_by_skill.get(skill, 0) + group.number_agents
+                self._groups_by_skill.setdefault(skill, []).append(index)
+        for groups in self._groups_by_skill.values():
+            groups.sort(key=lambda index: len(self._groups[index].skills))
+
+        # For each skill, a heap of (-priority, sequence, simulation, call). Calls that leave the queue some other way
+        # (eg: the caller hangs up) leave their entry behind - these are discarded as they reach the top of the heap.
+        self._queues = {}
+        self._sequence = 0
+
+        # The group of the agent talking to each call
+        self._group_of_call = {}
+
+        self.number_busy_agents = 0
+        self.shift_over = False
+
+
+    def number_agents(self, skill=None):
+        """
+        :param skill:
+        :return: the number of agents logged in with the skill (or at all if skill is None)
+        """
+        if skill is None:
+            return sum(self._logged_in)
+        return sum(self._logged_in[index] for index in self._groups_by_skill.get(skill, ()))
+
+
+    def number_free_agents(self, skill=None):
+        """
+        :param skill:
+        :return: the number of free agents with the skill (or at all if skill is None)
+        """
+        if skill is None:
+            return sum(self._free)
+        return self._free_by_skill.get(skill, 0)
+
+
+    def _change_free(self, index, change):
+        self._free[index] += change
+        for skill in self._groups[index].skills:
+            self._free_by_skill[skill] += change
+
+
+    def take(self, simulation, call):
+        """
+        Make an agent with the simulation's skill busy talking to a call.
+        :param simulation:
+        :param call:
+        :return:
+        """
+        for index in self._groups_by_skill.get(simulation._skill, ()):
+            if self._free[index] > 0:
+                break
+        else:
+            raise Exception('Cannot make agent busy - there are none free with skill {}'.format(simulation._skill))
+
+        self._change_free(index, -1)
+        self.number_busy_agents += 1
+        self._group_of_call[call.unique_id] = index
+
+
+    def enqueue(self, simulation, call):
+        """
+        A call of the simulation is waiting for an agent.
+        :param simulation:
+        :param call:
+        :return:
+        """
+        self._sequence += 1
+        heapq.heappush(self._queues.setdefault(simulation._skill, []),
+                       (-simulation._priority, self._sequence, simulation, call))
+
+
+    def release(self, call):
+        """
+        The agent talking to a call is free. They take the highest priority, longest waiting call they have the
+        skills for or, if the shift is over and there are none, log off.
+        :param call:
+        :return:
+        """
+        index = self._group_of_call.pop(call.unique_id)
+        self.number_busy_agents -= 1
+        self._change_free(index, 1)
+
+        best = None
+        for skill in self._groups[index].skills:
+            queue = self._queues.get(skill)
+            if not queue:
+                continue
+
+            # Throw away the calls that have already left the queue
+            while len(queue) > 0 and queue[0][2]._queued_calls.get(queue[0][3].unique_id) is not queue[0][3]:
+                heapq.heappop(queue)
+
+            if len(queue) > 0 and (best is None or queue[0][:2] < best[:2]):
+                best = queue[0]
+                best_queue = queue
+
+        if best is not None:
+            heapq.heappop(best_queue)
+            _, _, simulation, queued_call = best
+            del simulation._queued_calls[queued_call.unique_id]
+            simulation.transfer_to_agent(queued_call)
+        elif self.shift_over:
+            self._change_free(index, -1)
+            self._logged_in[index] -= 1
+
+
+    def end_shift(self):
+        """
+        The shift is over: the free agents log off and the others will as they finish their calls.
+        :return:
+        """
+        self.shift_over = True
+        for index, free in enumerate(self._free):
+            self._change_free(index, -free)
+            self._logged_in[index] -= free
+
+
+class MultiCampaignSimulation:
+    """
+    Runs several campaigns at once, each with its own calling list and dialing algorithm, against one pool of
+    agents. Each campaign is an ordinary simulation that takes its agents from the shared AgentPool; the campaigns
+    are moved through the epochs together so that the calls of one can be answered by agents freed by another.
+
+    Calling lists can be split into their campaigns with CallingList.split.
+    """
+
+    EPOCH = Simulation.EPOCH
+
+    def __init__(self, agent_groups, event_driven=False, reporter=None):
+        """
+        :param agent_groups: the AgentGroups that make up the pool
+        :param event_driven: if set, jump straight to the next epoch in which any campaign has something to do
+        :param reporter: reports on the pool once the campaigns have finished (see Reporter.campaigns_finished)
+        """
+        self._agent_pool = AgentPool(agent_groups)
+        self._event_driven = event_driven
+        self._reporter = SummaryReporter() if reporter is None else reporter
+
+        self._campaigns = []
+
+        self._current_time = 0
+
+        # The total time the agents in the pool are talking (busy) and not talking (idle), counting each agent once.
+        # The campaigns' own idle times count a shared agent in every campaign they can take calls from, so they
+        # mustn't be added up.
+        self.total_agent_talk_time = 0
+        self.total_agent_idle_time = 0
+
+
+    def add_campaign(self, name, simulation, calling_list, skill=None, priority=0):
+        """
+        :param name:
+        :param simulation: the simulation that dials the campaign. Its own number of agents is ignored.
+        :param calling_list:
+        :param skill: the skill needed to take the campaign's calls (the campaign name if not given)
+        :param priority: queued calls of higher priority campaigns are answered first
+        :return:
+        """
+        skill = name if skill is None else skill
+        simulation.join_agent_pool(self._agent_pool, skill, priority)
+        self._campaigns.append(Campaign(name, simulation, calling_list, skill, priority))
+
+
+    def start(self, duration_shift=Simulation.DEFAULT_SHIFT_LENGTH):
+        """
+        Run the campaigns until they have all finished.
+        :param duration_shift:
+        :return:
+        """
+        log.info('Running {} campaigns with {} agents'.format(len(self._campaigns), self._agent_pool.number_agents()))
+
+        running = [campaign.simulation for campaign in self._campaigns]
+        for campaign in self._campaigns:
+            campaign.simulation.begin(campaign.calling_list, duration_shift)
+
+        while len(running) > 0:
+            if self._event_driven:
+                next_time = min(simulation._next_event_time() for simulation in running)
+            else:
+                next_time = self._current_time + self.EPOCH
+
+            self._advance_to(next_time, duration_shift)
+
+            # Every campaign has to be at the new time before any handles its events, as an agent released by one
+            # campaign can take a queued call of another
+            for simulation in running:
+                simulation._advance_to(next_time)
+            for simulation in running:
+                simulation._handle_epoch()
+
+            for simulation in [simulation for simulation in running if simulation.finished()]:
+                simulation.end()
+                running.remove(simulation)
+
+        self._reporter.campaigns_finished(self)
+
+
+    def _advance_to(self, next_time, duration_shift):
+        skipped_epochs = (next_time - self._current_time) // self.EPOCH - 1
+        if skipped_epochs > 0:
+            self._update_agent_stats(skipped_epochs)
+
+        self._current_time = next_time
+
+        if not self._agent_pool.shift_over and self._current_time >= duration_shift:
+            self._agent_pool.end_shift()
+
+        self._update_agent_stats()
+
+
+    def _update_agent_stats(self, number_epochs=1):
+        self.total_agent_talk_time += self._agent_pool.number_busy_agents * self.EPOCH * number_epochs
+        self.total_agent_idle_time += self._agent_pool.number_free_agents() * self.EPOCH * number_epochs
+
+
+    def talk_time(self):
+        """
+        :return: the fraction of the pool's time spent talking
+        """
+        agent_time = self.total_agent_talk_time + self.total_agent_idle_time
+        return 0 if agent_time == 0 else self.total_agent_talk_time / agent_time
+
+
+    def results(self):
+        """
+        :return: a DataFrame of the outcome of each campaign
+        """
+        rows = []
+        for campaign in self._campaigns:
+            simulation = campaign.simulation
+            rows.append({'campaign': campaign.name,
+                         'skill': campaign.skill,
+                         'priority': campaign.priority,
+                         'total_number_calls': simulation.total_number_calls,
+                         'total_number_answered_calls': simulation.total_number_answered_calls,
+                         'total_number_talking_calls': simulation.total_number_talking_calls,
+                         'total_number_abandon_calls': simulation.total_number_abandon_calls,
+                         'total_agent_talk_time': simulation.total_agent_talk_time,
+                         'abandonment_rate': simulation._current_abandonment_rate})
+
+        return pd.DataFrame(rows)
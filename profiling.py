@@ -0,0 +1,111 @@
+import time
+
+import pandas as pd
+
+from callstats import CallState
+
+
+class Profiler:
+    """
+    Where the time goes in a simulation, and how busy it gets. Give one to a simulation to switch profiling on; without
+    one the simulation only pays for a test per epoch and per call event.
+
+    Recorded:
+      phase_time:  the cumulative wall time (s) of each phase of handling an epoch (see PHASES). recalc_dial_level is
+                   the time spent in the algorithm working out how many calls to make, and is part of calculate.
+                   other is everything else: moving the time on, ending the shift, updating the agent statistics
+                   and the profiling itself.
+      phase_calls: the number of times each phase ran
+      events:      the number of times a call moved into each state, whether by an event (ringing, answered,
+                   disconnected) or by the simulation (created when dialed, queued or talking when answered)
+      high_water:  the most calls there were at once in each state, in flight (created, ringing, queued or
+                   talking) and waiting in the event queue
+    """
+
+    PHASES = ('agent_events', 'call_events', 'calculate', 'recalc_dial_level', 'report', 'checkpoint', 'other')
+
+    HIGH_WATER = ('created', 'ringing', 'queued', 'talking', 'in_flight', 'event_queue')
+
+    def __init__(self):
+        self.phase_time = {phase: 0.0 for phase in self.PHASES}
+        self.phase_calls = {phase: 0 for phase in self.PHASES}
+        self.events = {state.name: 0 for state in CallState}
+        self.high_water = {name: 0 for name in self.HIGH_WATER}
+
+        self.epochs = 0
+        self.wall_time = 0.0
+        self._started = None
+
+
+    def started(self):
+        self._started = time.perf_counter()
+
+
+    def finished(self):
+        self.wall_time += time.perf_counter() - self._started
+
+        # Whatever isn't in a phase
+        self.phase_time['other'] = self.wall_time - sum(self.phase_time[phase] for phase in self.PHASES
+                                                        if phase not in ('other', 'recalc_dial_level'))
+        self.phase_calls['other'] = self.epochs
+
+
+    def add_time(self, phase, seconds):
+        self.phase_time[phase] += seconds
+        self.phase_calls[phase] += 1
+
+
+    def time(self, phase, function):
+        """
+        :param phase:
+        :param function: called with no arguments, and timed as part of the phase
+        :return: what function returns
+        """
+        started = time.perf_counter()
+        result = function()
+        self.add_time(phase, time.perf_counter() - started)
+        return result
+
+
+    def count_event(self, state):
+        self.events[state.name] += 1
+
+
+    def observe(self, simulation):
+        """
+        Update the high-water marks at the end of an epoch.
+        :param simulation:
+        :return:
+        """
+        self.epochs += 1
+
+        high_water = self.high_water
+        for name, value in (('created', simulation.number_created_calls()),
+                            ('ringing', simulation.number_ringing_calls()),
+                            ('queued', simulation.number_queued_calls()),
+                            ('talking', simulation.number_talking_calls()),
+                            ('in_flight', simulation.number_all_calls()),
+                            ('event_queue', len(simulation._event_queue))):
+            if value > high_water[name]:
+                high_water[name] = value
+
+
+    def results(self):
+        """
+        :return: everything recorded, as a dict
+        """
+        return {'wall_time': self.wall_time,
+                'epochs': self.epochs,
+                'phase_time': dict(self.phase_time),
+                'phase_calls': dict(self.phase_calls),
+                'events': dict(self.events),
+                'high_water': dict(self.high_water)}
+
+
+    def phases(self):
+        """
+        :return: a DataFrame of the time spent in each phase, and its share of the wall time
+        """
+        df = pd.DataFrame({'time': self.phase_time, 'calls': self.phase_calls}, index=list(self.PHASES))
+        df['fraction'] = df.time / self.wall_time if self.wall_time > 0 else 0.0
+        return df
@@ -0,0 +1,323 @@
+import argparse
+import math
+import os
+import random
+import statistics
+from multiprocessing import Pool
+import logging as log
+
+import numpy as np
+import pandas as pd
+
+from call_table import TableCalls
+from calling_list import CallingList
+from history import HistoryRecorder
+from reporting import Reporter
+from simulation import Simulation
+
+# The end report KPIs of each replica
+KPIS = ('abandonment_rate', 'talk_time', 'total_number_calls', 'total_number_answered_calls',
+        'total_number_abandon_calls')
+
+# The ways a calling list can be varied between replicas:
+#   shuffle:   the same calls in a different order
+#   bootstrap: as many calls drawn at random, with replacement. Each copy of a call drawn more than once is given
+#              its own unique id.
+#   None:      the same calls in the same order (only the random seed differs)
+RESAMPLE_METHODS = ('shuffle', 'bootstrap', None)
+
+# The calling list (and options) used by the replicas run in each worker process
+_worker_state = {}
+
+
+def resample_calling_list(calling_list, method, seed):
+    """
+    :param calling_list: a parsed calling list
+    :param method: one of RESAMPLE_METHODS
+    :param seed:
+    :return: a calling list of the resampled calls, sharing the parsed calls of the original
+    """
+    if method is None:
+        calling_list.reset()
+        return calling_list
+
+    if calling_list._table is None:
+        raise ValueError('Only a parsed calling list can be resampled')
+
+    number_calls = len(calling_list._table)
+    rng = np.random.default_rng(seed)
+    copies = None
+    if method == 'shuffle':
+        indices = rng.permutation(number_calls)
+    elif method == 'bootstrap':
+        indices = rng.integers(0, number_calls, number_calls)
+        copies = _copy_numbers(indices)
+    else:
+        raise ValueError('Unknown resample method {}, expected one of {}'.format(method, RESAMPLE_METHODS))
+
+    return CallingList(TableCalls(calling_list._table, indices, copies=copies), calling_list._queued_calls)
+
+
+def _copy_numbers(indices):
+    """
+    :param indices:
+    :return: for each index, the number of times it appears earlier on
+    """
+    order = np.argsort(indices, kind='stable')
+    ordered = indices[order]
+
+    copies = np.empty(len(indices), dtype=np.int64)
+    copies[order] = np.arange(len(indices)) - np.searchsorted(ordered, ordered)
+    return copies
+
+
+def run_replica(calling_list, simulation_class, simulation_options, duration_shift, resample, seed):
+    """
+    Run one replica.
+    :return: a dict of the seed and the KPIs
+    """
+    random.seed(seed)
+    replica_calling_list = resample_calling_list(calling_list, resample, seed)
+
+    options = dict(reporter=Reporter(), history=HistoryRecorder(None, Simulation.SAVE_HISTORY_INTERVAL))
+    options.update(simulation_options)
+    simulation = simulation_class(**options)
+    simulation.start(replica_calling_list, duration_shift)
+
+    return {'seed': seed,
+            'abandonment_rate': simulation._current_abandonment_rate,
+            'talk_time': simulation._current_talk_time,
+            'total_number_calls': simulation.total_number_calls,
+            'total_number_answered_calls': simulation.total_number_answered_calls,
+            'total_number_abandon_calls': simulation.total_number_abandon_calls}
+
+
+def _init_worker(calling_list, simulation_class, simulation_options, duration_shift, resample):
+    # On Linux the workers are forked, so they share the parent's parsed calling list rather than copying it
+    _worker_state['calling_list'] = calling_list
+    _worker_state['options'] = (simulation_class, simulation_options, duration_shift, resample)
+
+
+def _run_worker_replica(seed):
+    return run_replica(_worker_state['calling_list'], *_worker_state['options'], seed=seed)
+
+
+def confidence_interval(values, confidence=0.95):
+    """
+    :param values:
+    :param confidence:
+    :return: the mean and the half width of its confidence interval (Student's t if scipy is installed, otherwise
+    the normal approximation)
+    """
+    mean = float(np.mean(values))
+    if len(values) < 2:
+        return mean, math.inf
+
+    try:
+        from scipy.stats import t
+        quantile = t.ppf((1 + confidence) / 2, len(values) - 1)
+    except ImportError:
+        quantile = statistics.NormalDist().inv_cdf((1 + confidence) / 2)
+
+    return mean, quantile * float(np.std(values, ddof=1)) / math.sqrt(len(values))
+
+
+class Replications:
+    """
+    Runs independent replicas of a simulation, each with its own random seed and (optionally) its own resampling
+    of the calling list, and reports the mean and confidence interval of the end report KPIs.
+
+    Replicas are run a batch at a time, in a pool of worker processes if there is more than one. Once every KPI
+    given a target precision has a confidence interval no wider than target either side of the mean, no more
+    batches are run. The replicas are seeded seed, seed + 1, ... and the decision to stop is only taken between
+    batches, so the results don't depend on the number of processes.
+    """
+
+    def __init__(self, simulation_class, simulation_options=None, duration_shift=Simulation.DEFAULT_SHIFT_LENGTH,
+                 resample='shuffle', confidence=0.95, precision=None, min_replicas=5, max_replicas=100,
+                 batch_size=4, number_processes=1, seed=42):
+        """
+        :param simulation_class: eg SimulationConstantCall
+        :param simulation_options: the keyword arguments for creating the simulation. By default nothing is reported
+        and no history is written.
+        :param duration_shift:
+        :param resample: how the calling list is varied between replicas (see RESAMPLE_METHODS)
+        :param confidence: the confidence level of the intervals
+        :param precision: the target half width of the confidence interval for each KPI, eg {'abandonment_rate':
+        0.005}. If None then max_replicas are always run.
+        :param min_replicas: the fewest replicas to run before stopping
+        :param max_replicas: the most replicas to run
+        :param batch_size: the number of replicas to run between checking the precision
+        :param number_processes: the number of worker processes to run the replicas in
+        :param seed: the seed of the first replica
+        """
+        if resample not in RESAMPLE_METHODS:
+            raise ValueError('Unknown resample method {}, expected one of {}'.format(resample, RESAMPLE_METHODS))
+
+        self.simulation_class = simulation_class
+        self.simulation_options = {} if simulation_options is None else dict(simulation_options)
+        self.duration_shift = duration_shift
+        self.resample = resample
+        self.confidence = confidence
+        self.precision = {} if precision is None else dict(precision)
+        self.min_replicas = min_replicas
+        self.max_replicas = max_replicas
+        self.batch_size = batch_size
+        self.number_processes = number_processes
+        self.seed = seed
+
+        self.replicas = []
+
+
+    def run(self, calling_list):
+        """
+        Run replicas until the target precision or max_replicas is reached.
+        :param calling_list: the parsed calling list, shared by every replica
+        :return: the summary (see summary)
+        """
+        self.replicas = []
+
+        pool = None
+        if self.number_processes > 1:
+            pool = Pool(self.number_processes, initializer=_init_worker,
+                        initargs=(calling_list, self.simulation_class, self.simulation_options, self.duration_shift,
+                                  self.resample))
+        try:
+            while len(self.replicas) < self.max_replicas:
+                first = self.seed + len(self.replicas)
+                seeds = range(first, first + min(self.batch_size, self.max_replicas - len(self.replicas)))
+
+                if pool is not None:
+                    self.replicas.extend(pool.map(_run_worker_replica, seeds))
+                else:
+                    self.replicas.extend(run_replica(calling_list, self.simulation_class, self.simulation_options,
+                                                     self.duration_shift, self.resample, seed) for seed in seeds)
+
+                log.info('Finished {} replicas'.format(len(self.replicas)))
+
+                if self.precise_enough():
+                    log.info('Reached the target precision after {} replicas'.format(len(self.replicas)))
+                    break
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        return self.summary()
+
+
+    def precise_enough(self):
+        """
+        :return: whether we've run enough replicas and every KPI with a target precision has reached it
+        """
+        if len(self.replicas) < self.min_replicas or len(self.precision) == 0:
+            return False
+
+        for kpi, target in self.precision.items():
+            _, half_width = confidence_interval([replica[kpi] for replica in self.replicas], self.confidence)
+            if half_width > target:
+                return False
+
+        return True
+
+
+    def results(self):
+        """
+        :return: a DataFrame of the KPIs of each replica
+        """
+        return pd.DataFrame(self.replicas, columns=('seed',) + KPIS)
+
+
+    def summary(self):
+        """
+        :return: a DataFrame with the mean, standard deviation and confidence interval of each KPI
+        """
+        rows = []
+        for kpi in KPIS:
+            values = [replica[kpi] for replica in self.replicas]
+            if len(values) == 0:
+                continue
+
+            mean, half_width = confidence_interval(values, self.confidence)
+            rows.append({'kpi': kpi,
+                         'replicas': len(values),
+                         'mean': mean,
+                         'std': float(np.std(values, ddof=1)) if len(values) > 1 else 0.0,
+                         'half_width': half_width,
+                         'lower': mean - half_width,
+                         'upper': mean + half_width})
+
+        return pd.DataFrame(rows).set_index('kpi') if len(rows) > 0 else pd.DataFrame()
+
+
+def main(argv=None):
+    """
+    Run replicas of a simulation from the command line, eg:
+
+      python replication.py small.csv --algorithm constant --dial-level 2.5 --agents 40 \
+          --precision abandonment_rate=0.005 talk_time=0.005
+
+    :param argv:
+    :return:
+    """
+    # sweep knows how to create each algorithm
+    import sweep
+
+    parser = argparse.ArgumentParser(description='Run independent replicas of a simulation')
+    parser.add_argument('calling_list', help='the calling list (csv)')
+    parser.add_argument('--compiled', help='the compiled calling list, built from the csv if out of date')
+    parser.add_argument('--algorithm', choices=list(sweep.ALGORITHMS), default='constant')
+    parser.add_argument('--dial-level', type=float, default=1, help='calls per second (constant algorithm only)')
+    parser.add_argument('--agents', type=int, default=40)
+    parser.add_argument('--shift-minutes', type=float,
+                        default=Simulation.DEFAULT_SHIFT_LENGTH / Simulation.ONE_MINUTE)
+    parser.add_argument('--resample', choices=['shuffle', 'bootstrap', 'none'], default='shuffle')
+    parser.add_argument('--precision', nargs='*', default=[], help='target half widths, eg abandonment_rate=0.005')
+    parser.add_argument('--confidence', type=float, default=0.95)
+    parser.add_argument('--min-replicas', type=int, default=5)
+    parser.add_argument('--max-replicas', type=int, default=100)
+    parser.add_argument('--batch-size', type=int, default=4)
+    parser.add_argument('--processes', type=int, default=os.cpu_count())
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write the KPIs of each replica to this csv file')
+    args = parser.parse_args(argv)
+
+    log.basicConfig(level=log.INFO, format='%(asctime)s %(levelname)-8s %(message)s', datefmt='%m-%d %H:%M')
+
+    precision = {}
+    for target in args.precision:
+        kpi, _, half_width = target.partition('=')
+        if kpi not in KPIS:
+            parser.error('Unknown KPI {}, expected one of {}'.format(kpi, ', '.join(KPIS)))
+        precision[kpi] = float(half_width)
+
+    cl = CallingList()
+    if args.compiled is not None:
+        cl.load_compiled(args.compiled, args.calling_list)
+    else:
+        cl.load(args.calling_list)
+        cl.parse()
+
+    options = {'number_agents': args.agents, 'event_driven': True}
+    if args.algorithm == 'constant':
+        options['dial_level'] = args.dial_level
+    if args.algorithm == 'genetic':
+        # The replicas already run in worker processes, so the genetic algorithm can't have a pool of its own
+        options['number_processes'] = 1
+
+    replications = Replications(sweep.ALGORITHMS[args.algorithm], options,
+                                duration_shift=int(args.shift_minutes * Simulation.ONE_MINUTE),
+                                resample=None if args.resample == 'none' else args.resample,
+                                confidence=args.confidence, precision=precision, min_replicas=args.min_replicas,
+                                max_replicas=args.max_replicas, batch_size=args.batch_size,
+                                number_processes=args.processes, seed=args.seed)
+    summary = replications.run(cl)
+
+    log.info('\n' + summary.to_string())
+
+    if args.output is not None:
+        replications.results().to_csv(args.output, index=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+import logging as log
+
+
+class Reporter:
+    """
+    Reports on the progress of a simulation. This reporter reports nothing and asks for no periodic reports, so it
+    costs nothing - use it for simulations that are run by other simulations or for benchmarking.
+
+    Subclasses report by overriding started, report (called every interval ms) and finished, and
+    campaigns_finished for a MultiCampaignSimulation.
+    """
+
+    def __init__(self, interval=None):
+        """
+        :param interval: the number of milliseconds between each periodic report, or None for no periodic reports
+        """
+        self.interval = interval
+
+
+    def started(self, simulation, duration_shift):
+        pass
+
+
+    def report(self, simulation):
+        pass
+
+
+    def finished(self, simulation):
+        pass
+
+
+    def campaigns_finished(self, multi_campaign):
+        """
+        Called once every campaign of a MultiCampaignSimulation has finished.
+        :param multi_campaign:
+        :return:
+        """
+        pass
+
+
+class SummaryReporter(Reporter):
+    """
+    Reports one line on the state of the call centre every interval and the abandonment rate and talk time at the end.
+    """
+
+    def __init__(self, interval=60000):
+        Reporter.__init__(self, interval)
+
+
+    def started(self, simulation, duration_shift):
+        log.info('Running simulation for {} mins with {} agents'.format(simulation.millis_to_hours(duration_shift),
+                                                                        simulation._number_agents))
+
+
+    def report(self, simulation):
+        log.info('{}: in progress: {}, queued: {}, talking: {}, free agents: {}, abandonment rate: {:.2f}%, '
+                 'talk time: {:.2f}%'.format(simulation.millis_to_hours(simulation._current_time),
+                                             simulation.number_in_progress_calls(),
+                                             simulation.number_queued_calls(),
+                                             simulation.number_talking_calls(),
+                                             simulation.number_free_agents(),
+                                             simulation._current_abandonment_rate * 100,
+                                             simulation._current_talk_time * 100))
+
+
+    def finished(self, simulation):
+        log.info('Finished. Time is: {}'.format(simulation.millis_to_hours(simulation._current_time)))
+        self.end_report(simulation)
+
+
+    def end_report(self, simulation):
+        log.info('')
+        log.info('Report:')
+        log.info('  abandonment rate: {:02.2f}%'.format(simulation._current_abandonment_rate * 100))
+        log.info('  talk time:        {:.2f}% ({:.2f} mins)'.format(simulation._current_talk_time * 100,
+                                                                    simulation._current_talk_time * 60))
+
+
+    def campaigns_finished(self, multi_campaign):
+        # A campaign's idle time counts every free agent with its skill, so an agent shared by several campaigns is
+        # idle in each of them. The pool's idle time counts each agent once.
+        log.info('')
+        log.info('Pooled report ({} campaigns):'.format(len(multi_campaign._campaigns)))
+        for campaign in multi_campaign._campaigns:
+            log.info('  {} abandonment rate: {:02.2f}%'.format(campaign.name,
+                                                              campaign.simulation._current_abandonment_rate * 100))
+        log.info('  agent idle time:  {:.2f} mins'.format(multi_campaign.total_agent_idle_time / 60000))
+        log.info('  talk time:        {:.2f}%'.format(multi_campaign.talk_time() * 100))
+
+
+class DetailReporter(SummaryReporter):
+    """
+    Reports all of the counters (and the calls being created) at DEBUG every interval, as well as the end report.
+    """
+
+    def __init__(self, interval=10000):
+        SummaryReporter.__init__(self, interval)
+
+
+    def started(self, simulation, duration_shift):
+        SummaryReporter.started(self, simulation, duration_shift)
+        log.debug('stop_immediately set to {}'.format(simulation.stop_immediately_when_no_calls))
+
+
+    def report(self, simulation):
+        # Don't build the report if nobody is going to see it
+        if not log.getLogger().isEnabledFor(log.DEBUG):
+            return
+
+        created_calls = ' '.join(str(call.unique_id) for call in simulation._created_calls.values())
+
+        log.debug('')
+        log.debug('Report:')
+        log.debug('  current_time:                    {}'.format(simulation.millis_to_hours(simulation._current_time)))
+        log.debug('  number_created_calls:            {} ({})'.format(simulation.number_created_calls(), created_calls))
+        log.debug('  number_ringing_calls:            {}'.format(simulation.number_ringing_calls()))
+        log.debug('  number_queued_calls:             {}'.format(simulation.number_queued_calls()))
+        log.debug('  number_talking_calls:            {}'.format(simulation.number_talking_calls()))
+        log.debug('  number_disconnected_calls:       {}'.format(simulation.number_disconnected_calls()))
+        log.debug('  number_free_agents:              {}'.format(simulation.number_free_agents()))
+        log.debug('  number_busy_agents:              {}'.format(simulation._number_busy_agents))
+        log.debug('  total_number_answered_calls:     {}'.format(simulation.total_number_answered_calls))
+        log.debug('  total_number_not_answered_calls: {}'.format(simulation.total_number_not_answered_calls))
+        log.debug('  total_number_abandon_calls:      {}'.format(simulation.total_number_abandon_calls))
+        log.debug('  total_number_talking_calls:      {}'.format(simulation.total_number_talking_calls))
+        log.debug('  total_number_calls:              {}'.format(simulation.total_number_calls))
+        log.debug('  total_agent_idle_time:           {}'.format(simulation.total_agent_idle_time))
+        log.debug('  total_agent_talk_time:           {}'.format(simulation.total_agent_talk_time))
+
+
+    def finished(self, simulation):
+        log.info('Finished. Time is: {}'.format(simulation.millis_to_hours(simulation._current_time)))
+        self.report(simulation)
+        self.end_report(simulation)
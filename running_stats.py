@@ -0,0 +1,172 @@
+class RunningMean:
+    """
+    The mean of the last window values added (or of every value if window is None). Adding a value and reading
+    the mean are both O(1): the values are kept in a ring buffer and the sum of those in the window maintained as
+    they come and go.
+    """
+
+    def __init__(self, window=None):
+        """
+        :param window: the number of most recent values to average over, or None for all of them
+        """
+        self.window = window
+
+        self._values = [] if window is None else [0] * window
+        self._next = 0
+        self._sum = 0
+        self.count = 0
+
+
+    def add(self, value):
+        if self.window is None:
+            self._sum += value
+            self.count += 1
+            return
+
+        if self.count == self.window:
+            self._sum -= self._values[self._next]
+        else:
+            self.count += 1
+
+        self._values[self._next] = value
+        self._sum += value
+        self._next = (self._next + 1) % self.window
+
+
+    def mean(self, default=0):
+        """
+        :param default: the mean to give if nothing has been added yet
+        :return:
+        """
+        return default if self.count == 0 else self._sum / self.count
+
+
+class ExponentialMean:
+    """
+    An exponentially weighted moving average over roughly the last span values.
+    """
+
+    def __init__(self, span):
+        """
+        :param span: the number of values the average is taken over. Each value's weight is 2 / (span + 1).
+        """
+        self.window = span
+        self._alpha = 2 / (span + 1)
+        self._mean = 0
+        self.count = 0
+
+
+    def add(self, value):
+        if self.count == 0:
+            self._mean = value
+        else:
+            self._mean += self._alpha * (value - self._mean)
+        self.count += 1
+
+
+    def mean(self, default=0):
+        return default if self.count == 0 else self._mean
+
+
+class CallStatistics:
+    """
+    Statistics of the recent calls, updated by the simulation as each call event is handled so that a dialing
+    algorithm can read them in O(1) however long the shift has been running:
+      answer_rate:       the fraction of calls that were answered at the remote end
+      mean_ringing_time: the time (ms) calls ring before they are answered or give up
+      mean_talk_time:    the time (ms) agents talk to each call
+      abandonment_rate:  the fraction of answered calls that are abandoned rather than reaching an agent
+
+    Each is taken over the last window calls to reach that point, or over the whole shift if window is None.
+    """
+
+    def __init__(self, window=None, exponential=False):
+        """
+        :param window: the number of calls each statistic is taken over, or None for the whole shift
+        :param exponential: if set, each statistic is an exponentially weighted average spanning window calls
+        rather than a plain average of the last window calls
+        """
+        if exponential and window is None:
+            raise ValueError('An exponentially weighted average needs a window')
+
+        mean = ExponentialMean if exponential else RunningMean
+        self._answered = mean(window)
+        self._ringing_time = mean(window)
+        self._talk_time = mean(window)
+        self._abandoned = mean(window)
+
+
+    def add_answered(self, ringing_time):
+        """
+        A call was answered at the remote end.
+        :param ringing_time: how long it rang for
+        :return:
+        """
+        self._answered.add(1)
+        self._ringing_time.add(ringing_time)
+
+
+    def add_not_answered(self, ringing_time=None):
+        """
+        A call finished without being answered.
+        :param ringing_time: how long it rang for, or None if it never started ringing
+        :return:
+        """
+        self._answered.add(0)
+        if ringing_time is not None:
+            self._ringing_time.add(ringing_time)
+
+
+    def add_transferred(self):
+        """
+        An answered call reached an agent.
+        :return:
+        """
+        self._abandoned.add(0)
+
+
+    def add_abandoned(self):
+        """
+        An answered call was abandoned, either because the queue was full or because it hung up while queued.
+        :return:
+        """
+        self._abandoned.add(1)
+
+
+    def add_talk_time(self, talk_time):
+        """
+        An agent finished talking to a call.
+        :param talk_time: how long they talked for
+        :return:
+        """
+        self._talk_time.add(talk_time)
+
+
+    def number_answer_outcomes(self):
+        """
+        :return: the number of calls the answer rate is taken over
+        """
+        return self._answered.count
+
+
+    def number_talk_times(self):
+        """
+        :return: the number of calls the mean talk time is taken over
+        """
+        return self._talk_time.count
+
+
+    def answer_rate(self, default=0):
+        return self._answered.mean(default)
+
+
+    def mean_ringing_time(self, default=0):
+        return self._ringing_time.mean(default)
+
+
+    def mean_talk_time(self, default=0):
+        return self._talk_time.mean(default)
+
+
+    def abandonment_rate(self, default=0):
+        return self._abandoned.mean(default)
@@ -1,8 +1,17 @@
-import pandas as pd
+import datetime
+import heapq
+import math
+import os
 from collections import OrderedDict
 
 from calling_list import CallingList
 from callstats import CallState
+from stored_calls import StoredCalls
+from tracing import NULL_TRACER, DEBUG
+from reporting import DetailReporter
+from history import HistoryRecorder, DEFAULT_EXTENSION
+from running_stats import CallStatistics
+from agents import AgentState
 import logging as log
 
 
@@ -24,7 +33,23 @@ class Simulation:
 
     MAX_CALLS_TO_GENERATE = 100
 
-    def __init__(self, stop_immediately_when_no_calls, number_agents=40, generate_history_file=True):
+    # Whether finished calls are stored so that they can be replayed later (see SimulationGenetic)
+    STORE_FINISHED_CALLS = False
+
+    # Within an epoch, call events are handled in this order of call state. Calls that move into a later state during
+    # the epoch have their next event handled in that same epoch.
+    ORDER_CREATED = 0
+    ORDER_RINGING = 1
+    ORDER_QUEUED = 2
+    ORDER_TALKING = 3
+
+    def __init__(self, stop_immediately_when_no_calls, number_agents=40, generate_history_file=True,
+                 event_driven=False, keep_disconnected_calls=True, tracer=None, reporter=None, history=None,
+                 statistics=None, agents=None, profiler=None):
+        # If the agents are modelled individually then there are as many as are in the team
+        if agents is not None:
+            number_agents = len(agents.agents)
+
         self._df = {}
         self._calling_list = None
 
@@ -47,6 +72,10 @@ class Simulation:
         self._talking_calls = OrderedDict()
         self._disconnected_calls = OrderedDict()
 
+        # If not set then disconnected calls are only counted rather than kept in _disconnected_calls
+        self._keep_disconnected_calls = keep_disconnected_calls
+        self._number_disconnected_calls = 0
+
         # A flag to indicate that the calling list still has values
         self._still_have_calls = True
 
@@ -75,8 +104,13 @@ class Simulation:
         # The total time the agents are not talking (idle)
         self.total_agent_idle_time = 0
 
-        # A history of all checkpoints taken each epoch
-        self._history = OrderedDict()
+        # A history of the checkpoints taken every SAVE_HISTORY_INTERVAL. Pass a HistoryRecorder to choose the file
+        # the history is written to and how often the checkpoints are taken. Otherwise it goes to a file of its own
+        # (see default_history_filename) so simulations run side by side don't overwrite each other's history.
+        if history is None:
+            history = HistoryRecorder(self.default_history_filename() if generate_history_file else None,
+                                      self.SAVE_HISTORY_INTERVAL)
+        self._history = history
 
         # A flag to indicate that the shift has ended. Once the shift ends agents don't take any more calls
         # and log off
@@ -99,9 +133,64 @@ class Simulation:
         # We'll not let the dial level get above a certain level
         self.max_dial_level = number_agents / 4
 
-        self._stored_calling_list_entry = []
+        # If set, the AgentTeam that models each agent (logins, logouts and wrap-up). The agent counts are kept
+        # as before, but only count the agents who are logged in.
+        self._agents = agents
+        if agents is not None:
+            self._number_agents = self._number_free_agents = agents.number_logged_in()
+
+        # If set, rather than dialing every second at the dial level the algorithm dials only when it asks to (see
+        # request_dial), at any epoch. The times it has asked to dial are held as a heap.
+        self._paced = False
+        self._dial_requests = []
+
+        # The finished calls, if we store them (see STORE_FINISHED_CALLS)
+        self._stored_calling_list_entry = StoredCalls()
+
+        # If set, rather than stepping through every epoch we jump straight to the next epoch in which something
+        # happens (a call event, a dial, a report or a checkpoint). The results are identical to the epoch stepping.
+        self._event_driven = event_driven
+
+        # The next event of every call in progress, held as a heap of (epoch, order, sequence, call, event). Calls
+        # that have moved on leave their entry behind - these are discarded as they reach the top of the heap.
+        self._event_queue = []
+        self._event_sequence = 0
+
+        # The calls in each state, indexed by the order in which their events are handled
+        self._calls_by_order = (self._created_calls, self._ringing_calls, self._queued_calls, self._talking_calls)
+
+        # The order of the calls whose events are currently being handled (None if we're not handling events)
+        self._handling_order = None
+
+        # A structured trace of the simulation. We find out once whether each kind of record is wanted so that
+        # tracing costs nothing on the hot path when it is switched off.
+        self._tracer = NULL_TRACER if tracer is None else tracer
+        self._trace_calls = self._tracer.enabled('calls', DEBUG)
+        self._trace_dialer = self._tracer.enabled('dialer', DEBUG)
 
+        # Reports on the progress of the simulation (see reporting)
+        self._reporter = DetailReporter(self.REPORTING_INTERVAL) if reporter is None else reporter
 
+        # If set, the agents are shared with other simulations (see multi_campaign). Answered calls go to the free
+        # agents with this simulation's skill, or queue alongside the other simulations' calls for that skill.
+        self._agent_pool = None
+        self._skill = None
+        self._priority = 0
+
+        # Statistics of the recent calls, kept up to date as the calls progress, for the dialing algorithms to use
+        self._statistics = CallStatistics() if statistics is None else statistics
+
+        # If set, the Profiler that records where the time goes (see profiling)
+        self._profiler = profiler
+
+
+    def default_history_filename(self):
+        """
+        :return: a history filename unique to this simulation: its algorithm, process and when it was created, eg
+        history_SimulationFreeAgent_1234_20140101120000123456.parquet (.pkl without pyarrow)
+        """
+        return 'history_{}_{}_{}{}'.format(type(self).__name__, os.getpid(),
+                                           datetime.datetime.now().strftime('%Y%m%d%H%M%S%f'), DEFAULT_EXTENSION)
 
 
     def number_created_calls(self):
@@ -117,7 +206,7 @@ class Simulation:
         return len(self._talking_calls)
 
     def number_disconnected_calls(self):
-        return len(self._disconnected_calls)
+        return self._number_disconnected_calls
 
     def number_in_progress_calls(self):
         return self.number_created_calls() + self.number_ringing_calls()
@@ -126,6 +215,14 @@ class Simulation:
         return self.number_created_calls() + self.number_ringing_calls()  \
                 + self.number_queued_calls() + self.number_talking_calls()
 
+    def number_free_agents(self):
+        """
+        :return: the number of agents free to take a call from this simulation
+        """
+        if self._agent_pool is None:
+            return self._number_free_agents
+        return self._agent_pool.number_free_agents(self._skill)
+
     def number_trunks_in_use(self):
         return self.number_created_calls() + self.number_queued_calls() + self.number_talking_calls() + self.number_ringing_calls()
 
@@ -135,38 +232,79 @@ class Simulation:
         Start the dialer.
         :param calling_list:
         :param duration_shift:
-        :return:
+        :return: the profile of the run if there is a profiler (see profile)
         """
-        log.info('Running simulation for {} mins with {} agents'.format(self.millis_to_hours(duration_shift),
-                                                                        self._number_agents))
-        log.debug('stop_immediately set to {}'.format(self.stop_immediately_when_no_calls))
-
-        self._calling_list = calling_list
-        self._duration_shift = duration_shift
+        self.begin(calling_list, duration_shift)
 
         still_going = True
         while still_going:
-            self._current_time += self.EPOCH
-
-            self.handle_shift_over()
+            if self._event_driven:
+                self._advance_to(self._next_event_time())
+            else:
+                self._advance_to(self._current_time + self.EPOCH)
 
-            self._tick()
+            self._handle_epoch()
 
             # We finish whenever we haven't got any more calls to go and the remaining calls in the system
             # finish.
-            if self.dialer_stopping():
-                if self.stop_immediately_when_no_calls or (self.number_all_calls() == 0):
-                    still_going = False
+            still_going = not self.finished()
+
+        self.end()
+
+        return self.profile()
+
+
+    def begin(self, calling_list, duration_shift):
+        if self._profiler is not None:
+            self._profiler.started()
+
+        self._reporter.started(self, duration_shift)
+
+        self._calling_list = calling_list
+        self._duration_shift = duration_shift
+
+
+    def finished(self):
+        """
+        :return: whether the simulation has run its course
+        """
+        return self.dialer_stopping() and (self.stop_immediately_when_no_calls or (self.number_all_calls() == 0))
+
+
+    def end(self):
+        self._history.close()
+
+        self._tracer.flush()
+
+        self._reporter.finished(self)
+
+        if self._profiler is not None:
+            self._profiler.finished()
+
 
-        if self._generate_history_file:
-            df = pd.DataFrame.from_dict(self._history, orient='index')
-            log.debug(df)
-            df.to_pickle('history.pkl')
+    def profile(self):
+        """
+        :return: the profile recorded by the profiler (see Profiler.results) or None if we don't have one
+        """
+        return None if self._profiler is None else self._profiler.results()
 
-        log.info('Finished. Time is: {}'.format(self.millis_to_hours(self._current_time)))
 
-        self.print_report()
-        self.print_end_report()
+    def join_agent_pool(self, agent_pool, skill, priority=0):
+        """
+        Take agents from a pool shared with other simulations rather than having our own.
+        :param agent_pool: the AgentPool
+        :param skill: the skill an agent needs to take our calls
+        :param priority: our queued calls are answered before those of simulations with a lower priority
+        :return:
+        """
+        self._agent_pool = agent_pool
+        self._skill = skill
+        self._priority = priority
+
+        self._number_agents = agent_pool.number_agents(skill)
+        self._number_free_agents = agent_pool.number_free_agents(skill)
+        self._number_busy_agents = 0
+        self.max_dial_level = self._number_agents / 4
 
 
     def dialer_stopping(self):
@@ -178,32 +316,173 @@ class Simulation:
         return not self._still_have_calls or self._shift_over
 
 
-    def _tick(self):
+    def _advance_to(self, next_time):
         """
-        An epoch has gone past. Update the state of the system.
+        Move the current time on to the next epoch to be handled, end the shift if it's over and update the agent
+        statistics for the epoch. The statistics for any epochs we skip over are accumulated in one go as nothing
+        changes in them.
+        :param next_time:
         :return:
         """
+        skipped_epochs = (next_time - self._current_time) // self.EPOCH - 1
+        if skipped_epochs > 0:
+            self._update_agent_stats(skipped_epochs)
+
+        self._current_time = next_time
+
+        self.handle_shift_over()
+
         self._update_agent_stats()
 
+
+    def _next_event_time(self):
+        """
+        Determine the next epoch that needs to be processed.
+        :return: the time of the next epoch in which a call event falls due, or we dial, report or take a checkpoint
+        """
+        next_time = self._current_time + self.EPOCH
+
+        candidates = [self._next_multiple_of(self._history.interval)]
+
+        if self._reporter.interval is not None:
+            candidates.append(self._next_multiple_of(self._reporter.interval))
+
+        if not self._shift_over:
+            if self._paced:
+                if len(self._dial_requests) > 0:
+                    candidates.append(self._dial_requests[0])
+            else:
+                candidates.append(self._next_multiple_of(self._dial_level_recalc_period))
+                candidates.append(self._next_multiple_of(self.ONE_SECOND))
+            candidates.append(self._round_up_to_epoch(self._duration_shift))
+
+        event_time = self._peek_event_time()
+        if event_time is not None:
+            candidates.append(event_time)
+
+        if self._agents is not None and self._agents.next_event_time() is not None:
+            candidates.append(self._round_up_to_epoch(self._agents.next_event_time()))
+
+        return max(next_time, min(candidates))
+
+
+    def _next_multiple_of(self, interval):
+        return (self._current_time // interval + 1) * interval
+
+
+    def _round_up_to_epoch(self, time):
+        return int(-(-time // self.EPOCH) * self.EPOCH)
+
+
+    def _schedule_next_event(self, call, order):
+        """
+        Add the next event of a call to the event queue. An event that is already due is handled in this epoch if
+        calls in its state have still to be handled, otherwise it is handled in the next epoch.
+        :param call:
+        :param order: the order of the state that the call is now in (eg: ORDER_RINGING)
+        :return:
+        """
+        if len(call._future_events) == 0:
+            return
+
+        event = call._future_events[0]
+
+        epoch = self._round_up_to_epoch(event.time)
+        if epoch <= self._current_time:
+            if self._handling_order is not None and order > self._handling_order:
+                epoch = self._current_time
+            else:
+                epoch = self._current_time + self.EPOCH
+
+        self._event_sequence += 1
+        heapq.heappush(self._event_queue, (epoch, order, self._event_sequence, call, event))
+
+
+    def _is_next_event(self, call, order, event):
+        """
+        Check that a queued event is still going to happen, ie the call is still in the same state and the event
+        hasn't already been handled.
+        """
+        return len(call._future_events) > 0 and call._future_events[0] is event \
+            and call.unique_id in self._calls_by_order[order]
+
+
+    def _peek_event_time(self):
+        """
+        Find the epoch of the earliest event that is still to happen.
+        :return: the epoch or None if there are no calls in progress
+        """
+        while len(self._event_queue) > 0:
+            epoch, order, _, call, event = self._event_queue[0]
+            if self._is_next_event(call, order, event):
+                return epoch
+            heapq.heappop(self._event_queue)
+
+        return None
+
+
+    def _handle_epoch(self):
+        """
+        An epoch has gone past. Update the state of the system.
+        :return:
+        """
+        if self._profiler is not None:
+            self._handle_profiled_epoch()
+            return
+
+        if self._agents is not None:
+            self.handle_agent_events()
+
         self.handle_call_events()
 
         if not self._shift_over:
             self.calculate()
 
-        if self._current_time % self.REPORTING_INTERVAL == 0:
-            self.print_report()
+        if self._reporter.interval is not None and self._current_time % self._reporter.interval == 0:
+            self._reporter.report(self)
 
         self._create_checkpoint()
 
 
+    def _handle_profiled_epoch(self):
+        """
+        The same as _handle_epoch, timing each phase.
+        :return:
+        """
+        profiler = self._profiler
+
+        if self._agents is not None:
+            profiler.time('agent_events', self.handle_agent_events)
+
+        profiler.time('call_events', self.handle_call_events)
+
+        if not self._shift_over:
+            profiler.time('calculate', self.calculate)
+
+        if self._reporter.interval is not None and self._current_time % self._reporter.interval == 0:
+            profiler.time('report', lambda: self._reporter.report(self))
+
+        profiler.time('checkpoint', self._create_checkpoint)
+
+        profiler.observe(self)
+
+
     def calculate(self):
         """
         Determine whether we need to caclulate the dial level
         :return:
         """
+        if self._paced:
+            self.dial_paced_calls()
+            return
 
         if self._current_time % self._dial_level_recalc_period == 0:
-            self._dial_level = self.recalc_dial_level()
+            if self._profiler is None:
+                self._dial_level = self.recalc_dial_level()
+            else:
+                self._dial_level = self._profiler.time('recalc_dial_level', self.recalc_dial_level)
+            if self._trace_dialer:
+                self._tracer.trace('dialer', self._current_time, 'dial_level', dial_level=self._dial_level)
 
         if self._current_time % Simulation.ONE_SECOND == 0:
             calls_to_make, self._fractional_call = divmod(self._dial_level + self._fractional_call, 1)
@@ -216,6 +495,63 @@ class Simulation:
                 self._still_have_calls = self.generate_call(calls_to_make)
 
 
+    def request_dial(self, time):
+        """
+        Ask for pace_calls to be called at the given time (rounded up to the epoch). Only used if the simulation is
+        paced. A dial requested while call events are being handled is made later in the same epoch.
+        :param time:
+        :return:
+        """
+        heapq.heappush(self._dial_requests, max(self._round_up_to_epoch(time), self._current_time))
+
+
+    def dial_paced_calls(self):
+        """
+        Make the calls the algorithm asks for if it has requested a dial in this epoch.
+        :return:
+        """
+        if len(self._dial_requests) == 0 or self._dial_requests[0] > self._current_time:
+            return
+
+        while len(self._dial_requests) > 0 and self._dial_requests[0] <= self._current_time:
+            heapq.heappop(self._dial_requests)
+
+        if self._profiler is None:
+            calls_to_make = self.pace_calls()
+        else:
+            calls_to_make = self._profiler.time('recalc_dial_level', self.pace_calls)
+        calls_wanted = math.floor(calls_to_make)
+        calls_to_make = min(self.MAX_CALLS_TO_GENERATE, calls_wanted)
+        if self._trace_dialer:
+            self._tracer.trace('dialer', self._current_time, 'paced', calls=calls_to_make)
+
+        if calls_to_make > 0:
+            self._still_have_calls = self.generate_call(calls_to_make)
+
+        if calls_wanted > calls_to_make and self._still_have_calls:
+            # Make the rest next epoch, as nothing else may ask for them
+            self.request_dial(self._current_time + self.EPOCH)
+
+
+    def pace_calls(self):
+        """
+        Paced algorithms implement this to work out how many calls to make when a requested dial falls due.
+        :return: the number of calls to make now
+        """
+        return self.recalc_dial_level()
+
+
+    def agent_available(self):
+        """
+        Called whenever an agent becomes available for a call to be dialed for them: when they're released from a
+        call (or finish its wrap-up), when they log in, or when a call that might have gone to them ends without
+        reaching them. Paced algorithms can use this
+        to request a dial.
+        :return:
+        """
+        pass
+
+
     def generate_call(self, number_calls=1):
         """
         Retrieve a number from the calling list and 'dial' it.
@@ -226,10 +562,15 @@ class Simulation:
         for i in range(0, int(number_calls)):
             call = self.get_next_calling_list_entry(call)
             if call is not None:
-                log.debug('{}: make call: {}, outcome: {}'.format(self.millis_to_hours(self._current_time), call.unique_id, call.outcome_code))
+                if self._trace_calls:
+                    self._tracer.trace('calls', self._current_time, 'make_call', call=call.unique_id,
+                                       outcome=call.outcome_code)
                 self._created_calls[call.unique_id] = call
                 call.dial(self._current_time)
+                self._schedule_next_event(call, self.ORDER_CREATED)
                 self.total_number_calls += 1
+                if self._profiler is not None:
+                    self._profiler.count_event(CallState.created)
             else:
                 log.info('No more calls')
         return call is not None
@@ -240,23 +581,32 @@ class Simulation:
 
 
     def handle_call_events(self):
-        self.handle_call_events_in(self._created_calls)
-        self.handle_call_events_in(self._ringing_calls)
-        self.handle_call_events_in(self._queued_calls)
-        self.handle_call_events_in(self._talking_calls)
+        """
+        Handle all of the call events that are due in this epoch. We only look at the calls that have an event due
+        rather than polling every call in progress.
+        :return:
+        """
+        profiler = self._profiler
+
+        while len(self._event_queue) > 0 and self._event_queue[0][0] <= self._current_time:
+            _, order, _, call, event = heapq.heappop(self._event_queue)
 
+            if not self._is_next_event(call, order, event):
+                continue
+
+            self._handling_order = order
 
-    def handle_call_events_in(self, list_events):
-        for unique_id in list(list_events.keys()):
-            call = list_events[unique_id]
             ev = call.next_event(self._current_time)
-            if ev is not None:
-                if ev.state == CallState.ringing:
-                    self.handle_ringing(call)
-                if ev.state == CallState.answered:
-                    self.handle_answered(call)
-                if ev.state == CallState.disconnected:
-                    self.handle_disconnected(call)
+            if profiler is not None:
+                profiler.count_event(ev.state)
+            if ev.state == CallState.ringing:
+                self.handle_ringing(call)
+            if ev.state == CallState.answered:
+                self.handle_answered(call)
+            if ev.state == CallState.disconnected:
+                self.handle_disconnected(call)
+
+        self._handling_order = None
 
 
     def handle_ringing(self, call):
@@ -265,11 +615,13 @@ class Simulation:
         :param call:
         :return:
         """
-        log.debug('{}: {}: ringing.'.format(self.millis_to_hours(self._current_time), call.unique_id))
+        if self._trace_calls:
+            self._tracer.trace('calls', self._current_time, 'ringing', call=call.unique_id)
 
         self._created_calls.pop(call.unique_id)
 
         self._ringing_calls[call.unique_id] = call
+        self._schedule_next_event(call, self.ORDER_RINGING)
 
 
     def handle_answered(self, call):
@@ -278,57 +630,107 @@ class Simulation:
         :param call:
         :return:
         """
-        log.debug('{}: {}: answered.'.format(self.millis_to_hours(self._current_time), call.unique_id))
+        if self._trace_calls:
+            self._tracer.trace('calls', self._current_time, 'answered', call=call.unique_id)
         self._ringing_calls.pop(call.unique_id)
         self.total_number_answered_calls += 1
+        self._statistics.add_answered(call.ringing_time(self._current_time))
 
-        if self._number_free_agents > 0:
+        if self.number_free_agents() > 0:
             self.transfer_to_agent(call)
         elif self.number_queued_calls() < self.LIMIT_QUEUED_CALLS:
             self.transfer_to_queue(call)
         else:
             # No agents and we can't queue the call - abandon it
-            self._disconnected_calls[call.unique_id] = call
+            self._add_disconnected_call(call)
             self.total_number_abandon_calls += 1
+            self._statistics.add_abandoned()
 
 
     def transfer_to_queue(self, call):
         self._queued_calls[call.unique_id] = call
         call.queued(self._current_time, self._calling_list.get_queued_call())
+        self._schedule_next_event(call, self.ORDER_QUEUED)
+        if self._profiler is not None:
+            self._profiler.count_event(CallState.queued)
+
+        if self._agent_pool is not None:
+            self._agent_pool.enqueue(self, call)
 
 
     def transfer_to_agent(self, call):
-        log.debug('{}: {}: transferred.'.format(self.millis_to_hours(self._current_time), call.unique_id))
-        self._make_agent_busy()
+        if self._trace_calls:
+            self._tracer.trace('calls', self._current_time, 'transferred', call=call.unique_id)
+        if self._agent_pool is None:
+            self._make_agent_busy()
+            if self._agents is not None:
+                self._agents.take(call, self._current_time)
+        else:
+            self._agent_pool.take(self, call)
+            self._number_busy_agents += 1
         self._talking_calls[call.unique_id] = call
         self.total_number_talking_calls += 1
+        self._statistics.add_transferred()
         call.talking(self._current_time)
+        self._schedule_next_event(call, self.ORDER_TALKING)
+        if self._profiler is not None:
+            self._profiler.count_event(CallState.talking)
 
 
     def handle_disconnected(self, call):
-        log.debug('{}: {}: disconnected. ({})'.format(self.millis_to_hours(self._current_time), call.unique_id, call.outcome_code))
+        if self._trace_calls:
+            self._tracer.trace('calls', self._current_time, 'disconnected', call=call.unique_id,
+                               outcome=call.outcome_code)
 
         if call.unique_id in self._created_calls:
             del(self._created_calls[call.unique_id])
             self.total_number_not_answered_calls += 1
+            self._statistics.add_not_answered()
+            if self._paced:
+                self.agent_available()
 
         elif call.unique_id in self._ringing_calls:
             del(self._ringing_calls[call.unique_id])
             self.total_number_not_answered_calls += 1
+            self._statistics.add_not_answered(call.ringing_time(self._current_time))
+            if self._paced:
+                self.agent_available()
 
         elif call.unique_id in self._queued_calls:
             # This occurs whenever the call leaves the queue - treat this as an abandoned call
             self.total_number_abandon_calls += 1
+            self._statistics.add_abandoned()
             del(self._queued_calls[call.unique_id])
+            if self._paced:
+                self.agent_available()
 
         elif call.unique_id in self._talking_calls:
             del(self._talking_calls[call.unique_id])
-            self.release_agent()
+            self._statistics.add_talk_time(call.talk_time(self._current_time))
+            if self._agents is not None:
+                # The agent may have wrap-up to do first - _agent_available says when they're free
+                self._end_agent_call(call)
+            else:
+                if self._agent_pool is None:
+                    self.release_agent()
+                else:
+                    # The pool gives the agent the longest waiting call of the highest priority for their skills
+                    self._number_busy_agents -= 1
+                    self._agent_pool.release(call)
+                if self._paced:
+                    self.agent_available()
+
+        self._add_disconnected_call(call)
 
-        self._disconnected_calls[call.unique_id] = call
+        # Save this calling list entry for later use by genetic algorithm. Only its record is needed to replay it.
+        if self.STORE_FINISHED_CALLS:
+            self._stored_calling_list_entry.append(call.record, self._current_time)
 
-        # Save this calling list entry for later use by genetic algorithm
-        self._stored_calling_list_entry.append(call)
+
+    def _add_disconnected_call(self, call):
+        self._number_disconnected_calls += 1
+        if self._keep_disconnected_calls:
+            self._disconnected_calls[call.unique_id] = call
 
 
     def release_agent(self):
@@ -344,6 +746,69 @@ class Simulation:
             self._number_agents -= 1
 
 
+    def _end_agent_call(self, call):
+        """
+        The agent talking to a call has finished. They're free now unless they have some wrap-up to do.
+        :param call:
+        :return:
+        """
+        agent, free = self._agents.end_call(call, self._current_time)
+        if free:
+            self.make_agent_free()
+            self._agent_available(agent)
+
+
+    def _agent_available(self, agent):
+        """
+        An agent has become free, either by logging in or finishing a call (and its wrap-up). They take the next
+        queued call unless they're due to log off, otherwise they're available for a call to be dialed for them.
+        :param agent:
+        :return:
+        """
+        self._agents.make_idle(agent, self._current_time)
+
+        if agent.logging_out:
+            self._log_off_agent(agent)
+        elif self.number_queued_calls() > 0:
+            # The call goes to the agent idle the longest - there won't be another idle agent while calls are queued
+            _, call = self._queued_calls.popitem(last=False)
+            self.transfer_to_agent(call)
+        elif self._shift_over:
+            self._log_off_agent(agent)
+        elif self._paced:
+            self.agent_available()
+
+
+    def _log_off_agent(self, agent):
+        self._agents.log_off(agent, self._current_time)
+        self._number_free_agents -= 1
+        self._number_agents -= 1
+
+
+    def handle_agent_events(self):
+        """
+        Handle the agent logins, logouts and ends of wrap-up that are due in this epoch.
+        :return:
+        """
+        for kind, agent in self._agents.due_events(self._current_time):
+            if kind == self._agents.LOGIN:
+                # Nobody logs in once the shift is over
+                if not self._shift_over:
+                    self._number_agents += 1
+                    self._number_free_agents += 1
+                    self._agent_available(agent)
+
+            elif kind == self._agents.LOGOUT:
+                if agent.state == AgentState.idle:
+                    self._log_off_agent(agent)
+                elif agent.state != AgentState.logged_off:
+                    agent.logging_out = True
+
+            else:
+                self.make_agent_free()
+                self._agent_available(agent)
+
+
     def make_agent_free(self):
         self._number_busy_agents -= 1
         self._number_free_agents += 1
@@ -358,11 +823,15 @@ class Simulation:
         self._number_free_agents -= 1
 
 
-    def _update_agent_stats(self):
-        self.total_agent_talk_time += self._number_busy_agents * self.EPOCH
-        self.total_agent_idle_time += self._number_free_agents * self.EPOCH
+    def _update_agent_stats(self, number_epochs=1):
+        if self._agent_pool is not None:
+            self._number_free_agents = self._agent_pool.number_free_agents(self._skill)
 
-        self._current_talk_time = self.total_agent_talk_time / (self.total_agent_talk_time + self.total_agent_idle_time)
+        self.total_agent_talk_time += self._number_busy_agents * self.EPOCH * number_epochs
+        self.total_agent_idle_time += self._number_free_agents * self.EPOCH * number_epochs
+
+        agent_time = self.total_agent_talk_time + self.total_agent_idle_time
+        self._current_talk_time = 0 if agent_time == 0 else self.total_agent_talk_time / agent_time
         self._current_abandonment_rate = 0 if self.total_number_answered_calls == 0 else self.total_number_abandon_calls / self.total_number_answered_calls
 
 
@@ -381,9 +850,14 @@ class Simulation:
             for call in remain_created_calls:
                 self.handle_disconnected(call)
 
-            # All of the idle agents can log off immediately
-            self._number_agents -= self._number_free_agents
-            self._number_free_agents = 0
+            # All of the idle agents can log off immediately (the agent pool, if we share one, logs its own off)
+            if self._agents is not None:
+                for agent in self._agents.idle_agents():
+                    self._agents.log_off(agent, self._current_time)
+
+            if self._agent_pool is None:
+                self._number_agents -= self._number_free_agents
+                self._number_free_agents = 0
 
             #for call in self._talking_calls:
             #    print('Remaining: {}'.format(call))
@@ -391,58 +865,8 @@ class Simulation:
 
     def _create_checkpoint(self):
 
-        if self._current_time % self.SAVE_HISTORY_INTERVAL == 0:
-
-            h = {'current_time': self._current_time,
-                 'number_created_calls': self.number_created_calls(),
-                 'number_ringing_calls': self.number_ringing_calls(),
-                 'number_queued_calls': self.number_queued_calls(),
-                 'number_talking_calls': self.number_talking_calls(),
-                 'number_disconnected_calls': self.number_disconnected_calls(),
-                 'number_free_agents': self._number_free_agents,
-                 'number_busy_agents': self._number_busy_agents,
-                 'total_number_answered_calls': self.total_number_answered_calls,
-                 'total_number_not_answered_calls': self.total_number_not_answered_calls,
-                 'total_number_abandon_calls': self.total_number_abandon_calls,
-                 'total_number_calls': self.total_number_calls,
-                 'total_agent_idle_time': self.total_agent_idle_time,
-                 'total_agent_talk_time': self.total_agent_talk_time,
-                 'current_talk_time': self._current_talk_time,
-                 'current_abandonment_rate': self._current_abandonment_rate  }
-            self._history[self._current_time] = h
-
-
-    def print_report(self):
-        created_calls = self._created_calls.values()
-
-        mystr = ''
-        for call in created_calls:
-            mystr += '{} '.format( call.unique_id)
-
-        log.debug('')
-        log.debug('Report:')
-        log.debug('  current_time:                    {}'.format(self.millis_to_hours(self._current_time)))
-        log.debug('  number_created_calls:            {} ({})'.format(self.number_created_calls(), mystr))
-        log.debug('  number_ringing_calls:            {}'.format(self.number_ringing_calls()))
-        log.debug('  number_queued_calls:             {}'.format(self.number_queued_calls()))
-        log.debug('  number_talking_calls:            {}'.format(self.number_talking_calls()))
-        log.debug('  number_disconnected_calls:       {}'.format(self.number_disconnected_calls()))
-        log.debug('  number_free_agents:              {}'.format(self._number_free_agents))
-        log.debug('  number_busy_agents:              {}'.format(self._number_busy_agents))
-        log.debug('  total_number_answered_calls:     {}'.format(self.total_number_answered_calls))
-        log.debug('  total_number_not_answered_calls: {}'.format(self.total_number_not_answered_calls))
-        log.debug('  total_number_abandon_calls:      {}'.format(self.total_number_abandon_calls))
-        log.debug('  total_number_talking_calls:      {}'.format(self.total_number_talking_calls))
-        log.debug('  total_number_calls:              {}'.format(self.total_number_calls))
-        log.debug('  total_agent_idle_time:           {}'.format(self.total_agent_idle_time))
-        log.debug('  total_agent_talk_time:           {}'.format(self.total_agent_talk_time))
-
-
-    def print_end_report(self):
-        log.info('')
-        log.info('Report:')
-        log.info('  abandonment rate: {:02.2f}%'.format( self._current_abandonment_rate * 100 ))
-        log.info('  talk time:        {:.2f}% ({:.2f} mins)'.format(self._current_talk_time * 100, self._current_talk_time * 60))
+        if self._current_time % self._history.interval == 0:
+            self._history.record(self)
 
 
     def millis_to_hours(self, millis):
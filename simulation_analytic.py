@@ -1,12 +1,21 @@
 from simulation import Simulation
+from running_stats import CallStatistics
 import math
-import logging as log
 
 
 class SimulationAnalytic(Simulation):
 
-    def __init__(self):
-        Simulation.__init__(self, False)
+    # The number of recent calls the answer probability and average call length are taken over
+    STATISTICS_WINDOW = 500
+
+    def __init__(self, number_agents=40, event_driven=False, tracer=None, reporter=None, history=None,
+                 statistics=None, agents=None, profiler=None):
+        if statistics is None:
+            statistics = CallStatistics(self.STATISTICS_WINDOW)
+
+        Simulation.__init__(self, False, number_agents=number_agents, event_driven=event_driven, tracer=tracer,
+                            reporter=reporter, history=history, statistics=statistics, agents=agents,
+                            profiler=profiler)
         
         # We desire all agents to be utilised at all times
         self._desired_agent_occupation_rate = 1
@@ -30,19 +39,21 @@ class SimulationAnalytic(Simulation):
 
         number_calls_to_make = 0
 
-        if self._current_time < self.ONE_MINUTE:
+        # Until we've seen calls answered and finished talking we've nothing to go on, so dial steadily
+        if self._current_time < self.ONE_MINUTE or self._statistics.answer_rate() == 0 \
+                or self._statistics.mean_talk_time() == 0:
             if self._current_time % self.ONE_SECOND == 0:
                 number_calls_to_make = 1
         elif self._current_abandonment_rate > self._max_abandonment_rate:
             number_calls_to_make = 0
         else:
             # Tmax = N * AO
-            self._max_traffic = self._number_free_agents * self._desired_agent_occupation_rate
+            self._max_traffic = self.number_free_agents() * self._desired_agent_occupation_rate
 
-            # Calculate probability of answer, p
-            self._prob_answer = self.total_number_answered_calls / self.total_number_calls
+            # Calculate probability of answer, p, and the average length of a call over the recent calls
+            self._prob_answer = self._statistics.answer_rate()
 
-            ave_length_call = (self.total_agent_talk_time / 1000) / self.total_number_talking_calls
+            ave_length_call = self._statistics.mean_talk_time() / 1000
 
             denom = self._prob_answer * ave_length_call
 
@@ -54,7 +65,8 @@ class SimulationAnalytic(Simulation):
             available_trunks = self._max_trunks - self.number_trunks_in_use()
 
             number_calls_to_make = min(available_trunks, max(0, calls))
-            log.debug('calls: {}'.format(number_calls_to_make))
+            if self._trace_dialer:
+                self._tracer.trace('dialer', self._current_time, 'calls', calls=number_calls_to_make)
 
 
 
@@ -5,9 +5,14 @@ import logging as log
 
 class SimulationConstantCall(Simulation):
 
-    def __init__(self, dial_level = 1, stop_immediately_when_no_calls = False, number_agents=40, generate_history_file=True):
-
-        Simulation.__init__(self, stop_immediately_when_no_calls, number_agents=number_agents, generate_history_file=generate_history_file)
+    def __init__(self, dial_level = 1, stop_immediately_when_no_calls = False, number_agents=40, generate_history_file=True,
+                 event_driven=False, keep_disconnected_calls=True, tracer=None, reporter=None, history=None,
+                 statistics=None, agents=None, profiler=None):
+
+        Simulation.__init__(self, stop_immediately_when_no_calls, number_agents=number_agents,
+                            generate_history_file=generate_history_file, event_driven=event_driven,
+                            keep_disconnected_calls=keep_disconnected_calls, tracer=tracer, reporter=reporter,
+                            history=history, statistics=statistics, agents=agents, profiler=profiler)
 
         if dial_level < 0:
             dial_level = 0
@@ -4,11 +4,27 @@ import logging as log
 
 class SimulationFreeAgent(Simulation):
 
-    def __init__(self, stop_immediately_when_no_calls = False, number_agents=40, generate_history_file=True):
-        Simulation.__init__(self, stop_immediately_when_no_calls, number_agents=number_agents, generate_history_file=generate_history_file)
+    def __init__(self, stop_immediately_when_no_calls = False, number_agents=40, generate_history_file=True,
+                 event_driven=False, keep_disconnected_calls=True, tracer=None, reporter=None, history=None,
+                 statistics=None, paced=False, agents=None, profiler=None):
+        Simulation.__init__(self, stop_immediately_when_no_calls, number_agents=number_agents,
+                            generate_history_file=generate_history_file, event_driven=event_driven,
+                            keep_disconnected_calls=keep_disconnected_calls, tracer=tracer, reporter=reporter,
+                            history=history, statistics=statistics, agents=agents, profiler=profiler)
 
         self._dial_level_recalc_period = Simulation.EPOCH
 
+        # If paced, rather than working out every epoch how many calls to make and only making them on the second,
+        # we make calls as soon as the agents are free: at the start of the shift and whenever an agent becomes
+        # available (see agent_available)
+        self._paced = paced
+        if paced:
+            self.request_dial(0)
+
+
+    def agent_available(self):
+        self.request_dial(self._current_time)
+
 
     def recalc_dial_level(self):
         """
@@ -19,7 +35,7 @@ class SimulationFreeAgent(Simulation):
         in_progress = self.number_created_calls() + self.number_ringing_calls() + self.number_queued_calls()
 
         # Do we have excess agents?
-        number_calls_to_make = self._number_free_agents - in_progress
+        number_calls_to_make = self.number_free_agents() - in_progress
 
         if number_calls_to_make < 0:
             number_calls_to_make = 0
@@ -1,15 +1,69 @@
 from simulation_constant_call import SimulationConstantCall
 from simulation import Simulation
-from calling_list import CallingList
+from calling_list import CallingList, CallingListWindow
 from collections import OrderedDict
+from tracing import DEBUG, INFO
+from reporting import Reporter
+from estimator import ConstantCallEstimator
 import datetime
+import multiprocessing
 import random
 import math
 import logging as log
 
 
+# The calling list window used by a worker process to evaluate chromosomes (see SimulationGenetic.rerun_past_calls)
+_worker_window = {}
+
+
+def _init_worker(calls, queued_calls, number_agents, event_driven):
+    """
+    Receive the calling list window once when the worker process starts rather than with every chromosome.
+    """
+    _worker_window['calling_list'] = CallingList(CallingListWindow(calls), queued_calls)
+    _worker_window['number_agents'] = number_agents
+    _worker_window['event_driven'] = event_driven
+
+
+def _evaluate_dial_level(dial_level):
+    """
+    Run the calling list window in a worker process at the given dial level.
+    :param dial_level:
+    :return: talk time, abandonment rate
+    """
+    cl = _worker_window['calling_list']
+    cl.reset()
+
+    return run_constant_call_simulation(dial_level, cl, _worker_window['number_agents'],
+                                        _worker_window['event_driven'])
+
+
+def run_constant_call_simulation(dial_level, cl, number_agents, event_driven):
+    """
+    Run a calling list at a constant dial level until all of its calls have been made.
+    :param dial_level:
+    :param cl:
+    :param number_agents:
+    :param event_driven:
+    :return: talk time, abandonment rate
+    """
+    scc = SimulationConstantCall(dial_level,
+                                 stop_immediately_when_no_calls=True,
+                                 number_agents=number_agents,
+                                 generate_history_file=False,
+                                 event_driven=event_driven,
+                                 keep_disconnected_calls=False,
+                                 reporter=Reporter())
+    scc.start(cl)
+
+    return scc._current_talk_time, scc._current_abandonment_rate
+
+
 class SimulationGenetic(SimulationConstantCall):
 
+    # We replay the calls made since the last recalculation
+    STORE_FINISHED_CALLS = True
+
     class Chromosome:
         def __init__(self, dial_level, max_abandonment_rate):
             self.dial_level = dial_level
@@ -36,14 +90,74 @@ class SimulationGenetic(SimulationConstantCall):
 
             return fitness
 
-    def __init__(self, number_agents=40):
-        SimulationConstantCall.__init__(self, number_agents=number_agents)
+    class FitnessCache:
+        """
+        Remember the result of simulating a calling list window at a dial level so that chromosomes we have already
+        seen (eg: parents carried over to the next generation) aren't simulated again. The least recently used
+        results are dropped once the cache is full.
+
+        By default only exactly the same dial level is taken from the cache, so the results are the same as without
+        it. Given a dial_level_quantum, dial levels closer together than that share a result - more hits, but the
+        chosen dial level can move by up to the quantum.
+        """
+        def __init__(self, max_size=256, dial_level_quantum=None):
+            self.max_size = max_size
+
+            # Dial levels closer together than this are treated as the same dial level (None to key on the exact
+            # dial level)
+            self.dial_level_quantum = dial_level_quantum
+
+            self._results = OrderedDict()
+            self.hits = 0
+            self.misses = 0
+
+        def key(self, dial_level, window, number_agents):
+            if self.dial_level_quantum is not None:
+                dial_level = round(dial_level / self.dial_level_quantum)
+            return dial_level, window, number_agents
+
+        def get(self, key):
+            """
+            :param key:
+            :return: the cached result or None if we don't have one
+            """
+            result = self._results.get(key)
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._results.move_to_end(key)
+            return result
+
+        def put(self, key, result):
+            self._results[key] = result
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_size:
+                self._results.popitem(last=False)
+
+        def reset_counts(self):
+            self.hits = 0
+            self.misses = 0
+
+    def __init__(self, number_agents=40, event_driven=False, number_processes=1, keep_disconnected_calls=True,
+                 limit_replay_to_recalc_window=False, prescreen_fraction=None, tracer=None, reporter=None,
+                 history=None, statistics=None, agents=None, profiler=None):
+        # The sub-simulations that evaluate each chromosome are never traced or reported on
+        SimulationConstantCall.__init__(self, number_agents=number_agents, event_driven=event_driven,
+                                        keep_disconnected_calls=keep_disconnected_calls, tracer=tracer,
+                                        reporter=reporter, history=history, statistics=statistics,
+                                        agents=agents, profiler=profiler)
 
         self._last_stored_calling_list_entry = 0
 
         self._recalc_interval = Simulation.ONE_MINUTE * 15
         self._recalc_window = Simulation.ONE_MINUTE * 10
 
+        # Calls made before the last recalculation are never replayed so they are dropped from the stored calls.
+        # Optionally only the calls that finished within the recalculation window are replayed.
+        if limit_replay_to_recalc_window:
+            self._stored_calling_list_entry.max_age = self._recalc_window
+
         self.population_size = 11
 
         # Split the population in two (and account for the fct that the current dial level is also to be inserted
@@ -59,6 +173,19 @@ class SimulationGenetic(SimulationConstantCall):
         # The chance that a child chromosome will mutate
         self._mutate_probability = 0.1
 
+        # The number of processes that evaluate a population. If more than one then the chromosomes are simulated in
+        # parallel by a pool of worker processes.
+        self._number_processes = number_processes
+        self._pool = None
+
+        self._fitness_cache = SimulationGenetic.FitnessCache()
+
+        # If set, the fitness of each generation is first estimated analytically (see estimator) and only this
+        # fraction of the chromosomes, the most promising, are simulated. The rest keep their estimated fitness.
+        self._prescreen_fraction = prescreen_fraction
+        self._estimator = None
+        self._mean_patience = None
+
 
     def recalc_dial_level(self):
         """
@@ -87,15 +214,41 @@ class SimulationGenetic(SimulationConstantCall):
 
         population = self.get_initial_population(self._dial_level, self.population_size)
 
-        for i in range(self.number_generations):
-            population = self.evolve(population)
+        self._fitness_cache.reset_counts()
+
+        if self._prescreen_fraction is not None:
+            self._estimator = self.create_estimator()
+
+        if self._number_processes > 1:
+            # The calling list window doesn't change while we evolve, so each worker receives it once
+            window = (self._stored_calling_list_entry[self._last_stored_calling_list_entry:],
+                      list(self._calling_list._queued_calls))
+
+            self._pool = multiprocessing.Pool(self._number_processes, _init_worker,
+                                              window + (self._number_agents, self._event_driven))
+            try:
+                for i in range(self.number_generations):
+                    population = self.evolve(population)
+            finally:
+                self._pool.close()
+                self._pool.join()
+                self._pool = None
+        else:
+            for i in range(self.number_generations):
+                population = self.evolve(population)
 
         population.sort(reverse=True)
 
         self._last_stored_calling_list_entry = len(self._stored_calling_list_entry)
+        self._stored_calling_list_entry.discard_before(self._last_stored_calling_list_entry)
 
         log.info('')
         log.info('Completed Generic Algorithm Simulation. Best dial level is {}, talk time {:.2f}%'.format(population[0].dial_level, population[0].talk_time))
+        log.info('Fitness cache: {} hits, {} misses'.format(self._fitness_cache.hits, self._fitness_cache.misses))
+        if self._tracer.enabled('genetic', INFO):
+            self._tracer.trace('genetic', self._current_time, 'dial_level', dial_level=population[0].dial_level,
+                               talk_time=population[0].talk_time, abandonment_rate=population[0].abandonment_rate,
+                               cache_hits=self._fitness_cache.hits, cache_misses=self._fitness_cache.misses)
         log.info('')
 
         return population[0].dial_level
@@ -107,10 +260,10 @@ class SimulationGenetic(SimulationConstantCall):
         :param population:
         :return:
         """
-        for c in population:
-            cl = CallingList(list(self._stored_calling_list_entry[self._last_stored_calling_list_entry:]),
-                             list(self._calling_list._queued_calls))
-            c.talk_time, c.abandonment_rate = self.run_simulation(c.dial_level, cl)
+        results = self.evaluate_population(population)
+
+        for c, (talk_time, abandonment_rate) in zip(population, results):
+            c.talk_time, c.abandonment_rate = talk_time, abandonment_rate
 
         population.sort(reverse=True)
 
@@ -130,6 +283,114 @@ class SimulationGenetic(SimulationConstantCall):
 
 
 
+    def evaluate_population(self, population):
+        """
+        Find the talk time and abandonment rate of each chromosome. Chromosomes whose dial level has already been
+        simulated over this calling list window are taken from the fitness cache, the rest are simulated.
+        :param population:
+        :return: a list of (talk time, abandonment rate), one for each chromosome
+        """
+        window = self._window_identity()
+        keys = [self._fitness_cache.key(c.dial_level, window, self._number_agents) for c in population]
+
+        results = {}
+        to_simulate = OrderedDict()
+        for c, key in zip(population, keys):
+            if key in results or key in to_simulate:
+                # Same dial level as another chromosome in this population
+                self._fitness_cache.hits += 1
+                continue
+
+            result = self._fitness_cache.get(key)
+            if result is None:
+                to_simulate[key] = c.dial_level
+            else:
+                results[key] = result
+
+        if self._estimator is not None and len(to_simulate) > 1:
+            results.update(self.prescreen(to_simulate))
+
+        for key, result in zip(to_simulate, self.simulate_dial_levels(list(to_simulate.values()))):
+            self._fitness_cache.put(key, result)
+            results[key] = result
+
+        return [results[key] for key in keys]
+
+
+    def create_estimator(self):
+        """
+        :return: an estimator measured from the calls in the calling list window
+        """
+        # The time queued calls wait comes from the whole calling list, which doesn't change, so measure it once
+        if self._mean_patience is None:
+            self._mean_patience = ConstantCallEstimator.from_calling_list(self._calling_list).mean_patience
+
+        estimator = ConstantCallEstimator.from_calls(self._stored_calling_list_entry.window(
+            self._last_stored_calling_list_entry))
+        estimator.mean_patience = self._mean_patience
+        estimator.limit_queued_calls = self.LIMIT_QUEUED_CALLS
+
+        return estimator
+
+
+    def prescreen(self, to_simulate):
+        """
+        Estimate the fitness of the dial levels still to be simulated and remove all but the most promising.
+        :param to_simulate: the dial levels to simulate, by fitness cache key. The dial levels screened out are
+        removed from it.
+        :return: the estimated (talk time, abandonment rate) of the dial levels screened out, by key
+        """
+        estimates = OrderedDict()
+        chromosomes = []
+        for key, dial_level in to_simulate.items():
+            estimate = self._estimator.estimate(dial_level, self._number_agents)
+            estimates[key] = estimate.talk_time, estimate.abandonment_rate
+
+            chromosome = SimulationGenetic.Chromosome(dial_level, self.max_abandonment_rate)
+            chromosome.talk_time, chromosome.abandonment_rate = estimates[key]
+            chromosomes.append((chromosome, key))
+
+        chromosomes.sort(key=lambda item: item[0].fitness(), reverse=True)
+        number_to_simulate = max(1, math.ceil(len(chromosomes) * self._prescreen_fraction))
+
+        screened = OrderedDict()
+        for _, key in chromosomes[number_to_simulate:]:
+            del to_simulate[key]
+            screened[key] = estimates[key]
+
+        log.debug('Pre-screened out {} of {} dial levels'.format(len(screened), len(chromosomes)))
+
+        return screened
+
+
+    def simulate_dial_levels(self, dial_levels):
+        """
+        Simulate the calling list window at each dial level, in the worker processes if we have them.
+        :param dial_levels:
+        :return: a list of (talk time, abandonment rate), one for each dial level
+        """
+        if self._pool is not None:
+            return self._pool.map(_evaluate_dial_level, dial_levels)
+
+        # Every simulation shares the one window onto the stored calls (and the queued calls, which are only read)
+        window = self._stored_calling_list_entry.window(self._last_stored_calling_list_entry)
+
+        results = []
+        for dial_level in dial_levels:
+            cl = CallingList(window, self._calling_list._queued_calls)
+            results.append(self.run_simulation(dial_level, cl))
+
+        return results
+
+
+    def _window_identity(self):
+        """
+        :return: something that identifies the calling list window being simulated
+        """
+        return max(self._last_stored_calling_list_entry, self._stored_calling_list_entry.first_position()), \
+            len(self._stored_calling_list_entry)
+
+
     def regenerate_population(self, parents):
         """
         Regenerate the population pool by adding new offspring.
@@ -177,7 +438,9 @@ class SimulationGenetic(SimulationConstantCall):
         if self._mutate_probability > random.random():
             dl = chromosome.dial_level
             chromosome.dial_level = random.triangular(dl * 0.5, dl * 1.5)
-            log.debug('Mutated from {} to {}'.format(dl, chromosome.dial_level))
+            if self._tracer.enabled('genetic', DEBUG):
+                self._tracer.trace('genetic', self._current_time, 'mutated', dial_level=dl,
+                                   mutated_dial_level=chromosome.dial_level)
 
         return chromosome
 
@@ -206,13 +469,7 @@ class SimulationGenetic(SimulationConstantCall):
 
 
     def run_simulation(self, dial_level, cl):
-        scc = SimulationConstantCall(dial_level,
-                                     stop_immediately_when_no_calls=True,
-                                     number_agents=self._number_agents,
-                                     generate_history_file=False)
-        scc.start(cl)
-
-        return scc._current_talk_time, scc._current_abandonment_rate
+        return run_constant_call_simulation(dial_level, cl, self._number_agents, self._event_driven)
 
 
 
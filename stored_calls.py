@@ -0,0 +1,106 @@
+from collections.abc import Sequence
+
+from calling_list import CallingListWindow
+
+
+class StoredCalls(Sequence):
+    """
+    The calls a simulation has finished with, kept so that they can be replayed (see SimulationGenetic). Simulations
+    store just the CallRecord of each call, which is all that's needed to dial it again.
+
+    Calls are numbered from the start of the shift, so a position (eg: where the genetic algorithm last replayed
+    from) stays valid as older calls are dropped. Calls are dropped once they can no longer be replayed (see
+    discard_before) or, if max_age is set, once they finished more than max_age ms ago. Either way the memory used
+    depends on the replay window rather than the length of the shift.
+    """
+
+    def __init__(self, max_age=None):
+        """
+        :param max_age: if set, the number of milliseconds a call is kept for after it finishes
+        """
+        self.max_age = max_age
+
+        self._calls = []
+        self._times = []
+
+        # Calls before _head in _calls have been dropped but not yet removed from the list
+        self._head = 0
+
+        # The position of _calls[0]
+        self._first = 0
+
+
+    def append(self, call, time):
+        """
+        Store a finished call.
+        :param call:
+        :param time: the time the call finished
+        :return:
+        """
+        self._calls.append(call)
+        self._times.append(time)
+
+        if self.max_age is not None:
+            oldest = time - self.max_age
+            while self._head < len(self._times) and self._times[self._head] < oldest:
+                self._head += 1
+            self._compact()
+
+
+    def discard_before(self, position):
+        """
+        Drop the calls before the given position as they'll not be replayed again.
+        :param position:
+        :return:
+        """
+        self._head = max(self._head, min(position - self._first, len(self._calls)))
+        self._compact()
+
+
+    def first_position(self):
+        """
+        :return: the position of the oldest call still stored
+        """
+        return self._first + self._head
+
+
+    def window(self, start):
+        """
+        :param start: the position to replay from
+        :return: a read-only view of the stored calls from start (or the oldest call still stored)
+        """
+        return CallingListWindow(self, max(start, self.first_position()))
+
+
+    def number_stored_calls(self):
+        return len(self._calls) - self._head
+
+
+    def _compact(self):
+        # Only shift the list along once half of it has been dropped, keeping the cost per call constant
+        if self._head > 0 and self._head * 2 >= len(self._calls):
+            del self._calls[:self._head]
+            del self._times[:self._head]
+            self._first += self._head
+            self._head = 0
+
+
+    def __len__(self):
+        """
+        :return: the number of calls stored since the start of the shift, including those dropped since
+        """
+        return self._first + len(self._calls)
+
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            start = max(start, self.first_position())
+            return self._calls[start - self._first:max(start, stop) - self._first:step]
+
+        if index < 0:
+            index += len(self)
+        if index < self.first_position() or index >= len(self):
+            raise IndexError('Stored call {} is not available'.format(index))
+
+        return self._calls[index - self._first]
@@ -0,0 +1,235 @@
+import argparse
+import itertools
+import os
+import random
+import time
+from collections import namedtuple
+from multiprocessing import Pool
+import logging as log
+
+import pandas as pd
+
+from calling_list import CallingList
+from history import HistoryRecorder
+from reporting import Reporter
+from simulation import Simulation
+from simulation_analytic import SimulationAnalytic
+from simulation_constant_call import SimulationConstantCall
+from simulation_free_agent import SimulationFreeAgent
+from simulation_genetic import SimulationGenetic
+
+# The algorithms that can be swept, by the name used on the command line
+ALGORITHMS = {'constant': SimulationConstantCall,
+              'free_agent': SimulationFreeAgent,
+              'genetic': SimulationGenetic,
+              'analytic': SimulationAnalytic}
+
+# One point in the sweep. The dial level only applies to the constant call algorithm and is None for the others.
+SweepPoint = namedtuple('SweepPoint', ['algorithm', 'dial_level', 'number_agents', 'duration_shift'])
+
+# The calling list (and options) shared by the points run in each worker process
+_worker_state = {}
+
+
+def build_grid(algorithms, dial_levels, agent_counts, shift_lengths):
+    """
+    Every combination of algorithm, dial level, agent count and shift length. The other algorithms choose their own
+    dial level so they only appear once for each agent count and shift length.
+    :param algorithms: names from ALGORITHMS
+    :param dial_levels: calls per second
+    :param agent_counts:
+    :param shift_lengths: milliseconds
+    :return: a list of SweepPoints
+    """
+    points = []
+    for algorithm in algorithms:
+        if algorithm not in ALGORITHMS:
+            raise ValueError('Unknown algorithm {}, expected one of {}'.format(algorithm, ', '.join(ALGORITHMS)))
+
+        levels = dial_levels if algorithm == 'constant' else [None]
+        for dial_level, number_agents, duration_shift in itertools.product(levels, agent_counts, shift_lengths):
+            points.append(SweepPoint(algorithm, dial_level, number_agents, duration_shift))
+
+    return points
+
+
+def history_filename(point, extension='.pkl'):
+    """
+    :param point:
+    :param extension:
+    :return: a name for the history of a point, in the style of those in history/ (eg history_constant_40agent_2_5.pkl)
+    """
+    name = 'history_{}_{}agent'.format(point.algorithm.replace('_', ''), point.number_agents)
+    if point.dial_level is not None:
+        name += '_{:g}'.format(point.dial_level).replace('.', '_')
+    name += '_{:g}min'.format(point.duration_shift / Simulation.ONE_MINUTE).replace('.', '_')
+    return name + extension
+
+
+def create_simulation(point, event_driven=True, history=None):
+    """
+    :param point:
+    :param event_driven:
+    :param history: the HistoryRecorder for the simulation, or None to not write one
+    :return: the simulation for a point. Nothing is reported, nor are the disconnected calls kept.
+    """
+    if history is None:
+        history = HistoryRecorder(None, Simulation.SAVE_HISTORY_INTERVAL)
+
+    options = dict(number_agents=point.number_agents, event_driven=event_driven, reporter=Reporter(),
+                   history=history)
+
+    if point.algorithm == 'constant':
+        return SimulationConstantCall(point.dial_level, keep_disconnected_calls=False, **options)
+    if point.algorithm == 'free_agent':
+        return SimulationFreeAgent(keep_disconnected_calls=False, **options)
+    if point.algorithm == 'genetic':
+        # We're already running in a worker process, so the genetic algorithm can't have a pool of its own
+        return SimulationGenetic(number_processes=1, keep_disconnected_calls=False, **options)
+    return SimulationAnalytic(**options)
+
+
+def run_point(calling_list, point, event_driven=True, seed=42, history_directory=None):
+    """
+    Run the simulation for one point of the sweep.
+    :param calling_list: the parsed calling list. It is rewound before the simulation starts.
+    :param point:
+    :param event_driven:
+    :param seed: the random seed, set before each point so the results don't depend on which worker ran it
+    :param history_directory: if set, the history of the point is written to this directory
+    :return: a dict of the point and its results
+    """
+    history = None
+    if history_directory is not None:
+        history = HistoryRecorder(os.path.join(history_directory, history_filename(point)),
+                                  Simulation.SAVE_HISTORY_INTERVAL)
+
+    random.seed(seed)
+    calling_list.reset()
+
+    simulation = create_simulation(point, event_driven, history)
+
+    started = time.perf_counter()
+    simulation.start(calling_list, point.duration_shift)
+    run_time = time.perf_counter() - started
+
+    result = point._asdict()
+    result['end_time'] = simulation._current_time
+    result['total_number_calls'] = simulation.total_number_calls
+    result['total_number_answered_calls'] = simulation.total_number_answered_calls
+    result['total_number_talking_calls'] = simulation.total_number_talking_calls
+    result['total_number_abandon_calls'] = simulation.total_number_abandon_calls
+    result['total_number_not_answered_calls'] = simulation.total_number_not_answered_calls
+    result['total_agent_talk_time'] = simulation.total_agent_talk_time
+    result['total_agent_idle_time'] = simulation.total_agent_idle_time
+    result['talk_time'] = simulation._current_talk_time
+    result['abandonment_rate'] = simulation._current_abandonment_rate
+    result['run_time'] = run_time
+    return result
+
+
+def _init_worker(calling_list, event_driven, seed, history_directory):
+    # On Linux the workers are forked, so they share the parent's parsed calling list rather than copying it
+    _worker_state['calling_list'] = calling_list
+    _worker_state['options'] = dict(event_driven=event_driven, seed=seed, history_directory=history_directory)
+
+
+def _run_worker_point(point):
+    return run_point(_worker_state['calling_list'], point, **_worker_state['options'])
+
+
+def run_sweep(calling_list, points, number_processes=1, event_driven=True, seed=42, history_directory=None):
+    """
+    Run every point of a sweep.
+    :param calling_list: the parsed calling list, shared by every point
+    :param points: the SweepPoints to run (see build_grid)
+    :param number_processes: the number of worker processes to run the points in
+    :param event_driven:
+    :param seed:
+    :param history_directory: if set, the history of each point is written to this directory
+    :return: a DataFrame with one row per point, in the order of points
+    """
+    if history_directory is not None:
+        os.makedirs(history_directory, exist_ok=True)
+
+    log.info('Running {} points in {} processes'.format(len(points), number_processes))
+
+    results = []
+    if number_processes > 1:
+        with Pool(number_processes, initializer=_init_worker,
+                  initargs=(calling_list, event_driven, seed, history_directory)) as pool:
+            for result in pool.imap(_run_worker_point, points):
+                results.append(result)
+                log.info('Finished {} of {} points'.format(len(results), len(points)))
+    else:
+        for point in points:
+            results.append(run_point(calling_list, point, event_driven, seed, history_directory))
+            log.info('Finished {} of {} points'.format(len(results), len(points)))
+
+    return pd.DataFrame(results)
+
+
+def save_results(results, filename):
+    """
+    Write the results table. The format is chosen by the extension: .csv, .parquet (needs pyarrow) or a pickle.
+    :param results:
+    :param filename:
+    :return:
+    """
+    log.info('Writing results to {}'.format(filename))
+
+    if filename.endswith('.csv'):
+        results.to_csv(filename, index=False)
+    elif filename.endswith('.parquet'):
+        results.to_parquet(filename, index=False)
+    else:
+        results.to_pickle(filename)
+
+
+def main(argv=None):
+    """
+    Run a sweep from the command line, eg:
+
+      python sweep.py small.csv --compiled small.compiled --algorithms constant free_agent \
+          --dial-levels 0.5 1 2.5 5 10 --agents 20 40 80 --output sweep.csv
+
+    :param argv:
+    :return:
+    """
+    parser = argparse.ArgumentParser(description='Run the simulations over a grid of parameters')
+    parser.add_argument('calling_list', help='the calling list (csv)')
+    parser.add_argument('--compiled', help='the compiled calling list, built from the csv if out of date')
+    parser.add_argument('--algorithms', nargs='+', choices=list(ALGORITHMS), default=['constant'])
+    parser.add_argument('--dial-levels', nargs='+', type=float, default=[1],
+                        help='calls per second (constant algorithm only)')
+    parser.add_argument('--agents', nargs='+', type=int, default=[40])
+    parser.add_argument('--shift-minutes', nargs='+', type=float,
+                        default=[Simulation.DEFAULT_SHIFT_LENGTH / Simulation.ONE_MINUTE])
+    parser.add_argument('--processes', type=int, default=os.cpu_count())
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--epochs', action='store_true', help='step through every epoch rather than jumping to '
+                                                              'the next event')
+    parser.add_argument('--history-directory', help='write the history of each point to this directory')
+    parser.add_argument('--output', default='sweep.csv', help='the results table (.csv, .parquet or .pkl)')
+    args = parser.parse_args(argv)
+
+    log.basicConfig(level=log.INFO, format='%(asctime)s %(levelname)-8s %(message)s', datefmt='%m-%d %H:%M')
+
+    cl = CallingList()
+    if args.compiled is not None:
+        cl.load_compiled(args.compiled, args.calling_list)
+    else:
+        cl.load(args.calling_list)
+        cl.parse()
+
+    points = build_grid(args.algorithms, args.dial_levels, args.agents,
+                        [int(minutes * Simulation.ONE_MINUTE) for minutes in args.shift_minutes])
+
+    results = run_sweep(cl, points, number_processes=args.processes, event_driven=not args.epochs, seed=args.seed,
+                        history_directory=args.history_directory)
+
+    save_results(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
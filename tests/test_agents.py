@@ -0,0 +1,93 @@
+from unittest import TestCase
+from calling_list import CallingList
+from agents import AgentTeam, AgentState
+from simulation_constant_call import SimulationConstantCall
+
+FILENAME = '../test.csv'
+
+
+class FakeCall:
+    def __init__(self, unique_id):
+        self.unique_id = unique_id
+
+
+class TestAgentTeam(TestCase):
+
+    def test_longest_idle_agent_takes_call(self):
+        team = AgentTeam(3)
+        first = team.take(FakeCall(1), 100)
+        team.take(FakeCall(2), 100)
+
+        agent, free = team.end_call(FakeCall(1), 200)
+        self.assertTrue(free)
+        team.make_idle(agent, 200)
+
+        self.assertEqual(team.take(FakeCall(3), 300).agent_id, 2)
+        self.assertEqual(team.take(FakeCall(4), 300), first)
+
+    def test_wrap_up(self):
+        team = AgentTeam(1, wrap_up_times=[5000])
+        agent = team.take(FakeCall(1), 0)
+
+        _, free = team.end_call(FakeCall(1), 1000)
+        self.assertFalse(free)
+        self.assertEqual(agent.state, AgentState.wrap_up)
+        self.assertEqual(team.next_event_time(), 6000)
+        self.assertEqual(team.due_events(6000), [(AgentTeam.WRAP_UP_END, agent)])
+
+    def test_staggered_login(self):
+        team = AgentTeam(login_times=[0, 1000], logout_times=[None, 2000])
+        self.assertEqual(team.number_logged_in(), 1)
+        self.assertEqual(team.next_event_time(), 1000)
+
+    def test_utilisation(self):
+        team = AgentTeam(1)
+        team.take(FakeCall(1), 1000)
+        self.assertEqual(team.utilisation(4000), [0.75])
+
+
+class TestSimulationAgents(TestCase):
+
+    def run_simulation(self, agents=None, event_driven=False):
+        cl = CallingList()
+        cl.load(FILENAME)
+        cl.parse()
+
+        sim = SimulationConstantCall(2, number_agents=5, generate_history_file=False, event_driven=event_driven,
+                                     agents=agents)
+        sim.start(cl)
+        return sim
+
+    def test_team_without_wrap_up_matches_counters(self):
+        counted = self.run_simulation()
+        modelled = self.run_simulation(AgentTeam(5))
+
+        self.assertEqual(modelled._current_time, counted._current_time)
+        self.assertEqual(modelled.total_number_abandon_calls, counted.total_number_abandon_calls)
+        self.assertEqual(modelled.total_agent_talk_time, counted.total_agent_talk_time)
+        self.assertEqual(modelled.total_agent_idle_time, counted.total_agent_idle_time)
+
+    def test_wrap_up_means_more_abandoned_calls(self):
+        counted = self.run_simulation()
+        modelled = self.run_simulation(AgentTeam(5, wrap_up_times=[10000, 20000], seed=1))
+
+        self.assertGreater(modelled.total_number_abandon_calls, counted.total_number_abandon_calls)
+        self.assertFalse(any(agent.state == AgentState.talking for agent in modelled._agents.agents))
+
+    def test_event_driven_matches_epochs(self):
+        team = dict(login_times=[0, 0, 30000, 60000, 60000], logout_times=[None, 200000, None, None, 300000],
+                    wrap_up_times=[3000, 7000], seed=1)
+        stepped = self.run_simulation(AgentTeam(**team))
+        event_driven = self.run_simulation(AgentTeam(**team), event_driven=True)
+
+        self.assertEqual(event_driven._current_time, stepped._current_time)
+        self.assertEqual(event_driven.total_number_abandon_calls, stepped.total_number_abandon_calls)
+        self.assertEqual(event_driven.total_agent_talk_time, stepped.total_agent_talk_time)
+        self.assertEqual(event_driven.total_agent_idle_time, stepped.total_agent_idle_time)
+
+    def test_utilisation_in_history(self):
+        sim = self.run_simulation(AgentTeam(5))
+
+        history = sim._history.to_dataframe()
+        self.assertIn('agent_utilisation_4', history.columns)
+        self.assertTrue(((history.agent_utilisation_0 >= 0) & (history.agent_utilisation_0 <= 1)).all())
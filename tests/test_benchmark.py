@@ -0,0 +1,30 @@
+from unittest import TestCase
+import benchmark
+
+
+class TestBenchmark(TestCase):
+
+    def test_workloads(self):
+        for name, workload in benchmark.WORKLOADS.items():
+            df = workload(500)
+            self.assertEqual(len(df), 500, name)
+            self.assertTrue(df.UniqueId.is_unique, name)
+
+            cl = benchmark._calling_list(df)
+            self.assertEqual(cl.get_number_calls(), 500, name)
+
+    def test_measure(self):
+        result = benchmark.measure('constant_2', 'synthetic', repeat=1, number_calls=500)
+
+        self.assertEqual(result['benchmark'], 'constant_2')
+        self.assertGreater(result['events'], 0)
+        self.assertGreater(result['wall_time'], 0)
+        self.assertGreater(result['peak_rss_kb'], 0)
+        self.assertGreater(result['peak_allocated_bytes'], 0)
+
+    def test_run_and_compare(self):
+        results = benchmark.run_benchmarks(['parse'], ['test_csv'], repeat=1, number_calls=500)
+        self.assertEqual(len(results['results']), 1)
+
+        df = benchmark.compare(results, results)
+        self.assertEqual(df.wall_time_ratio.iloc[0], 1)
@@ -1,5 +1,6 @@
 from unittest import TestCase
-from callstats import CallStats
+import pickle
+from callstats import CallRecord, CallStats, QueuedStats
 
 
 class TestCall(TestCase):
@@ -8,3 +9,30 @@ class TestCall(TestCase):
 
         c.dial(100)
 
+
+    def test_record_is_shared_and_immutable(self):
+        c = CallStats.from_offsets('TR', 1000, 20000, 'call', False, True)
+        replayed = c.replay()
+
+        self.assertIs(replayed.record, c.record)
+        self.assertRaises(AttributeError, setattr, c.record, 'offset_disconnect', 0)
+        self.assertRaises(AttributeError, setattr, c, 'notes', 'calls only hold their state')
+
+        # Dialing one call of the record doesn't affect another
+        c.dial(100)
+        self.assertEqual(len(c._future_events), 2)
+        self.assertEqual(len(replayed._future_events), 0)
+        self.assertIsNone(replayed._birth_time)
+
+    def test_record_pickles(self):
+        record = CallStats.from_offsets('TR', 1000, 20000, 'call', False, True).record
+        self.assertEqual(pickle.loads(pickle.dumps(record)), record)
+        self.assertEqual(record.replay().unique_id, 'call')
+
+    def test_queued_stats(self):
+        q = QueuedStats('2013-12-18 13:39:14.810', 'QT', 0, 0, '2013-12-18 13:39:40.033', 'queued', 0, 0, 0, 1, 0)
+
+        # Queued calls only ever use the microseconds part of the call's length
+        self.assertIsInstance(q, CallRecord)
+        self.assertAlmostEqual(q.offset_disconnect, 223)
+        self.assertTrue(q.queued)
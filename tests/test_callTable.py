@@ -0,0 +1,93 @@
+from unittest import TestCase
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from call_table import CallTable, TableCalls
+
+FILENAME = '../test.csv'
+
+
+class TestCallTable(TestCase):
+
+    def setUp(self):
+        self.table = CallTable.from_dataframe(pd.read_csv(FILENAME))
+
+    def test_from_dataframe(self):
+        self.assertEqual(len(self.table), 100)
+        self.assertEqual(len(self.table.queued_indices), 15)
+        self.assertEqual(self.table.start_offsets.min(), 0)
+
+    def test_call(self):
+        call = self.table.call(1)
+        self.assertEqual(call.unique_id, '0cb53c48fef5cdd7:a1aa85:142e53206f3:-7fb5')
+        self.assertEqual(call.outcome_code, 'TR')
+        self.assertEqual(call._offsetConnect, 15373)
+        self.assertEqual(call._offsetDisconnect, 49839)
+        self.assertTrue(call._transferredToAgent)
+
+    def test_calls_are_created_each_time(self):
+        # Each call handed out is a separate object so a simulation can't change the table
+        self.assertIsNot(self.table.call(0), self.table.call(0))
+
+    def test_unknown_outcome_code(self):
+        df = pd.read_csv(FILENAME)
+        df.loc[0, 'OutcomeCode'] = 'XX'
+        table = CallTable.from_dataframe(df)
+
+        self.assertEqual(table.call(0).outcome_code, 'XX')
+        self.assertEqual(table.call(1).outcome_code, 'TR')
+
+    def test_table_calls_slice(self):
+        calls = TableCalls(self.table, range(len(self.table)))
+        window = calls[98:]
+
+        self.assertEqual(len(window), 2)
+        self.assertEqual(window[1].unique_id, '0cb53c48fef5cdd7:1e29b99:1439ecae6c3:-3d3a')
+
+    def test_concatenate(self):
+        df = pd.read_csv(FILENAME)
+        df.loc[60, 'OutcomeCode'] = 'XX'
+        table = CallTable.concatenate([CallTable.from_dataframe(df[:50]), CallTable.from_dataframe(df[50:])])
+
+        self.assertEqual(len(table), 100)
+        self.assertEqual(len(table.queued_indices), 15)
+        self.assertEqual(table.call(60).outcome_code, 'XX')
+        self.assertEqual(table.call(1).unique_id, self.table.call(1).unique_id)
+
+    def test_unusual_values(self):
+        df = pd.read_csv(FILENAME)
+        df['OffsetConnect'] = df.OffsetConnect.astype(np.float64)
+        df.loc[3, 'OffsetConnect'] = np.nan
+        df.loc[4, 'UniqueId'] = 'appel-\u00e9t\u00e9'
+        df['OutcomeCode'] = ['X{}'.format(i) for i in range(len(df))]
+        df.loc[0, 'OutcomeCode'] = 'O'
+
+        table = CallTable.from_dataframe(df)
+        self.assertTrue(np.isnan(table.call(3)._offsetConnect))
+        self.assertEqual(table.call(2)._offsetConnect, df.OffsetConnect[2])
+        self.assertEqual(table.call(4).unique_id, 'appel-\u00e9t\u00e9')
+
+        # More outcome codes than fit in a byte
+        table = CallTable.concatenate([table, CallTable.from_dataframe(df.assign(OutcomeCode='Y' + df.OutcomeCode))])
+        self.assertEqual(table.call(99).outcome_code, 'X99')
+        self.assertEqual(table.call(199).outcome_code, 'YX99')
+        self.assertEqual(table.call(0).outcome_code, 'O')
+
+    def test_save_replaces_table_whole(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'compiled')
+            self.table.save(path)
+            loaded = CallTable.load(path)
+
+            # Rewriting the table leaves the one already mapped as it was
+            CallTable.from_dataframe(pd.read_csv(FILENAME)[:40]).save(path)
+            self.assertEqual(len(loaded), 100)
+            self.assertEqual(loaded.call(99).unique_id, self.table.call(99).unique_id)
+            self.assertEqual(len(CallTable.load(path)), 40)
+
+            # A failed write leaves the last table there
+            self.assertRaises(TypeError, self.table.save, path, metadata={'unserialisable': object()})
+            self.assertEqual(len(CallTable.load(path)), 40)
+
+            self.assertEqual(os.listdir(directory), ['compiled'])
@@ -1,6 +1,16 @@
 from unittest import TestCase
-from calling_list import CallingList
+import os
+import shutil
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+from calling_list import CallingList, CallingListWindow
 from callstats import CallStats, QueuedStats
+from history import HistoryRecorder
+from reporting import Reporter
+from simulation import Simulation
+from simulation_constant_call import SimulationConstantCall
 
 FILENAME = '../test.csv'
 
@@ -26,6 +36,30 @@ class TestCallingList(TestCase):
         last_call = cl._calls[99]
         self.assertEqual(last_call.unique_id, '0cb53c48fef5cdd7:1e29b99:1439ecae6c3:-3d3a')
 
+    def test_parse_chunks(self):
+        cl = CallingList()
+        cl.load(FILENAME)
+        cl.parse()
+
+        chunked = CallingList()
+        chunked.parse_chunks(pd.read_csv(FILENAME, chunksize=30))
+
+        self.assertEqual(chunked.get_number_calls(), 100)
+        for column in cl._table.COLUMNS:
+            self.assertTrue(np.array_equal(getattr(chunked._table, column), getattr(cl._table, column)), column)
+
+    def test_parse_calculates_missing_disconnect_offset(self):
+        cl = CallingList()
+        cl.load(FILENAME)
+        cl.parse()
+
+        # The first call has no disconnect offset so it is taken from the start and end of the call
+        first_call = cl.get_call()
+        self.assertEqual(first_call._offsetDisconnect, 25214)
+
+        second_call = cl.get_call()
+        self.assertEqual(second_call._offsetDisconnect, 49839)
+
     def test_get_call(self):
         cl = CallingList()
         cl.load(FILENAME)
@@ -38,11 +72,130 @@ class TestCallingList(TestCase):
         first_call_get = cl.get_call()
         self.assertEqual(first_call_get.unique_id, '0cb53c48fef5cdd7:a1aa85:142e53206f3:-7fb6')
 
-        # The second call should now be at the top
-        second_call_peeked = cl._calls[0]
-        self.assertEqual(second_call_peeked.unique_id, '0cb53c48fef5cdd7:a1aa85:142e53206f3:-7fb5')
+        self.assertEqual(cl.get_number_calls(), 99)
+
+        # The second call should now be next
+        second_call_get = cl.get_call()
+        self.assertEqual(second_call_get.unique_id, '0cb53c48fef5cdd7:a1aa85:142e53206f3:-7fb5')
+
+        self.assertEqual(cl.get_number_calls(), 98)
+
+    def test_get_call_exhausted(self):
+        cl = CallingList()
+        cl.load(FILENAME)
+        cl.parse()
+
+        for i in range(100):
+            self.assertIsNotNone(cl.get_call())
+
+        self.assertIsNone(cl.get_call())
+        self.assertEqual(cl.get_number_calls(), 0)
+
+    def test_reset(self):
+        cl = CallingList()
+        cl.load(FILENAME)
+        cl.parse()
+
+        cl.get_call()
+        cl.get_call()
+        cl.get_queued_call()
+
+        cl.reset()
+
+        self.assertEqual(cl.get_number_calls(), 100)
+        self.assertEqual(cl.get_call().unique_id, '0cb53c48fef5cdd7:a1aa85:142e53206f3:-7fb6')
+        self.assertEqual(cl.get_queued_call().unique_id, '0cb53c48fef5cdd7:a1aa85:142e53206f3:-7f98')
+
+    def test_load_compiled(self):
+        directory = tempfile.mkdtemp()
+        try:
+            compiled = os.path.join(directory, 'compiled')
+
+            cl = CallingList()
+            cl.load(FILENAME)
+            cl.parse()
+            cl.save_compiled(compiled)
+
+            cl = CallingList()
+            cl.load_compiled(compiled)
+            self.assertEqual(cl.get_number_calls(), 100)
+            self.assertEqual(cl.get_call().unique_id, '0cb53c48fef5cdd7:a1aa85:142e53206f3:-7fb6')
+            self.assertEqual(cl.get_queued_call().unique_id, '0cb53c48fef5cdd7:a1aa85:142e53206f3:-7f98')
+        finally:
+            shutil.rmtree(directory)
+
+    def test_load_compiled_rebuilds_when_file_changes(self):
+        directory = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(directory, 'calls.csv')
+            compiled = os.path.join(directory, 'compiled')
+            shutil.copy(FILENAME, filename)
+
+            cl = CallingList()
+            cl.load_compiled(compiled, filename)
+            self.assertEqual(cl.get_number_calls(), 100)
+
+            # Drop the last call from the file
+            with open(filename) as f:
+                lines = f.readlines()
+            with open(filename, 'w') as f:
+                f.writelines(lines[:-1])
+
+            cl = CallingList()
+            cl.load_compiled(compiled)
+            self.assertEqual(cl.get_number_calls(), 99)
+        finally:
+            shutil.rmtree(directory)
+
+    def test_window(self):
+        cl = CallingList()
+        cl.load(FILENAME)
+        cl.parse()
+        stored = [cl.get_call() for i in range(10)]
+
+        window = CallingListWindow(stored, 8)
+        self.assertEqual(len(window), 2)
+
+        first = CallingList(window)
+        second = CallingList(window)
+
+        # Each calling list has its own copy of the call so dialing one doesn't affect the other
+        first_call = first.get_call()
+        first_call.dial(100)
+        second_call = second.get_call()
+
+        self.assertEqual(first_call.unique_id, stored[8].unique_id)
+        self.assertEqual(second_call.unique_id, stored[8].unique_id)
+        self.assertIsNot(first_call, second_call)
+        self.assertEqual(len(second_call._future_events), 0)
+        self.assertIsNone(stored[8]._birth_time)
+
+    def test_views_in_threads(self):
+        cl = CallingList()
+        cl.load(FILENAME)
+        cl.parse()
 
-        self.assertEqual(len(cl._calls), 99)
+        def run(calling_list, results, dial_level):
+            sim = SimulationConstantCall(dial_level, number_agents=5, reporter=Reporter(),
+                                         history=HistoryRecorder(None, Simulation.SAVE_HISTORY_INTERVAL))
+            sim.start(calling_list, Simulation.ONE_MINUTE * 5)
+            results[dial_level] = (sim.total_number_calls, sim.total_number_abandon_calls, sim.total_agent_talk_time)
+
+        # Every simulation dials the one calling list at once, each through its own view
+        threaded = {}
+        threads = [threading.Thread(target=run, args=(cl.view(), threaded, dial_level)) for dial_level in (1, 2, 3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for dial_level in (1, 2, 3):
+            expected = {}
+            run(cl.view(), expected, dial_level)
+            self.assertEqual(threaded[dial_level], expected[dial_level])
+
+        # The calling list itself hasn't been used
+        self.assertEqual(cl.get_number_calls(), 100)
 
     def test_get_queued_call(self):
         cl = CallingList()
@@ -0,0 +1,50 @@
+from unittest import TestCase
+from calling_list import CallingList
+from estimator import ConstantCallEstimator
+from simulation_constant_call import SimulationConstantCall
+
+FILENAME = '../test.csv'
+
+
+class TestConstantCallEstimator(TestCase):
+
+    def setUp(self):
+        self.cl = CallingList()
+        self.cl.load(FILENAME)
+        self.cl.parse()
+
+        self.estimator = ConstantCallEstimator.from_calling_list(self.cl)
+
+    def test_from_calling_list_matches_from_calls(self):
+        from_calls = ConstantCallEstimator.from_calls(self.cl._calls, self.cl._queued_calls)
+
+        self.assertAlmostEqual(self.estimator.answer_probability, from_calls.answer_probability)
+        self.assertAlmostEqual(self.estimator.mean_talk_time, from_calls.mean_talk_time)
+        self.assertAlmostEqual(self.estimator.mean_patience, from_calls.mean_patience)
+
+    def test_no_calls_dialed(self):
+        estimate = self.estimator.estimate(0, 5)
+        self.assertEqual(estimate.talk_time, 0)
+        self.assertEqual(estimate.abandonment_rate, 0)
+
+    def test_abandonment_rises_with_dial_level(self):
+        estimates = [self.estimator.estimate(dial_level, 5) for dial_level in [0.1, 0.5, 1, 5]]
+
+        for lower, higher in zip(estimates, estimates[1:]):
+            self.assertLessEqual(lower.abandonment_rate, higher.abandonment_rate)
+            self.assertLessEqual(lower.talk_time, higher.talk_time)
+        self.assertLessEqual(estimates[-1].talk_time, 1)
+
+    def test_large_numbers_of_agents(self):
+        estimate = self.estimator.estimate(100, 2000)
+        self.assertGreater(estimate.talk_time, 0)
+        self.assertLessEqual(estimate.abandonment_rate, 1)
+
+    def test_from_simulation(self):
+        sim = SimulationConstantCall(1, number_agents=5, generate_history_file=False)
+        sim.start(self.cl)
+
+        estimator = ConstantCallEstimator.from_simulation(sim)
+        self.assertAlmostEqual(estimator.answer_probability,
+                               sim.total_number_answered_calls / sim.total_number_calls)
+        self.assertEqual(estimator.mean_patience, self.estimator.mean_patience)
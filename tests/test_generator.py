@@ -0,0 +1,71 @@
+from unittest import TestCase
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from calling_list import CallingList
+from generator import CallingListModel
+
+FILENAME = '../test.csv'
+
+
+class TestGenerator(TestCase):
+
+    def setUp(self):
+        self.model = CallingListModel.from_csv(FILENAME)
+
+    def test_fit(self):
+        probabilities = dict(zip(self.model.outcome_codes, self.model.outcome_probabilities))
+        self.assertAlmostEqual(probabilities['TR'], 0.42)
+        self.assertEqual(probabilities['CF'], 0)
+        self.assertLessEqual(self.model.start_gaps.max(), 10 * 60 * 1000)
+
+    def test_chunks_dont_change_the_calls(self):
+        whole = self.model.generate(2500, seed=1)
+        chunked = pd.concat(self.model.chunks(2500, chunk_size=700, seed=1), ignore_index=True)
+
+        self.assertEqual(len(whole), 2500)
+        self.assertTrue(whole.equals(chunked))
+        self.assertTrue(whole.UniqueId.is_unique)
+
+    def test_calls_follow_the_model(self):
+        df = self.model.generate(20000, seed=1)
+        tr = df[df.OutcomeCode == 'TR']
+
+        self.assertAlmostEqual(len(tr) / len(df), 0.42, delta=0.02)
+        self.assertTrue(tr.OffsetConnect.isin(self.model.samples['TR'].OffsetConnect).all())
+        self.assertTrue((df[df.OutcomeCode == 'O'].TransferredToAgent == 0).all())
+
+    def test_fit_with_blanks(self):
+        df = pd.read_csv(FILENAME)
+        df['OffsetConnect'] = df.OffsetConnect.astype(np.float64)
+        df.loc[0, 'OffsetConnect'] = np.nan
+        df.loc[1, 'CallEndDateTime'] = np.nan
+        df['Queued'] = df.Queued.astype(np.float64)
+        df.loc[2, 'Queued'] = np.nan
+
+        model = CallingListModel.fit(df)
+        self.assertEqual(sum(len(sample) for sample in model.samples.values()), len(df) - 2)
+        self.assertEqual(len(model.generate(100, seed=1)), 100)
+
+    def test_calls_per_second(self):
+        df = self.model.generate(11, seed=1, calls_per_second=2)
+        start = pd.to_datetime(df.CallStartDateTime)
+        self.assertEqual((start.iloc[-1] - start.iloc[0]).total_seconds(), 5)
+
+    def test_write_csv(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'synthetic.csv')
+            self.model.write_csv(filename, 1000, chunk_size=300, seed=1)
+
+            cl = CallingList()
+            cl.load(filename)
+            cl.parse()
+            self.assertTrue(cl._df.MediaTerminal.isna().all())
+
+        generated = self.model.calling_list(1000, chunk_size=300, seed=1)
+        self.assertEqual(cl.get_number_calls(), 1000)
+        for i in (0, 500, 999):
+            self.assertEqual(cl._calls[i].unique_id, generated._calls[i].unique_id)
+            self.assertEqual(cl._calls[i]._offsetDisconnect, generated._calls[i]._offsetDisconnect)
+            self.assertEqual(cl._calls[i].outcome_code, generated._calls[i].outcome_code)
@@ -0,0 +1,97 @@
+from unittest import TestCase, skipUnless
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from calling_list import CallingList
+from history import HistoryRecorder
+from simulation_constant_call import SimulationConstantCall
+
+try:
+    import pyarrow
+    have_pyarrow = True
+except ImportError:
+    have_pyarrow = False
+
+FILENAME = '../test.csv'
+
+
+class TestHistoryRecorder(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def run_simulation(self, history, event_driven=False):
+        cl = CallingList()
+        cl.load(FILENAME)
+        cl.parse()
+
+        sim = SimulationConstantCall(2, number_agents=5, event_driven=event_driven, history=history)
+        sim.start(cl)
+
+        return sim
+
+    def test_every_epoch(self):
+        # Use small chunks so the history is spread over several of them
+        history = HistoryRecorder(interval=SimulationConstantCall.EPOCH, chunk_size=64)
+        sim = self.run_simulation(history)
+
+        df = history.to_dataframe()
+        self.assertEqual(len(df), sim._current_time // SimulationConstantCall.EPOCH)
+        self.assertEqual(df['current_time'].iloc[-1], sim._current_time)
+        self.assertEqual(df['total_number_calls'].iloc[-1], sim.total_number_calls)
+
+    def test_every_epoch_event_driven(self):
+        stepped = HistoryRecorder(interval=SimulationConstantCall.EPOCH)
+        event_driven = HistoryRecorder(interval=SimulationConstantCall.EPOCH)
+        self.run_simulation(stepped)
+        self.run_simulation(event_driven, event_driven=True)
+
+        self.assertTrue(event_driven.to_dataframe().equals(stepped.to_dataframe()))
+
+    def test_npz(self):
+        filename = os.path.join(self.directory, 'history.npz')
+        history = HistoryRecorder(filename, interval=10000)
+        sim = self.run_simulation(history)
+
+        columns = np.load(filename)
+        self.assertEqual(columns['total_number_calls'][-1], sim.total_number_calls)
+
+    def test_pkl_chunks_leave_memory(self):
+        filename = os.path.join(self.directory, 'history.pkl')
+        history = HistoryRecorder(filename, interval=SimulationConstantCall.EPOCH, chunk_size=64)
+        sim = self.run_simulation(history)
+
+        # Only the chunk being filled is ever held in memory
+        self.assertEqual(history._chunks, [])
+        self.assertGreater(len(history._spilled), 1)
+
+        df = pd.read_pickle(filename)
+        self.assertEqual(len(df), sim._current_time // SimulationConstantCall.EPOCH)
+        self.assertTrue(df.equals(history.to_dataframe()))
+
+    def test_npz_chunks_leave_memory(self):
+        filename = os.path.join(self.directory, 'history.npz')
+        history = HistoryRecorder(filename, interval=SimulationConstantCall.EPOCH, chunk_size=64)
+        sim = self.run_simulation(history)
+
+        self.assertEqual(history._chunks, [])
+        columns = np.load(filename)
+        self.assertEqual(len(columns['current_time']), sim._current_time // SimulationConstantCall.EPOCH)
+        self.assertEqual(columns['total_number_calls'][-1], sim.total_number_calls)
+
+    @skipUnless(have_pyarrow, 'pyarrow is not installed')
+    def test_parquet(self):
+        import pyarrow.parquet as pq
+
+        filename = os.path.join(self.directory, 'history.parquet')
+        history = HistoryRecorder(filename, interval=SimulationConstantCall.EPOCH, chunk_size=64)
+        sim = self.run_simulation(history)
+
+        table = pq.read_table(filename)
+        self.assertEqual(table.num_rows, sim._current_time // SimulationConstantCall.EPOCH)
+        self.assertEqual(len(history.to_dataframe()), table.num_rows)
@@ -0,0 +1,145 @@
+from unittest import TestCase
+from collections import OrderedDict
+import pandas as pd
+from calling_list import CallingList
+from multi_campaign import AgentPool, AgentGroup, MultiCampaignSimulation
+from reporting import SummaryReporter
+from simulation_constant_call import SimulationConstantCall
+
+FILENAME = '../test.csv'
+
+
+class FakeCall:
+    def __init__(self, unique_id):
+        self.unique_id = unique_id
+
+
+class FakeSimulation:
+    def __init__(self, skill, priority=0):
+        self._skill = skill
+        self._priority = priority
+        self._queued_calls = OrderedDict()
+        self.transferred = []
+
+    def queue(self, pool, call):
+        self._queued_calls[call.unique_id] = call
+        pool.enqueue(self, call)
+
+    def transfer_to_agent(self, call):
+        self.transferred.append(call.unique_id)
+
+
+class TestAgentPool(TestCase):
+
+    def test_specialists_are_used_first(self):
+        pool = AgentPool([AgentGroup(1, ['a', 'b']), AgentGroup(1, ['a'])])
+        self.assertEqual(pool.number_free_agents('a'), 2)
+        self.assertEqual(pool.number_free_agents('b'), 1)
+
+        pool.take(FakeSimulation('a'), FakeCall(1))
+        self.assertEqual(pool.number_free_agents('a'), 1)
+        self.assertEqual(pool.number_free_agents('b'), 1)
+
+    def test_released_agent_takes_highest_priority_call(self):
+        pool = AgentPool([AgentGroup(1, ['a', 'b'])])
+        low, high = FakeSimulation('a', priority=0), FakeSimulation('b', priority=1)
+
+        pool.take(low, FakeCall(1))
+        low.queue(pool, FakeCall(2))
+        high.queue(pool, FakeCall(3))
+
+        pool.release(FakeCall(1))
+        self.assertEqual(high.transferred, [3])
+        self.assertEqual(low.transferred, [])
+
+    def test_calls_that_left_the_queue_are_skipped(self):
+        pool = AgentPool([AgentGroup(1, ['a'])])
+        simulation = FakeSimulation('a')
+
+        pool.take(simulation, FakeCall(1))
+        simulation.queue(pool, FakeCall(2))
+        simulation.queue(pool, FakeCall(3))
+        del simulation._queued_calls[2]
+
+        pool.release(FakeCall(1))
+        self.assertEqual(simulation.transferred, [3])
+
+    def test_agents_log_off_at_end_of_shift(self):
+        pool = AgentPool([AgentGroup(2, ['a'])])
+        pool.take(FakeSimulation('a'), FakeCall(1))
+
+        pool.end_shift()
+        self.assertEqual(pool.number_agents('a'), 1)
+
+        pool.release(FakeCall(1))
+        self.assertEqual(pool.number_agents('a'), 0)
+        self.assertEqual(pool.number_free_agents('a'), 0)
+
+
+class TestMultiCampaignSimulation(TestCase):
+
+    def test_one_campaign_matches_simulation(self):
+        cl = CallingList()
+        cl.load(FILENAME)
+        cl.parse()
+
+        sim = SimulationConstantCall(2, number_agents=5, generate_history_file=False)
+        sim.start(cl)
+
+        cl.reset()
+        multi = MultiCampaignSimulation([AgentGroup(5, ['CW03'])])
+        campaign = SimulationConstantCall(2, generate_history_file=False)
+        multi.add_campaign('CW03', campaign, cl)
+        multi.start()
+
+        self.assertEqual(campaign._current_time, sim._current_time)
+        self.assertEqual(campaign.total_number_abandon_calls, sim.total_number_abandon_calls)
+        self.assertEqual(campaign.total_agent_talk_time, sim.total_agent_talk_time)
+        self.assertEqual(multi.total_agent_talk_time, sim.total_agent_talk_time)
+        self.assertEqual(multi.total_agent_idle_time, sim.total_agent_idle_time)
+
+    def test_split_campaigns(self):
+        cl = CallingList()
+        cl.load(FILENAME)
+        lists = cl.split()
+
+        self.assertEqual(list(lists), ['CW03', 'CW01'])
+        self.assertEqual(lists['CW03'].get_number_calls(), 99)
+
+        multi = MultiCampaignSimulation([AgentGroup(5, ['CW03', 'CW01'])], event_driven=True)
+        for name, calling_list in lists.items():
+            multi.add_campaign(name, SimulationConstantCall(2, generate_history_file=False, event_driven=True),
+                               calling_list)
+        multi.start()
+
+        results = multi.results()
+        self.assertEqual(list(results.campaign), ['CW03', 'CW01'])
+        self.assertEqual(results.total_number_calls.sum(), 100)
+
+    def test_shared_agents_idle_once(self):
+        df = pd.read_csv(FILENAME)
+
+        # All three agents take the calls of both campaigns
+        multi = MultiCampaignSimulation([AgentGroup(3, ['a', 'b'])], reporter=SummaryReporter())
+        campaigns = []
+        for name, calls in (('a', df[::2]), ('b', df[1::2])):
+            cl = CallingList()
+            cl._df = calls
+            cl.parse()
+            campaign = SimulationConstantCall(2, generate_history_file=False, reporter=SummaryReporter(20000))
+            multi.add_campaign(name, campaign, cl)
+            campaigns.append(campaign)
+
+        with self.assertLogs(level='INFO') as logs:
+            multi.start()
+
+        # Each agent is either talking or idle the whole time
+        self.assertEqual(multi.total_agent_talk_time + multi.total_agent_idle_time, 3 * multi._current_time)
+        self.assertEqual(multi.total_agent_talk_time, sum(campaign.total_agent_talk_time for campaign in campaigns))
+
+        # Each campaign counts the shared agents' idle time as its own
+        self.assertGreater(sum(campaign.total_agent_talk_time + campaign.total_agent_idle_time
+                               for campaign in campaigns), 3 * multi._current_time)
+
+        self.assertIn('INFO:root:  agent idle time:  {:.2f} mins'.format(multi.total_agent_idle_time / 60000),
+                      logs.output)
@@ -0,0 +1,65 @@
+from unittest import TestCase
+from calling_list import CallingList
+from history import HistoryRecorder
+from profiling import Profiler
+from reporting import Reporter
+from simulation import Simulation
+from simulation_constant_call import SimulationConstantCall
+from simulation_free_agent import SimulationFreeAgent
+
+FILENAME = '../test.csv'
+
+
+class TestProfiling(TestCase):
+
+    def setUp(self):
+        self.cl = CallingList()
+        self.cl.load(FILENAME)
+        self.cl.parse()
+
+    def create_simulation(self, profiler=None, simulation_class=SimulationConstantCall, **kwargs):
+        return simulation_class(number_agents=5, reporter=Reporter(), profiler=profiler,
+                                history=HistoryRecorder(None, Simulation.SAVE_HISTORY_INTERVAL), **kwargs)
+
+    def test_without_profiler(self):
+        sim = self.create_simulation()
+        self.assertIsNone(sim.start(self.cl, Simulation.ONE_MINUTE * 5))
+        self.assertIsNone(sim.profile())
+
+    def test_profile(self):
+        sim = self.create_simulation(Profiler(), dial_level=2)
+        profile = sim.start(self.cl, Simulation.ONE_MINUTE * 5)
+
+        self.cl.reset()
+        unprofiled = self.create_simulation(dial_level=2)
+        unprofiled.start(self.cl, Simulation.ONE_MINUTE * 5)
+
+        # Profiling doesn't change the simulation
+        self.assertEqual(sim.total_number_calls, unprofiled.total_number_calls)
+        self.assertEqual(sim.total_agent_talk_time, unprofiled.total_agent_talk_time)
+
+        # Calls still ringing at the end of the shift are disconnected without an event
+        self.assertLessEqual(profile['events']['disconnected'], sim.total_number_calls)
+        self.assertGreater(profile['events']['disconnected'], 0)
+        self.assertEqual(profile['events']['created'], sim.total_number_calls)
+        self.assertGreater(profile['events']['talking'], 0)
+        self.assertEqual(profile['events']['talking'], sim.total_number_talking_calls)
+        self.assertEqual(profile['events']['answered'], sim.total_number_answered_calls)
+        self.assertGreater(profile['epochs'], 0)
+        self.assertEqual(profile['phase_calls']['call_events'], profile['epochs'])
+        self.assertEqual(profile['phase_calls']['agent_events'], 0)
+        self.assertGreater(profile['phase_calls']['recalc_dial_level'], 0)
+        self.assertLessEqual(profile['high_water']['talking'], 5)
+        self.assertGreaterEqual(profile['high_water']['in_flight'], profile['high_water']['ringing'])
+        self.assertGreater(profile['wall_time'], 0)
+
+    def test_phases(self):
+        profiler = Profiler()
+        sim = self.create_simulation(profiler, SimulationFreeAgent, paced=True, event_driven=True)
+        sim.start(self.cl, Simulation.ONE_MINUTE * 5)
+
+        df = profiler.phases()
+        self.assertEqual(list(df.index), list(Profiler.PHASES))
+        self.assertGreater(df.loc['recalc_dial_level', 'calls'], 0)
+        self.assertLessEqual(df.loc['recalc_dial_level', 'time'], df.loc['calculate', 'time'])
+        self.assertGreaterEqual(df.loc['other', 'time'], 0)
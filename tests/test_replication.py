@@ -0,0 +1,71 @@
+from unittest import TestCase
+from calling_list import CallingList
+from simulation_constant_call import SimulationConstantCall
+import replication
+
+FILENAME = '../test.csv'
+
+
+class TestReplication(TestCase):
+
+    def setUp(self):
+        self.cl = CallingList()
+        self.cl.load(FILENAME)
+        self.cl.parse()
+
+    def unique_ids(self, cl):
+        return [cl._calls[i].unique_id for i in range(len(cl._calls))]
+
+    def test_shuffle_keeps_the_same_calls(self):
+        shuffled = replication.resample_calling_list(self.cl, 'shuffle', 1)
+
+        self.assertNotEqual(self.unique_ids(shuffled), self.unique_ids(self.cl))
+        self.assertEqual(sorted(self.unique_ids(shuffled)), sorted(self.unique_ids(self.cl)))
+        self.assertEqual(self.unique_ids(shuffled), self.unique_ids(replication.resample_calling_list(self.cl,
+                                                                                                      'shuffle', 1)))
+
+    def test_bootstrap(self):
+        resampled = replication.resample_calling_list(self.cl, 'bootstrap', 1)
+        self.assertEqual(resampled.get_number_calls(), self.cl.get_number_calls())
+        self.assertLess(len(set(resampled._calls._indices)), self.cl.get_number_calls())
+
+        # Calls drawn more than once are told apart by their unique ids
+        unique_ids = self.unique_ids(resampled)
+        self.assertEqual(len(set(unique_ids)), len(unique_ids))
+        original = set(self.unique_ids(self.cl))
+        for unique_id in unique_ids:
+            self.assertTrue(unique_id in original or unique_id.rsplit(':', 1)[0] in original)
+
+    def test_bootstrap_replica_keeps_every_call(self):
+        resampled = replication.resample_calling_list(self.cl, 'bootstrap', 1)
+        sim = SimulationConstantCall(3, number_agents=5, event_driven=True, generate_history_file=False)
+        sim.start(resampled, SimulationConstantCall.ONE_MINUTE * 2)
+
+        self.assertEqual(sim.total_number_calls, 100)
+        self.assertEqual(sim.total_number_answered_calls + sim.total_number_not_answered_calls,
+                         sim.total_number_calls)
+        self.assertEqual(sim.number_disconnected_calls(), sim.total_number_calls)
+
+    def test_confidence_interval(self):
+        mean, half_width = replication.confidence_interval([1, 2, 3])
+        self.assertEqual(mean, 2)
+        self.assertGreater(half_width, 1)
+
+    def run_replications(self, number_processes, precision=None):
+        replications = replication.Replications(SimulationConstantCall, {'dial_level': 2, 'number_agents': 5},
+                                                precision=precision, min_replicas=4, max_replicas=8, batch_size=2,
+                                                number_processes=number_processes)
+        replications.run(self.cl)
+        return replications
+
+    def test_parallel_matches_serial(self):
+        serial = self.run_replications(1)
+        parallel = self.run_replications(2)
+
+        self.assertEqual(len(serial.replicas), 8)
+        self.assertTrue(serial.results().equals(parallel.results()))
+        self.assertEqual(serial.summary().loc['total_number_calls', 'mean'], 100)
+
+    def test_stops_once_precise_enough(self):
+        replications = self.run_replications(1, precision={'total_number_calls': 0.5})
+        self.assertEqual(len(replications.replicas), 4)
@@ -0,0 +1,55 @@
+from unittest import TestCase
+from calling_list import CallingList
+from reporting import Reporter
+from simulation_constant_call import SimulationConstantCall
+
+FILENAME = '../test.csv'
+
+
+class CountingReporter(Reporter):
+
+    def __init__(self, interval=None):
+        Reporter.__init__(self, interval)
+        self.times = []
+        self.number_finished = 0
+
+    def report(self, simulation):
+        self.times.append(simulation._current_time)
+
+    def finished(self, simulation):
+        self.number_finished += 1
+
+
+class TestReporting(TestCase):
+
+    def run_simulation(self, reporter, event_driven=False):
+        cl = CallingList()
+        cl.load(FILENAME)
+        cl.parse()
+
+        sim = SimulationConstantCall(2, number_agents=5, generate_history_file=False, event_driven=event_driven,
+                                     reporter=reporter)
+        sim.start(cl)
+
+        return sim
+
+    def test_periodic_reports(self):
+        reporter = CountingReporter(interval=20000)
+        self.run_simulation(reporter)
+
+        self.assertEqual(reporter.times[:3], [20000, 40000, 60000])
+        self.assertEqual(reporter.number_finished, 1)
+
+    def test_no_periodic_reports(self):
+        reporter = CountingReporter()
+        self.run_simulation(reporter)
+
+        self.assertEqual(reporter.times, [])
+        self.assertEqual(reporter.number_finished, 1)
+
+    def test_no_reports_matches_event_driven(self):
+        stepped = self.run_simulation(Reporter())
+        event_driven = self.run_simulation(Reporter(), event_driven=True)
+
+        self.assertEqual(event_driven._current_time, stepped._current_time)
+        self.assertTrue(event_driven._history.to_dataframe().equals(stepped._history.to_dataframe()))
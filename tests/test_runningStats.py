@@ -0,0 +1,63 @@
+from unittest import TestCase
+from calling_list import CallingList
+from running_stats import RunningMean, ExponentialMean, CallStatistics
+from simulation_analytic import SimulationAnalytic
+from simulation_constant_call import SimulationConstantCall
+
+FILENAME = '../test.csv'
+
+
+class TestRunningStats(TestCase):
+
+    def test_running_mean_over_window(self):
+        mean = RunningMean(3)
+        self.assertEqual(mean.mean(), 0)
+        self.assertEqual(mean.mean(default=5), 5)
+
+        for value in [1, 2, 3, 10]:
+            mean.add(value)
+
+        self.assertEqual(mean.count, 3)
+        self.assertEqual(mean.mean(), 5)
+
+    def test_running_mean_over_everything(self):
+        mean = RunningMean()
+        for value in [1, 2, 3, 10]:
+            mean.add(value)
+
+        self.assertEqual(mean.count, 4)
+        self.assertEqual(mean.mean(), 4)
+
+    def test_exponential_mean(self):
+        mean = ExponentialMean(3)
+        mean.add(10)
+        self.assertEqual(mean.mean(), 10)
+
+        mean.add(20)
+        self.assertEqual(mean.mean(), 15)
+
+    def test_exponential_needs_window(self):
+        with self.assertRaises(ValueError):
+            CallStatistics(exponential=True)
+
+    def test_statistics_match_totals(self):
+        cl = CallingList()
+        cl.load(FILENAME)
+        cl.parse()
+
+        sim = SimulationConstantCall(2, number_agents=5, generate_history_file=False)
+        sim.start(cl)
+
+        statistics = sim._statistics
+        self.assertEqual(statistics.number_answer_outcomes(), sim.total_number_calls)
+        self.assertAlmostEqual(statistics.answer_rate(), sim.total_number_answered_calls / sim.total_number_calls)
+        self.assertAlmostEqual(statistics.abandonment_rate(), sim._current_abandonment_rate)
+        self.assertEqual(statistics.number_talk_times(), sim.total_number_talking_calls)
+        self.assertGreater(statistics.mean_talk_time(), 0)
+        self.assertGreater(statistics.mean_ringing_time(), 0)
+
+    def test_analytic_dials_steadily_without_data(self):
+        sim = SimulationAnalytic(number_agents=5)
+        sim._current_time = SimulationAnalytic.ONE_MINUTE * 2
+
+        self.assertEqual(sim.recalc_dial_level(), 1)
@@ -0,0 +1,38 @@
+from unittest import TestCase
+from calling_list import CallingList
+from simulation_constant_call import SimulationConstantCall
+
+FILENAME = '../test.csv'
+
+
+class TestSimulation(TestCase):
+
+    def run_simulation(self, event_driven):
+        cl = CallingList()
+        cl.load(FILENAME)
+        cl.parse()
+
+        sim = SimulationConstantCall(2, number_agents=5, generate_history_file=False, event_driven=event_driven)
+        sim.start(cl)
+
+        return sim
+
+    def test_event_driven_matches_epochs(self):
+        stepped = self.run_simulation(False)
+        event_driven = self.run_simulation(True)
+
+        self.assertEqual(event_driven._current_time, stepped._current_time)
+        self.assertEqual(event_driven.total_number_calls, stepped.total_number_calls)
+        self.assertEqual(event_driven.total_number_answered_calls, stepped.total_number_answered_calls)
+        self.assertEqual(event_driven.total_number_abandon_calls, stepped.total_number_abandon_calls)
+        self.assertEqual(event_driven.total_agent_talk_time, stepped.total_agent_talk_time)
+        self.assertEqual(event_driven.total_agent_idle_time, stepped.total_agent_idle_time)
+        self.assertTrue(event_driven._history.to_dataframe().equals(stepped._history.to_dataframe()))
+
+    def test_default_history_files_are_unique(self):
+        first = SimulationConstantCall(2)
+        second = SimulationConstantCall(2)
+
+        self.assertNotEqual(first._history.filename, second._history.filename)
+        self.assertTrue(first._history.filename.startswith('history_SimulationConstantCall_'))
+        self.assertIsNone(SimulationConstantCall(2, generate_history_file=False)._history.filename)
@@ -0,0 +1,89 @@
+from unittest import TestCase
+from agents import AgentTeam
+import benchmark
+from calling_list import CallingList
+from simulation_free_agent import SimulationFreeAgent
+
+FILENAME = '../test.csv'
+
+
+class TestSimulationFreeAgent(TestCase):
+
+    def run_simulation(self, paced, event_driven=False, agents=None):
+        cl = CallingList()
+        cl.load(FILENAME)
+        cl.parse()
+
+        sim = SimulationFreeAgent(number_agents=5, generate_history_file=False, event_driven=event_driven,
+                                  paced=paced, agents=agents)
+        dial_times = []
+        generate_call = sim.generate_call
+
+        def record_dial(number_calls=1):
+            dial_times.append(sim._current_time)
+            return generate_call(number_calls)
+
+        sim.generate_call = record_dial
+        sim.start(cl)
+
+        return sim, dial_times
+
+    def test_unpaced_dials_on_the_second(self):
+        _, dial_times = self.run_simulation(False)
+        self.assertTrue(all(t % SimulationFreeAgent.ONE_SECOND == 0 for t in dial_times))
+
+    def test_paced_dials_when_calls_finish(self):
+        sim, dial_times = self.run_simulation(True)
+
+        self.assertEqual(dial_times[0], SimulationFreeAgent.EPOCH)
+        self.assertTrue(any(t % SimulationFreeAgent.ONE_SECOND != 0 for t in dial_times))
+        self.assertEqual(sim.total_number_calls, 100)
+
+    def test_paced_event_driven_matches_epochs(self):
+        stepped, stepped_dial_times = self.run_simulation(True)
+        event_driven, event_driven_dial_times = self.run_simulation(True, event_driven=True)
+
+        self.assertEqual(event_driven_dial_times, stepped_dial_times)
+        self.assertEqual(event_driven._current_time, stepped._current_time)
+        self.assertEqual(event_driven.total_agent_talk_time, stepped.total_agent_talk_time)
+        self.assertEqual(event_driven.total_agent_idle_time, stepped.total_agent_idle_time)
+
+    def test_paced_dials_when_agents_become_free(self):
+        # The last agent logs in late, and everyone has wrap-up to do after each call
+        agents = AgentTeam(login_times=[0, 0, 0, 0, 30300], wrap_up_times=[1500], seed=1)
+        freed = []
+        due_events = agents.due_events
+
+        def record_freed(time):
+            events = due_events(time)
+            freed.extend(time for kind, agent in events if kind != AgentTeam.LOGOUT)
+            return events
+
+        agents.due_events = record_freed
+        _, dial_times = self.run_simulation(True, agents=agents)
+
+        self.assertIn(30300, freed)
+        self.assertGreater(len(freed), 1)
+        # Every agent freed by a login or the end of their wrap-up had a call dialed for them straight away
+        for time in freed:
+            self.assertIn(time, dial_times)
+
+    def test_paced_dials_beyond_the_cap_next_epoch(self):
+        cl = CallingList()
+        cl._df = benchmark.csv_workload(1000)
+        cl.parse()
+
+        # More agents are free at the start than calls can be made in one go
+        sim = SimulationFreeAgent(number_agents=150, generate_history_file=False, paced=True)
+        dial_times = []
+        generate_call = sim.generate_call
+
+        def record_dial(number_calls=1):
+            dial_times.append((sim._current_time, number_calls))
+            return generate_call(number_calls)
+
+        sim.generate_call = record_dial
+        sim.start(cl, SimulationFreeAgent.ONE_MINUTE)
+
+        self.assertEqual(dial_times[:2], [(SimulationFreeAgent.EPOCH, SimulationFreeAgent.MAX_CALLS_TO_GENERATE),
+                                          (2 * SimulationFreeAgent.EPOCH, 50)])
@@ -1,6 +1,10 @@
 from unittest import TestCase
+import random
+from calling_list import CallingList
 from simulation_genetic import SimulationGenetic
 
+FILENAME = '../test.csv'
+
 
 class TestSimulationConstantCall(TestCase):
 
@@ -11,8 +15,78 @@ class TestSimulationConstantCall(TestCase):
 
         self.assertEquals(len(pop) == 11)
 
+    def rerun_past_calls(self, number_processes):
+        cl = CallingList()
+        cl.load(FILENAME)
+        cl.parse()
+
+        sim = SimulationGenetic(number_agents=5, number_processes=number_processes)
+        sim.number_generations = 2
+        sim._calling_list = cl
+        for call in cl._calls:
+            sim._stored_calling_list_entry.append(call, 0)
+
+        random.seed(42)
+        return sim.rerun_past_calls()
+
+    def test_parallel_evaluation_matches_serial(self):
+        self.assertEqual(self.rerun_past_calls(2), self.rerun_past_calls(1))
+
+    def test_fitness_cache_skips_repeated_dial_levels(self):
+        cl = CallingList()
+        cl.load(FILENAME)
+        cl.parse()
+
+        sim = SimulationGenetic(number_agents=5)
+        sim._calling_list = cl
+        for call in cl._calls:
+            sim._stored_calling_list_entry.append(call, 0)
+
+        population = [SimulationGenetic.Chromosome(dl, 0.05) for dl in [1, 2, 1, 3]]
+        first = sim.evaluate_population(population)
+        self.assertEqual(sim._fitness_cache.misses, 3)
+        self.assertEqual(sim._fitness_cache.hits, 1)
+
+        second = sim.evaluate_population(population)
+        self.assertEqual(second, first)
+        self.assertEqual(sim._fitness_cache.misses, 3)
+        self.assertEqual(sim._fitness_cache.hits, 5)
+
+    def test_fitness_cache_keys(self):
+        # By default only the same dial level shares a result, so the cache can't change what the GA chooses
+        exact = SimulationGenetic.FitnessCache()
+        self.assertEqual(exact.key(1.5, 0, 5), exact.key(1.5, 0, 5))
+        self.assertNotEqual(exact.key(1.5, 0, 5), exact.key(1.5000001, 0, 5))
+
+        quantised = SimulationGenetic.FitnessCache(dial_level_quantum=0.001)
+        self.assertEqual(quantised.key(1.5, 0, 5), quantised.key(1.5002, 0, 5))
+        self.assertNotEqual(quantised.key(1.5, 0, 5), quantised.key(1.501, 0, 5))
+
+    def test_fitness_cache_evicts_least_recently_used(self):
+        cache = SimulationGenetic.FitnessCache(max_size=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
 
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
 
+    def test_prescreen_only_simulates_most_promising(self):
+        cl = CallingList()
+        cl.load(FILENAME)
+        cl.parse()
 
+        sim = SimulationGenetic(number_agents=5, prescreen_fraction=0.5)
+        sim._calling_list = cl
+        for call in cl._calls:
+            sim._stored_calling_list_entry.append(call, 0)
+        sim._estimator = sim.create_estimator()
 
+        population = [SimulationGenetic.Chromosome(dl, 0.05) for dl in [0.1, 0.2, 5, 10]]
+        results = sim.evaluate_population(population)
 
+        self.assertEqual(len(results), 4)
+        self.assertEqual(sim._fitness_cache.misses, 4)
+        self.assertEqual(len(sim._fitness_cache._results), 2)
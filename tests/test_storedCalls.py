@@ -0,0 +1,48 @@
+from unittest import TestCase
+from callstats import CallStats
+from stored_calls import StoredCalls
+
+
+def make_call(number):
+    return CallStats.from_offsets('O', 0, 1000, str(number), False, False)
+
+
+class TestStoredCalls(TestCase):
+
+    def test_discard_before(self):
+        stored = StoredCalls()
+        for i in range(10):
+            stored.append(make_call(i), i * 1000)
+
+        stored.discard_before(6)
+
+        # Positions still count from the start
+        self.assertEqual(len(stored), 10)
+        self.assertEqual(stored.first_position(), 6)
+        self.assertEqual(stored.number_stored_calls(), 4)
+        self.assertEqual(stored[6].unique_id, '6')
+        self.assertRaises(IndexError, lambda: stored[5])
+
+        stored.append(make_call(10), 10000)
+        self.assertEqual(stored[10].unique_id, '10')
+
+    def test_max_age(self):
+        stored = StoredCalls(max_age=5000)
+        for i in range(100):
+            stored.append(make_call(i), i * 1000)
+
+        self.assertEqual(len(stored), 100)
+        self.assertEqual(stored.number_stored_calls(), 6)
+        self.assertEqual(stored.first_position(), 94)
+
+    def test_window(self):
+        stored = StoredCalls()
+        for i in range(10):
+            stored.append(make_call(i), i * 1000)
+        stored.discard_before(4)
+
+        # Asking for calls that have been dropped gives the calls that are left
+        window = stored.window(2)
+        self.assertEqual(len(window), 6)
+        self.assertEqual(window[0].unique_id, '4')
+        self.assertEqual([c.unique_id for c in stored[2:6]], ['4', '5'])
@@ -0,0 +1,90 @@
+from unittest import TestCase
+import os
+import tempfile
+from calling_list import CallingList, StreamingCallingList
+from generator import CallingListModel
+from history import HistoryRecorder
+from reporting import Reporter
+from simulation import Simulation
+from simulation_constant_call import SimulationConstantCall
+
+FILENAME = '../test.csv'
+
+
+class TestStreamingCallingList(TestCase):
+
+    def setUp(self):
+        self.cl = CallingList()
+        self.cl.load(FILENAME)
+        self.cl.parse()
+
+    def unique_ids(self, cl):
+        unique_ids = []
+        call = cl.get_call()
+        while call is not None:
+            unique_ids.append(call.unique_id)
+            call = cl.get_call()
+        return unique_ids
+
+    def test_get_call(self):
+        with StreamingCallingList(FILENAME, chunk_size=30, prefetch=1) as streamed:
+            self.assertEqual(self.unique_ids(streamed), self.unique_ids(self.cl))
+            self.assertIsNone(streamed.get_call())
+            self.assertEqual(streamed.get_number_calls(), 0)
+
+    def test_get_queued_call(self):
+        with StreamingCallingList(FILENAME, chunk_size=7) as streamed:
+            # The queued calls are read ahead of the calls, and cycle once they're all used
+            for i in range(20):
+                self.assertEqual(streamed.get_queued_call().unique_id, self.cl.get_queued_call().unique_id)
+            self.assertEqual(len(streamed._queued_calls), 15)
+
+            self.assertEqual(streamed.get_call().unique_id, self.cl._calls[0].unique_id)
+
+    def test_retained_chunks_bounded(self):
+        model = CallingListModel.from_csv(FILENAME)
+
+        with tempfile.TemporaryDirectory() as path:
+            retained = []
+            for number_calls in (500, 4000):
+                filename = os.path.join(path, 'calls{}.csv'.format(number_calls))
+                model.write_csv(filename, number_calls, seed=1)
+
+                most = 0
+                with StreamingCallingList(filename, chunk_size=50, prefetch=2) as streamed:
+                    # Ask for far more queued calls than calls, so the queued calls run well ahead of the dialer
+                    while streamed.get_call() is not None:
+                        for i in range(5):
+                            streamed.get_queued_call()
+                        most = max(most, len(streamed._chunks))
+                retained.append(most)
+
+        self.assertLessEqual(max(retained), 1)
+        self.assertEqual(retained[0], retained[1])
+
+    def test_max_queued_calls(self):
+        with StreamingCallingList(FILENAME, chunk_size=10, max_queued_calls=4) as streamed:
+            unique_ids = [streamed.get_queued_call().unique_id for i in range(5)]
+
+        self.assertEqual(unique_ids[4], unique_ids[0])
+        self.assertEqual(unique_ids[:4], [self.cl._queued_calls[i].unique_id for i in range(4)])
+
+    def test_reset(self):
+        with StreamingCallingList(FILENAME, chunk_size=30) as streamed:
+            first = self.unique_ids(streamed)
+            streamed.reset()
+            self.assertEqual(self.unique_ids(streamed), first)
+
+    def test_missing_file(self):
+        with StreamingCallingList('missing.csv') as streamed:
+            self.assertRaises(FileNotFoundError, streamed.get_call)
+
+    def test_simulation(self):
+        def run(cl):
+            sim = SimulationConstantCall(3, number_agents=5, event_driven=True, reporter=Reporter(),
+                                         history=HistoryRecorder(None, Simulation.SAVE_HISTORY_INTERVAL))
+            sim.start(cl, Simulation.ONE_MINUTE * 5)
+            return sim.total_number_calls, sim.total_number_abandon_calls, sim.total_agent_talk_time
+
+        with StreamingCallingList(FILENAME, chunk_size=16) as streamed:
+            self.assertEqual(run(streamed), run(self.cl))
@@ -0,0 +1,42 @@
+from unittest import TestCase
+from calling_list import CallingList
+import sweep
+
+FILENAME = '../test.csv'
+
+
+class TestSweep(TestCase):
+
+    def setUp(self):
+        self.cl = CallingList()
+        self.cl.load(FILENAME)
+        self.cl.parse()
+
+        self.points = sweep.build_grid(['constant', 'free_agent'], [1, 2.5], [5], [sweep.Simulation.ONE_MINUTE * 5])
+
+    def test_build_grid(self):
+        self.assertEqual(len(self.points), 3)
+        self.assertEqual(self.points[0], sweep.SweepPoint('constant', 1, 5, 300000))
+        self.assertEqual(self.points[2], sweep.SweepPoint('free_agent', None, 5, 300000))
+
+        with self.assertRaises(ValueError):
+            sweep.build_grid(['unknown'], [1], [5], [300000])
+
+    def test_history_filename(self):
+        self.assertEqual(sweep.history_filename(self.points[1]), 'history_constant_5agent_2_5_5min.pkl')
+        self.assertEqual(sweep.history_filename(self.points[2]), 'history_freeagent_5agent_5min.pkl')
+
+    def test_parallel_matches_serial(self):
+        serial = sweep.run_sweep(self.cl, self.points).drop(columns='run_time')
+        parallel = sweep.run_sweep(self.cl, self.points, number_processes=2).drop(columns='run_time')
+
+        self.assertEqual(len(serial), 3)
+        self.assertTrue(serial.equals(parallel))
+
+    def test_point_matches_single_run(self):
+        sim = sweep.create_simulation(self.points[0])
+        sim.start(self.cl, self.points[0].duration_shift)
+
+        result = sweep.run_sweep(self.cl, self.points[:1]).iloc[0]
+        self.assertEqual(result['total_number_calls'], sim.total_number_calls)
+        self.assertEqual(result['total_agent_talk_time'], sim.total_agent_talk_time)
@@ -0,0 +1,60 @@
+from unittest import TestCase
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import tracing
+from tracing import Tracer
+from calling_list import CallingList
+from simulation_constant_call import SimulationConstantCall
+
+FILENAME = '../test.csv'
+
+
+class TestTracing(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_disabled_without_filename(self):
+        tracer = Tracer(levels={'calls': tracing.DEBUG})
+        self.assertFalse(tracer.enabled('calls'))
+
+    def test_subsystem_levels(self):
+        tracer = Tracer(os.path.join(self.directory, 'trace.jsonl'), levels={'calls': tracing.DEBUG})
+        self.assertTrue(tracer.enabled('calls', tracing.DEBUG))
+        self.assertFalse(tracer.enabled('genetic', tracing.DEBUG))
+        self.assertTrue(tracer.enabled('genetic', tracing.INFO))
+
+    def test_trace_batches(self):
+        filename = os.path.join(self.directory, 'trace.jsonl.gz')
+        with Tracer(filename, batch_size=2) as tracer:
+            for i in range(5):
+                tracer.trace('calls', i * 100, 'ringing', call=str(i))
+
+        with gzip.open(filename, 'rt') as f:
+            records = [json.loads(line) for line in f]
+
+        self.assertEqual(len(records), 5)
+        self.assertEqual(records[4], {'t': 400, 's': 'calls', 'e': 'ringing', 'call': '4'})
+
+    def test_simulation_trace(self):
+        filename = os.path.join(self.directory, 'trace.jsonl')
+        cl = CallingList()
+        cl.load(FILENAME)
+        cl.parse()
+
+        with Tracer(filename, levels={'calls': tracing.DEBUG}) as tracer:
+            sim = SimulationConstantCall(2, number_agents=5, generate_history_file=False, tracer=tracer)
+            sim.start(cl)
+
+        with open(filename) as f:
+            records = [json.loads(line) for line in f]
+
+        made = [r for r in records if r['e'] == 'make_call']
+        self.assertEqual(len(made), sim.total_number_calls)
+        self.assertFalse(any(r['s'] == 'dialer' for r in records))
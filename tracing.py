@@ -0,0 +1,101 @@
+import gzip
+import json
+import logging as log
+
+# Verbosity levels, the same as the logging module's
+DEBUG = log.DEBUG
+INFO = log.INFO
+
+
+class Tracer:
+    """
+    A structured trace of what happens in a simulation, written as one JSON object per line.
+
+    Each record belongs to a subsystem (eg: 'calls', 'dialer', 'genetic') and each subsystem has its own verbosity.
+    Callers check enabled() once and keep the answer, so a disabled trace costs a single test on the hot path and
+    no strings are built. Records are buffered and written in batches. A filename ending in .gz is compressed.
+
+    Records look like:
+      {"t": 12300, "s": "calls", "e": "answered", "call": "0cb53c48fef5cdd7:a1aa85:142e53206f3:-7fb5"}
+    where t is the simulation time in milliseconds.
+    """
+
+    def __init__(self, filename=None, levels=None, default_level=INFO, batch_size=10000):
+        """
+        :param filename: the file to write the trace to. If None then nothing is traced.
+        :param levels: the lowest level to record for each subsystem, eg {'calls': DEBUG}
+        :param default_level: the lowest level to record for subsystems not in levels
+        :param batch_size: the number of records to buffer before writing them out
+        """
+        self._filename = filename
+        self._levels = {} if levels is None else dict(levels)
+        self._default_level = default_level
+        self._batch_size = batch_size
+
+        self._buffer = []
+        self._file = None
+
+
+    def enabled(self, subsystem, level=DEBUG):
+        """
+        :param subsystem:
+        :param level:
+        :return: whether records of this level for this subsystem are written
+        """
+        return self._filename is not None and level >= self._levels.get(subsystem, self._default_level)
+
+
+    def trace(self, subsystem, time, event, **fields):
+        """
+        Record an event. Callers should check enabled() first.
+        :param subsystem:
+        :param time: the simulation time (ms)
+        :param event: what happened
+        :param fields: anything else to record about the event
+        :return:
+        """
+        fields['t'] = time
+        fields['s'] = subsystem
+        fields['e'] = event
+        self._buffer.append(fields)
+
+        if len(self._buffer) >= self._batch_size:
+            self.flush()
+
+
+    def flush(self):
+        """
+        Write out the buffered records.
+        :return:
+        """
+        if len(self._buffer) == 0:
+            return
+
+        if self._file is None:
+            if self._filename.endswith('.gz'):
+                self._file = gzip.open(self._filename, 'wt')
+            else:
+                self._file = open(self._filename, 'w')
+
+        self._file.write('\n'.join(json.dumps(record, default=str) for record in self._buffer))
+        self._file.write('\n')
+        self._buffer = []
+
+
+    def close(self):
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+# A tracer that records nothing. This is what simulations use unless they are given one.
+NULL_TRACER = Tracer()